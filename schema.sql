@@ -117,6 +117,7 @@ CREATE TABLE events (
 -- Entity indexes (filter active vs deleted)
 CREATE INDEX idx_entities_active ON entities(name) WHERE deleted_at IS NULL;
 CREATE INDEX idx_entities_deleted ON entities(deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX idx_entities_name_nocase ON entities(name COLLATE NOCASE) WHERE deleted_at IS NULL;
 
 -- Component indexes (most common queries)
 CREATE INDEX idx_components_entity ON components(entity_id) WHERE deleted_at IS NULL;
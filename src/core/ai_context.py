@@ -35,11 +35,18 @@ class AIContextBuilder:
         Build context about the game system (all registered game data).
 
         Dynamically includes all registries (races, classes, skills, spells, etc.)
-        that modules have registered with the engine.
+        that modules have registered with the engine. The result is cached on
+        the engine until a registry value is written, since it's otherwise
+        the same for every DM turn.
 
         Returns:
             Dict with game system information from all registries
         """
+        registry_version = self.engine.storage.registry_version
+        cached = self.engine.ai_context_cache.get('game_system')
+        if cached and cached[0] == registry_version:
+            return cached[1]
+
         context = {}
 
         try:
@@ -61,7 +68,9 @@ class AIContextBuilder:
 
         except Exception as e:
             logger.warning(f"Error building game system context: {e}")
+            return context
 
+        self.engine.ai_context_cache['game_system'] = (registry_version, context)
         return context
 
     def build_character_context(self, entity_id: str) -> Dict[str, Any]:
@@ -467,20 +476,19 @@ class AIContextBuilder:
         if not conversation:
             return []
 
-        message_ids = conversation.data.get('message_ids', [])
+        message_ids = conversation.data.get('message_ids', [])[-limit:]  # Last N messages
+        msg_comps = self.engine.get_components_bulk(message_ids, 'ChatMessage')
 
         messages = []
-        for msg_id in message_ids[-limit:]:  # Last N messages
-            msg_entity = self.engine.get_entity(msg_id)
-            if msg_entity and msg_entity.is_active():
-                msg_comp = self.engine.get_component(msg_id, 'ChatMessage')
-                if msg_comp:
-                    messages.append({
-                        'speaker': msg_comp.data.get('speaker', 'unknown'),
-                        'speaker_name': msg_comp.data.get('speaker_name', 'Unknown'),
-                        'message': msg_comp.data.get('message', ''),
-                        'timestamp': msg_comp.data.get('timestamp', '')
-                    })
+        for msg_id in message_ids:
+            msg_comp = msg_comps.get(msg_id)
+            if msg_comp:
+                messages.append({
+                    'speaker': msg_comp.data.get('speaker', 'unknown'),
+                    'speaker_name': msg_comp.data.get('speaker_name', 'Unknown'),
+                    'message': msg_comp.data.get('message', ''),
+                    'timestamp': msg_comp.data.get('timestamp', '')
+                })
 
         return messages
 
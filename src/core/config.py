@@ -72,6 +72,9 @@ class Config:
         self.ai_model = os.getenv('AI_MODEL', 'claude-sonnet-4-5-20250929')
         self.ai_max_tokens = int(os.getenv('AI_MAX_TOKENS', '4096'))
         self.ai_temperature = float(os.getenv('AI_TEMPERATURE', '0.7'))
+        self.ai_max_concurrent = int(os.getenv('AI_MAX_CONCURRENT', '5'))  # Simultaneous LLM requests
+        self.ai_requests_per_minute = int(os.getenv('AI_REQUESTS_PER_MINUTE', '50'))  # 0 = unlimited
+        self.ai_tokens_per_minute = int(os.getenv('AI_TOKENS_PER_MINUTE', '0'))  # 0 = unlimited (opt-in)
 
         # Prompt configuration
         self.ai_system_prompt_path = os.getenv(
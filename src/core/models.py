@@ -153,6 +153,31 @@ class Component:
             modified_at=timestamp
         )
     
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> 'Component':
+        """
+        Rebuild a component from its to_dict() form.
+        
+        Lets callers use the component returned by StateEngine.add_component()
+        without reading it back from storage.
+        
+        Args:
+            data: Dictionary as produced by to_dict()
+            
+        Returns:
+            Component instance
+        """
+        return Component(
+            id=data['id'],
+            entity_id=data['entity_id'],
+            component_type=data['component_type'],
+            data=data['data'],
+            version=data['version'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            modified_at=datetime.fromisoformat(data['modified_at']),
+            deleted_at=datetime.fromisoformat(data['deleted_at']) if data['deleted_at'] else None
+        )
+    
     def is_active(self) -> bool:
         """Check if component is active (not soft-deleted)."""
         return self.deleted_at is None
@@ -70,6 +70,10 @@ class StateEngine:
         # request the same registry - they all get the same instance
         self._registry_instances: Dict[str, 'ModuleRegistry'] = {}
 
+        # AI context pieces that only change with registries, as
+        # {name: (storage.registry_version, value)} (see AIContextBuilder)
+        self.ai_context_cache: Dict[str, Any] = {}
+
         # Modules storage (for cross-module access)
         self._modules: Dict[str, Any] = {}
 
@@ -250,20 +254,21 @@ class StateEngine:
 
     # ========== Entity Operations ==========
 
-    def create_entity(self, name: str, actor_id: str = 'system') -> Result:
+    def create_entity(self, name: str, actor_id: str = 'system', entity_id: Optional[str] = None) -> Result:
         """
         Create a new entity.
 
         Args:
             name: Entity name
             actor_id: Who is creating this entity
+            entity_id: Optional pre-generated ID (generated if not provided)
 
         Returns:
             Result with entity data or error
         """
         try:
             # Create entity
-            entity = Entity.create(name)
+            entity = Entity.create(name, entity_id=entity_id)
 
             # Save to storage
             if not self.storage.save_entity(entity):
@@ -546,6 +551,23 @@ class StateEngine:
         """
         return self.storage.get_component(entity_id, component_type)
 
+    def get_components_bulk(self, entity_ids: List[str], component_type: str) -> Dict[str, Component]:
+        """
+        Get one component type for many entities at once.
+
+        Prefer this over calling get_entity() + get_component() per ID when
+        loading many entities (e.g. chat history); it issues a single query.
+
+        Args:
+            entity_ids: Entity IDs to look up
+            component_type: Type of component
+
+        Returns:
+            Dict mapping entity ID to component, for active entities that
+            have the component
+        """
+        return self.storage.get_components_bulk(list(entity_ids), component_type)
+
     def get_entity_components(self, entity_id: str) -> Dict[str, Dict[str, Any]]:
         """
         Get all components for an entity as {type: data}.
@@ -649,6 +671,88 @@ class StateEngine:
         except Exception as e:
             return Result.fail(str(e), ErrorCode.UNEXPECTED_ERROR)
 
+    def append_to_component_list(self, entity_id: str, component_type: str, field: str,
+                                 items: List[Any], updates: Optional[Dict[str, Any]] = None,
+                                 actor_id: str = 'system') -> Result:
+        """
+        Append items to a list field of a component without rewriting it.
+
+        Use this instead of update_component() for append-only lists that
+        grow without bound (e.g. a Conversation's message_ids). Only the
+        new items and updated fields are written, both to the component and
+        to the component.updated event, which carries 'appended' and
+        'updates' instead of the full old_data/new_data.
+
+        The written values are checked against the schema's properties;
+        required fields and validate_with_engine() checks are not re-run,
+        since the rest of the component is left as it was.
+
+        Args:
+            entity_id: Entity with the component
+            component_type: Type of component to update
+            field: Name of the list field to append to
+            items: Items to append, in order
+            updates: Other top-level fields to set in the same write
+            actor_id: Who is updating this component
+
+        Returns:
+            Result with {'component_id', 'version'} or error
+        """
+        updates = updates or {}
+        try:
+            # Check entity exists
+            entity = self.storage.get_entity(entity_id)
+            if not entity:
+                return Result.fail(f"Entity {entity_id} not found", "ENTITY_NOT_FOUND")
+
+            if not entity.is_active():
+                return Result.fail(f"Entity {entity_id} is deleted", "ENTITY_DELETED")
+
+            # Validate just the written values
+            if component_type in self.component_validators:
+                schema = self.component_validators[component_type].get_schema()
+                try:
+                    jsonschema.validate(
+                        {field: list(items), **updates},
+                        {'type': 'object', 'properties': schema.get('properties', {})}
+                    )
+                except jsonschema.ValidationError as e:
+                    return Result.fail(
+                        f"Component data validation failed: {e.message}",
+                        "VALIDATION_ERROR"
+                    )
+
+            written = self.storage.append_to_component_list(
+                entity_id, component_type, field, list(items), updates, now()
+            )
+            if written is None:
+                return Result.fail(
+                    f"Entity {entity_id} does not have component {component_type}",
+                    "COMPONENT_NOT_FOUND"
+                )
+            component_id, version = written
+
+            # Emit event
+            event = Event.create(
+                event_type='component.updated',
+                data={
+                    'entity_id': entity_id,
+                    'component_type': component_type,
+                    'component_id': component_id,
+                    'appended': {field: list(items)},
+                    'updates': updates
+                },
+                entity_id=entity_id,
+                component_id=component_id,
+                actor_id=actor_id
+            )
+            self.event_bus.publish(event)
+
+            return Result.ok({'component_id': component_id, 'version': version})
+
+        except Exception as e:
+            return Result.fail(str(e), ErrorCode.UNEXPECTED_ERROR)
+
     def remove_component(self, entity_id: str, component_type: str,
                         actor_id: str = 'system') -> Result:
         """
@@ -909,14 +1013,16 @@ class StateEngine:
 
     def query_entities(self, component_types: Optional[List[str]] = None) -> List[Entity]:
         """
-        Query entities by components.
+        Query active entities by components.
+
+        Soft-deleted entities are filtered out by the query itself.
 
         Args:
             component_types: List of component types that entities must have
-                           If None, returns all entities
+                           If None, returns all active entities
 
         Returns:
-            List of entities matching the query
+            List of active entities matching the query
         """
         return self.storage.query_entities(component_types)
 
@@ -932,6 +1038,18 @@ class StateEngine:
         """
         return self.storage.search_text(query)
 
+    def find_entities_by_name(self, name: str) -> List[Entity]:
+        """
+        Find active entities by name (case-insensitive) with an indexed query.
+
+        Args:
+            name: Entity name to match
+
+        Returns:
+            List of matching entities
+        """
+        return self.storage.find_entities_by_name(name)
+
     # ========== Event Operations ==========
 
     def get_events(self, entity_id: Optional[str] = None,
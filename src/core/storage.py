@@ -9,7 +9,7 @@ transaction support.
 import sqlite3
 import json
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 
 from .models import Entity, Component, Relationship, Event
@@ -27,6 +27,16 @@ class WorldStorage:
         conn: Database connection (None until initialize() is called)
     """
     
+    # Maximum number of IDs bound per bulk query (SQLite limits host parameters)
+    BULK_QUERY_BATCH_SIZE = 500
+    
+    # Schema additions since the original schema.sql, applied on every open so
+    # worlds created before them catch up (each statement must be idempotent)
+    SCHEMA_UPGRADES = (
+        "CREATE INDEX IF NOT EXISTS idx_entities_name_nocase "
+        "ON entities(name COLLATE NOCASE) WHERE deleted_at IS NULL",
+    )
+    
     def __init__(self, db_path: str):
         """
         Initialize storage for a world database.
@@ -37,11 +47,16 @@ class WorldStorage:
         """
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
+
+        # Bumped on every registry write so callers can cache registry-derived data
+        self.registry_version = 0
         
     def initialize(self, schema_path: str = None) -> None:
         """
         Initialize database connection and create tables if they don't exist.
 
+        Existing databases are brought up to date with SCHEMA_UPGRADES.
+
         Args:
             schema_path: Path to schema.sql file (uses default location if not provided)
         """
@@ -64,6 +79,10 @@ class WorldStorage:
             
             self.conn.executescript(schema)
             self.conn.commit()
+        else:
+            for statement in self.SCHEMA_UPGRADES:
+                self.conn.execute(statement)
+            self.conn.commit()
     
     def close(self) -> None:
         """Close database connection."""
@@ -190,6 +209,7 @@ class WorldStorage:
             VALUES (?, ?, ?, ?, ?, ?)
         """, (registry_name, key, description, module, metadata_json, datetime.utcnow()))
         self.conn.commit()
+        self.registry_version += 1
 
     def get_registry_values(self, registry_name: str) -> List[Dict[str, Any]]:
         """
@@ -448,6 +468,54 @@ class WorldStorage:
         except sqlite3.Error:
             return False
     
+    def append_to_component_list(self, entity_id: str, component_type: str, field: str,
+                                 items: List[Any], updates: Dict[str, Any],
+                                 modified_at: datetime) -> Optional[Tuple[str, int]]:
+        """
+        Append items to a list field of a component inside SQLite.
+        
+        The list is extended with JSON functions, so its existing contents
+        are neither loaded nor re-serialized. A missing field starts as an
+        empty list. Other top-level fields in updates are set in the same write.
+        
+        Args:
+            entity_id: Entity with the component
+            component_type: Type of component
+            field: Name of the list field
+            items: Items to append, in order
+            updates: Other top-level fields to set
+            modified_at: New modification time
+            
+        Returns:
+            Tuple of (component ID, new version), or None if the entity
+            has no active component of that type
+        """
+        row = self.conn.execute("""
+            SELECT id, version FROM components
+            WHERE entity_id = ? AND component_type = ? AND deleted_at IS NULL
+        """, (entity_id, component_type)).fetchone()
+        if row is None:
+            return None
+        
+        path = f'$."{field}"'
+        expression = "json_set(data, ?, json(COALESCE(json_extract(data, ?), '[]')))"
+        params = [path, path]
+        for item in items:
+            expression = f"json_insert({expression}, ?, json(?))"
+            params += [f'{path}[#]', json.dumps(item)]
+        for key, value in updates.items():
+            expression = f"json_set({expression}, ?, json(?))"
+            params += [f'$."{key}"', json.dumps(value)]
+        
+        version = row['version'] + 1
+        self.conn.execute(f"""
+            UPDATE components
+            SET data = {expression}, version = ?, modified_at = ?
+            WHERE id = ?
+        """, params + [version, modified_at, row['id']])
+        self.conn.commit()
+        return row['id'], version
+    
     def get_component(self, entity_id: str, component_type: str) -> Optional[Component]:
         """
         Get a specific component from an entity.
@@ -511,6 +579,49 @@ class WorldStorage:
         
         return components
     
+    def get_components_bulk(self, entity_ids: List[str], component_type: str) -> Dict[str, Component]:
+        """
+        Get one component type for many entities in a single pass.
+        
+        Only components of active (not soft-deleted) entities are returned.
+        IDs are queried in batches to stay under SQLite's parameter limit.
+        
+        Args:
+            entity_ids: Entity IDs to look up
+            component_type: Type of component to retrieve
+            
+        Returns:
+            Dict mapping entity ID to component (missing IDs are omitted)
+        """
+        components = {}
+        for start in range(0, len(entity_ids), self.BULK_QUERY_BATCH_SIZE):
+            batch = entity_ids[start:start + self.BULK_QUERY_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor = self.conn.execute(f"""
+                SELECT c.id, c.entity_id, c.component_type, c.data, c.version,
+                       c.created_at, c.modified_at, c.deleted_at
+                FROM components c
+                JOIN entities e ON e.id = c.entity_id
+                WHERE c.component_type = ?
+                AND c.entity_id IN ({placeholders})
+                AND c.deleted_at IS NULL
+                AND e.deleted_at IS NULL
+            """, [component_type] + batch)
+            
+            for row in cursor.fetchall():
+                components[row['entity_id']] = Component(
+                    id=row['id'],
+                    entity_id=row['entity_id'],
+                    component_type=row['component_type'],
+                    data=json.loads(row['data']),
+                    version=row['version'],
+                    created_at=self._parse_datetime(row['created_at']),
+                    modified_at=self._parse_datetime(row['modified_at']),
+                    deleted_at=self._parse_datetime(row['deleted_at']) if row['deleted_at'] else None
+                )
+        
+        return components
+    
     def list_components_by_type(self, component_type: str) -> List[Component]:
         """
         List all components of a specific type.
@@ -847,6 +958,52 @@ class WorldStorage:
         
         return entities
     
+    def find_entities_by_name(self, name: str) -> List[Entity]:
+        """
+        Find active entities with a given name, ignoring case.
+        
+        ASCII names use the idx_entities_name_nocase index, so lookups don't
+        scan every entity. SQLite's NOCASE collation only folds ASCII letters,
+        so names with other characters (e.g. "Élise") are compared with
+        str.lower() over the active entities instead.
+        
+        Args:
+            name: Entity name to match
+            
+        Returns:
+            List of matching entities ordered by name
+        """
+        if name.isascii():
+            rows = self.conn.execute("""
+                SELECT id, name, created_at, modified_at, deleted_at, deleted_by
+                FROM entities
+                WHERE name = ? COLLATE NOCASE
+                AND deleted_at IS NULL
+                ORDER BY name
+            """, (name,)).fetchall()
+        else:
+            folded = name.lower()
+            cursor = self.conn.execute("""
+                SELECT id, name, created_at, modified_at, deleted_at, deleted_by
+                FROM entities
+                WHERE deleted_at IS NULL
+                ORDER BY name
+            """)
+            rows = [row for row in cursor if row['name'].lower() == folded]
+        
+        entities = []
+        for row in rows:
+            entities.append(Entity(
+                id=row['id'],
+                name=row['name'],
+                created_at=self._parse_datetime(row['created_at']),
+                modified_at=self._parse_datetime(row['modified_at']),
+                deleted_at=self._parse_datetime(row['deleted_at']) if row['deleted_at'] else None,
+                deleted_by=row['deleted_by']
+            ))
+        
+        return entities
+    
     # ========== Helper Methods ==========
     
     @staticmethod
@@ -76,6 +76,12 @@ class AIDMModule(Module):
         # (e.g., generate AI intro if scenario_type is 'ai_generated')
         engine.event_bus.subscribe('character.form_submitted', self.on_character_form_submitted)
 
+        # Keep the Conversation history cache consistent when chat messages
+        # are edited, deleted or restored outside the normal append path
+        engine.event_bus.subscribe('component.updated', self.on_chat_message_changed)
+        engine.event_bus.subscribe('entity.deleted', self.on_chat_message_changed)
+        engine.event_bus.subscribe('entity.restored', self.on_chat_message_changed)
+
         # Auto-add Conversation component to all existing PlayerCharacter entities
         try:
             player_characters = engine.query_entities(['PlayerCharacter'])
@@ -112,6 +118,44 @@ class AIDMModule(Module):
                 except Exception as e:
                     logger.warning(f"Could not auto-add Conversation to {entity_id}: {e}")
 
+    def on_chat_message_changed(self, event: Event) -> None:
+        """Invalidate cached history and chat display of conversations with a changed ChatMessage."""
+        if not hasattr(self, 'engine'):
+            return
+
+        if event.event_type == 'component.updated':
+            if event.data.get('component_type') != 'ChatMessage':
+                return
+            message_data = event.data.get('new_data') or {}
+        else:
+            chat_message = self.engine.get_component(event.entity_id, 'ChatMessage')
+            if not chat_message:
+                return
+            message_data = chat_message.data
+
+        msg_id = event.entity_id
+        owner_id = message_data.get('conversation_id')
+        if owner_id:
+            owner_ids = [owner_id]
+        else:
+            # Messages saved before conversation_id existed: find the owner by scanning
+            owner_ids = [
+                owner.id for owner in self.engine.query_entities(['Conversation'])
+                if msg_id in self.engine.get_component(owner.id, 'Conversation').data.get('message_ids', [])
+            ]
+
+        for owner_id in owner_ids:
+            conversation = self.engine.get_component(owner_id, 'Conversation')
+            if not conversation:
+                continue
+
+            # Dropping the cache makes the next read rebuild it from the messages;
+            # the update also bumps the Conversation version that keys the chat display
+            data = dict(conversation.data)
+            data.pop('history_cache', None)
+            self.engine.update_component(owner_id, 'Conversation', data)
+            logger.info(f"Invalidated conversation history cache for {owner_id} (message {msg_id} changed)")
+
     def on_character_form_submitted(self, event: Event) -> None:
         """Handle character creation - generate AI intro if scenario_type is 'ai_generated'."""
         if not hasattr(self, 'engine'):
@@ -156,7 +200,8 @@ class AIDMModule(Module):
         Register Flask blueprint for AI DM API endpoints.
 
         Provides REST API endpoints for DM chat and interaction:
-        - POST /api/dm/message          - Send message to DM
+        - POST /api/dm/message          - Send message to DM (SSE if requested)
+        - POST /api/dm/message_stream   - Send message, stream DM reply via SSE
         - GET  /api/dm/chat_display/:id - Get chat HTML
         - POST /api/dm/execute_action   - Execute suggested action
         """
@@ -167,6 +212,5 @@ class AIDMModule(Module):
 __all__ = [
     'AIDMModule',
     'ChatMessageComponent',
-    'ConversationComponent',
-    'DMDisplayComponent'
+    'ConversationComponent'
 ]
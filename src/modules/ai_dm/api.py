@@ -8,10 +8,26 @@ Provides REST API endpoints and pages for DM chat and interaction:
 - POST /api/dm/execute_action   - Execute suggested action
 """
 
+import json
+import jsonschema
 import logging
-from datetime import datetime
-from flask import Blueprint, jsonify, request, session, current_app, render_template, redirect, url_for, flash
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timezone
+from flask import (
+    Blueprint, Response, jsonify, request, session, current_app, render_template,
+    redirect, url_for, flash, make_response, stream_with_context
+)
+from src.core.config import get_config
+from src.core.models import Component, generate_id
 from src.core.module_loader import ModuleLoader
+from .llm_client import get_shared_llm_client, get_llm_semaphore, LLMError
+from .prompts import build_full_prompt, build_cached_message_history
+from .response_parser import parse_dm_response, get_fallback_actions
+from .tools import execute_tool, get_anthropic_tools
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +35,102 @@ logger = logging.getLogger(__name__)
 # Note: We use both /dm (for pages) and /api/dm (for API endpoints)
 ai_dm_bp = Blueprint('ai_dm', __name__, template_folder='templates')
 
+
+@ai_dm_bp.record_once
+def prewarm_llm_client(state):
+    """
+    Create the shared LLM client when the blueprint is registered.
+
+    Moves the SDK import and client setup to server startup instead of the
+    first DM turn. A missing API key or SDK is only logged here; requests
+    report it when they need the client.
+
+    Args:
+        state: Flask BlueprintSetupState (unused)
+    """
+    try:
+        get_shared_llm_client()
+    except (LLMError, ImportError) as e:
+        logger.warning(f"⚠️  LLM client not initialized at startup: {e}")
+
+
 # Cache for initialized modules per world
 _world_modules_cache = {}
 
+# Per-world locks serializing first-time module initialization, so concurrent
+# requests don't initialize (and subscribe event handlers) twice while
+# other worlds keep loading independently. _world_locks_guard protects the dict.
+_world_modules_locks = {}
+_world_locks_guard = threading.Lock()
+
+# Number of recent messages kept in the Conversation history cache
+# (comfortably above the window used by build_message_history)
+HISTORY_CACHE_LIMIT = 40
+
+# Streamed tokens are coalesced into one SSE frame until either limit is reached
+SSE_TOKEN_BATCH_CHARS = 50
+SSE_TOKEN_BATCH_SECONDS = 0.05
+
+# JSON schemas for request bodies (validators are built once, below)
+MESSAGE_REQUEST_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'entity_id': {'type': 'string', 'minLength': 1},
+        'message': {'type': 'string', 'minLength': 1},
+        'skip_player_message': {'type': 'boolean'}
+    },
+    'required': ['entity_id', 'message']
+}
+
+GENERATE_INTRO_REQUEST_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'entity_id': {'type': 'string', 'minLength': 1}
+    },
+    'required': ['entity_id']
+}
+
+EXECUTE_ACTION_REQUEST_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'entity_id': {'type': 'string', 'minLength': 1},
+        'action_type': {'type': 'string', 'enum': ['roll_dice', 'custom']},
+        'action_data': {'type': 'object'}
+    },
+    'required': ['entity_id', 'action_type']
+}
+
+_message_request_validator = jsonschema.Draft7Validator(MESSAGE_REQUEST_SCHEMA)
+_generate_intro_request_validator = jsonschema.Draft7Validator(GENERATE_INTRO_REQUEST_SCHEMA)
+_execute_action_request_validator = jsonschema.Draft7Validator(EXECUTE_ACTION_REQUEST_SCHEMA)
+
+# (world, entity) pairs with a DM turn currently being generated
+_turns_in_flight = set()
+_turns_in_flight_lock = threading.Lock()
+TURN_IN_PROGRESS_ERROR = 'The DM is still responding to this character'
+
+# Send an SSE comment after this much silence so proxies/browsers keep the stream open
+SSE_KEEPALIVE_SECONDS = 15
+
+# Send a 'queued' event if a stream waits this long for a free LLM slot
+LLM_QUEUE_NOTICE_SECONDS = 0.2
+
+# Rendered chat HTML per (world, entity, show_all): (etag, html), least recently used first
+_chat_html_cache = OrderedDict()
+CHAT_HTML_CACHE_SIZE = 128
+
+# Number of recent messages shown in the chat view (older ones load on request)
+CHAT_DISPLAY_LIMIT = 50
+
+# Hardcoded UI preferences for the chat templates (no component needed)
+CHAT_UI_SETTINGS = {
+    'show_suggested_actions': True,
+    'show_timestamps': True
+}
+
+# Shared compact encoder for SSE payloads (avoids per-event encoder setup)
+_json_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
 
 def get_engine():
     """Get the cached StateEngine for the current world."""
@@ -39,10 +148,17 @@ def get_engine():
 def ensure_modules_loaded():
     """Ensure modules are loaded for the current world."""
     world_name = session.get('world_name')
-    if not world_name:
+    if not world_name or world_name in _world_modules_cache:
         return
 
-    if world_name not in _world_modules_cache:
+    with _world_locks_guard:
+        world_lock = _world_modules_locks.setdefault(world_name, threading.Lock())
+
+    with world_lock:
+        # Another request may have finished loading while we waited
+        if world_name in _world_modules_cache:
+            return
+
         world_path = session.get('world_path')
         engine = get_engine()
 
@@ -60,6 +176,436 @@ def ensure_modules_loaded():
         logger.info(f"✓ Modules loaded for AI DM: {world_name}")
 
 
+def world_has_module(module_name: str) -> bool:
+    """
+    Check whether a module is loaded for the current world.
+
+    Args:
+        module_name: Module name (e.g. 'rng')
+
+    Returns:
+        True if ensure_modules_loaded() loaded the module for this world
+    """
+    modules = _world_modules_cache.get(session.get('world_name'), [])
+    return any(module.name == module_name for module in modules)
+
+
+def parse_request_json(validator):
+    """
+    Parse and validate the current request's JSON body.
+
+    Args:
+        validator: Pre-built jsonschema validator for the request body
+
+    Returns:
+        Tuple of (data, error). data is None and error describes the
+        problem if the body is missing or invalid.
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        return None, 'Request body must be JSON'
+
+    error = jsonschema.exceptions.best_match(validator.iter_errors(data))
+    if error:
+        return None, f"Invalid request: {error.message}"
+
+    return data, None
+
+
+def load_chat_messages(engine, message_ids):
+    """
+    Load ChatMessage data for a list of message IDs with one bulk query.
+
+    Args:
+        engine: StateEngine instance
+        message_ids: Ordered list of message entity IDs
+
+    Returns:
+        List of {'id', 'data'} dicts in the given order, skipping deleted
+        messages and IDs without a ChatMessage component
+    """
+    components = engine.get_components_bulk(message_ids, 'ChatMessage')
+    return [
+        {'id': msg_id, 'data': components[msg_id].data}
+        for msg_id in message_ids
+        if msg_id in components
+    ]
+
+
+def get_chat_template(name: str):
+    """
+    Get a chat template, compiled and looked up once per app.
+
+    Flask's render_template accepts Template objects (context processors
+    still run), so this only skips the per-render Jinja lookup. While the
+    app auto-reloads templates (debug mode) the name is returned instead.
+
+    Args:
+        name: Template name (e.g. 'dm_chat_messages.html')
+
+    Returns:
+        Cached jinja2 Template, or the name if templates auto-reload
+    """
+    jinja_env = current_app.jinja_env
+    if jinja_env.auto_reload:
+        return name
+
+    templates = current_app.extensions.setdefault('ai_dm_templates', {})
+    template = templates.get(name)
+    if template is None:
+        template = templates[name] = jinja_env.get_template(name)
+    return template
+
+
+def load_chat_window(engine, message_ids, show_all=False):
+    """
+    Load the ChatMessages shown in the chat view.
+
+    Only the most recent CHAT_DISPLAY_LIMIT messages are loaded unless
+    show_all is set, so long conversations don't load their whole
+    history on every page view.
+
+    Args:
+        engine: StateEngine instance
+        message_ids: Conversation message IDs in chronological order
+        show_all: Load every message instead of the recent window
+
+    Returns:
+        Tuple of (messages as returned by load_chat_messages, number of older messages not loaded)
+    """
+    visible_ids = message_ids if show_all else message_ids[-CHAT_DISPLAY_LIMIT:]
+    return load_chat_messages(engine, visible_ids), len(message_ids) - len(visible_ids)
+
+
+def get_or_create_conversation(engine, entity_id):
+    """
+    Get an entity's Conversation component, creating it if missing.
+
+    A newly created component is taken from add_component's result rather
+    than read back from storage.
+
+    Args:
+        engine: StateEngine instance
+        entity_id: ID of the character entity
+
+    Returns:
+        Tuple of (Conversation component, error). The component is None and
+        error holds the reason if it couldn't be created.
+    """
+    conversation = engine.get_component(entity_id, 'Conversation')
+    if conversation:
+        return conversation, None
+
+    result = engine.add_component(entity_id, 'Conversation', {
+        'message_ids': [],
+        'active': True
+    })
+    if not result.success:
+        return None, result.error
+    return Component.from_dict(result.data), None
+
+
+def get_conversation_history(engine, conversation_data):
+    """
+    Get the cached message history for a conversation.
+
+    The Conversation component keeps a denormalized ``history_cache`` of
+    the most recent {speaker, message} pairs so building LLM context does
+    not require loading every ChatMessage entity. Conversations created
+    before the cache existed are rebuilt once from their message entities.
+
+    Args:
+        engine: StateEngine instance
+        conversation_data: Conversation component data (updated in place)
+
+    Returns:
+        List of {speaker, message} dicts in chronological order
+    """
+    history = conversation_data.get('history_cache')
+    if history is None:
+        message_ids = conversation_data.get('message_ids', [])[-HISTORY_CACHE_LIMIT:]
+        history = [
+            {
+                'speaker': msg['data'].get('speaker', 'unknown'),
+                'message': msg['data'].get('message', '')
+            }
+            for msg in load_chat_messages(engine, message_ids)
+        ]
+        conversation_data['history_cache'] = history
+    return history
+
+
+def append_conversation_message(engine, entity_id, conversation_data, msg_id, chat_data, save=True,
+                                unsaved_ids=()):
+    """
+    Append a ChatMessage to a conversation and persist the Conversation.
+
+    Args:
+        engine: StateEngine instance
+        entity_id: ID of the entity owning the conversation
+        conversation_data: Conversation component data (updated in place)
+        msg_id: ID of the new message entity
+        chat_data: ChatMessage component data of the new message
+        save: If False, only update conversation_data in memory so several
+              messages of one turn can be persisted with a single write
+        unsaved_ids: IDs of earlier messages appended with save=False, to be
+                     persisted together with this one
+
+    Returns:
+        Result of the Conversation update (None if save is False)
+    """
+    history = get_conversation_history(engine, conversation_data)
+    history.append({
+        'speaker': chat_data['speaker'],
+        'message': chat_data['message']
+    })
+    del history[:-HISTORY_CACHE_LIMIT]
+
+    conversation_data.setdefault('message_ids', []).append(msg_id)
+    conversation_data['last_message_time'] = chat_data['timestamp']
+
+    if not save:
+        return None
+    return save_conversation_messages(engine, entity_id, conversation_data, [*unsaved_ids, msg_id])
+
+
+def save_conversation_messages(engine, entity_id, conversation_data, message_ids):
+    """
+    Persist messages appended to a conversation in memory.
+
+    Only the new IDs are appended in storage, next to the bounded history
+    cache and last message time, so saving a turn doesn't rewrite (or log
+    an event with) the conversation's whole message list.
+
+    The history cache is re-read at save time rather than written back from
+    conversation_data: a message edited or deleted while the LLM was
+    responding drops the stored cache (see on_chat_message_changed), and the
+    snapshot taken at the start of the turn must not resurrect it. The new
+    entries are appended to the stored cache, or the cache is rebuilt from
+    the message entities if it is gone.
+
+    Args:
+        engine: StateEngine instance
+        entity_id: ID of the entity owning the conversation
+        conversation_data: Conversation component data, as updated by
+                           append_conversation_message (its history_cache
+                           is refreshed to what gets saved)
+        message_ids: Appended message IDs not yet saved, in order
+
+    Returns:
+        Result of the Conversation append
+    """
+    stored = engine.get_component(entity_id, 'Conversation')
+    stored_data = stored.data if stored else {}
+    history = stored_data.get('history_cache')
+    if history is None:
+        # Never built, or invalidated since the turn started
+        history = get_conversation_history(
+            engine, {'message_ids': [*stored_data.get('message_ids', []), *message_ids]}
+        )
+    else:
+        history = (history + conversation_data['history_cache'][-len(message_ids):])[-HISTORY_CACHE_LIMIT:]
+    conversation_data['history_cache'] = history
+
+    return engine.append_to_component_list(
+        entity_id, 'Conversation', 'message_ids', message_ids,
+        updates={
+            'history_cache': history,
+            'last_message_time': conversation_data['last_message_time']
+        }
+    )
+
+
+def claim_turn(turn_key):
+    """
+    Mark a DM turn as in progress for a character.
+
+    One turn per character at a time, across the JSON and streaming
+    endpoints: a second submission while a reply is being generated would
+    start a duplicate LLM call, and the two turns would interleave their
+    Conversation updates.
+
+    Args:
+        turn_key: (world name, entity ID) of the character
+
+    Returns:
+        True if the turn was claimed, False if one is already in progress
+    """
+    with _turns_in_flight_lock:
+        if turn_key in _turns_in_flight:
+            return False
+        _turns_in_flight.add(turn_key)
+        return True
+
+
+def release_turn(turn_key):
+    """Mark a character's DM turn as finished (see claim_turn)."""
+    with _turns_in_flight_lock:
+        _turns_in_flight.discard(turn_key)
+
+
+def chat_timestamp():
+    """Get the current UTC time as an ISO 8601 ChatMessage timestamp."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+def format_sse(event):
+    """Format an event dict as a Server-Sent Events frame."""
+    # Token events are by far the most frequent - only their content needs encoding
+    if event.get('type') == 'token' and len(event) == 2:
+        return f'data: {{"type":"token","content":{_json_encode(event["content"])}}}\n\n'
+    return f"data: {_json_encode(event)}\n\n"
+
+
+# Constant SSE frames, encoded once
+SSE_CONVERSATION_FAILED = format_sse({'type': 'error', 'error': 'Failed to create conversation'})
+SSE_MESSAGE_FAILED = format_sse({'type': 'error', 'error': 'Failed to create message entity'})
+SSE_SAVE_FAILED = format_sse({'type': 'error', 'error': 'Failed to save DM response'})
+SSE_KEEPALIVE = ": keepalive\n\n"
+SSE_TURN_IN_PROGRESS = format_sse({'type': 'error', 'error': TURN_IN_PROGRESS_ERROR})
+
+
+def batch_token_events(events):
+    """
+    Coalesce consecutive token events into larger batches.
+
+    Token events are buffered until SSE_TOKEN_BATCH_CHARS characters or
+    SSE_TOKEN_BATCH_SECONDS seconds have accumulated, so long responses are
+    sent as a few dozen frames instead of one per LLM token. Any other event
+    flushes the buffer first and is passed through unchanged.
+
+    Args:
+        events: Iterable of events from multi_turn_streaming_handler
+
+    Yields:
+        The same events, with runs of token events merged
+    """
+    buffer = []
+    buffered_chars = 0
+    last_flush = time.monotonic()
+
+    for event in events:
+        if isinstance(event, dict) and event.get('type') == 'token':
+            buffer.append(event['content'])
+            buffered_chars += len(event['content'])
+            if (buffered_chars >= SSE_TOKEN_BATCH_CHARS or
+                    time.monotonic() - last_flush >= SSE_TOKEN_BATCH_SECONDS):
+                yield {'type': 'token', 'content': ''.join(buffer)}
+                buffer = []
+                buffered_chars = 0
+                last_flush = time.monotonic()
+            continue
+
+        if buffer:
+            yield {'type': 'token', 'content': ''.join(buffer)}
+            buffer = []
+            buffered_chars = 0
+            last_flush = time.monotonic()
+        yield event
+
+    if buffer:
+        yield {'type': 'token', 'content': ''.join(buffer)}
+
+
+def stream_with_heartbeats(stream, interval=None):
+    """
+    Read an LLM stream in the background, yielding heartbeats while it is silent.
+
+    The provider stream is consumed by a reader thread (a green thread
+    under eventlet) through a queue. Whenever nothing arrives for
+    ``interval`` seconds - slow time to first token, or the model
+    thinking between tool rounds - a ``{'type': 'heartbeat'}`` event is
+    yielded so the caller can keep the SSE connection alive.
+
+    Only the provider stream moves to the reader thread; tool execution
+    stays on the request thread, which owns the SQLite connection.
+
+    Closing the generator (client disconnect) aborts the provider stream
+    from the closing side when it supports abort() (LLMStream does), so the
+    upstream request ends even if the reader is blocked mid-silence. The
+    close itself never waits for the reader.
+
+    Args:
+        stream: Iterator of chunks from generate_response_stream
+        interval: Seconds of silence before a heartbeat
+                  (default: SSE_KEEPALIVE_SECONDS)
+
+    Yields:
+        The stream's chunks, plus heartbeat events during silences
+
+    Raises:
+        Whatever the stream raises (e.g. LLMError), on the caller's thread
+    """
+    if interval is None:
+        interval = SSE_KEEPALIVE_SECONDS
+
+    chunks = queue.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def read():
+        try:
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                chunks.put((chunk, None))
+        except Exception as e:
+            chunks.put((None, e))
+        finally:
+            # Runs on the reader thread, which owns the stream
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+            chunks.put((finished, None))
+
+    reader = threading.Thread(target=read, name='llm-stream-reader', daemon=True)
+    reader.start()
+    try:
+        while True:
+            try:
+                chunk, error = chunks.get(timeout=interval)
+            except queue.Empty:
+                yield {'type': 'heartbeat'}
+                continue
+            if error is not None:
+                raise error
+            if chunk is finished:
+                return
+            yield chunk
+    finally:
+        stop.set()
+        abort = getattr(stream, 'abort', None)
+        if abort and reader.is_alive():
+            # The reader may be blocked waiting on the provider; closing the
+            # SDK stream from here ends the upstream request right away
+            abort()
+
+
+def throttle_heartbeats(events):
+    """
+    Pass events through, keeping only heartbeats that follow a long silence.
+
+    Heartbeats come from two sources: stream_with_heartbeats while the
+    provider sends nothing, and the streaming handler for each piece of
+    tool input the model writes (the provider is busy, but no text reaches
+    the client). One heartbeat per SSE_KEEPALIVE_SECONDS of silence is
+    enough to keep proxies and browsers from timing out the stream.
+
+    Args:
+        events: Iterable of events (e.g. from batch_token_events)
+
+    Yields:
+        The same events, minus heartbeats sent too soon after another event
+    """
+    last_sent = time.monotonic()
+    for event in events:
+        now = time.monotonic()
+        if event.get('type') == 'heartbeat' and now - last_sent < SSE_KEEPALIVE_SECONDS:
+            continue
+        last_sent = now
+        yield event
+
+
 def multi_turn_streaming_handler(
     llm_messages,
     system_prompt,
@@ -89,10 +635,12 @@ def multi_turn_streaming_handler(
         tools: Tool definitions for the LLM
         config: Configuration object with AI settings
         max_turns: Maximum number of turns (default 10)
-        stream_to_client: If True, yields SSE events for frontend streaming
+        stream_to_client: If True, yields stream events for frontend streaming
 
     Yields:
-        If stream_to_client=True: SSE event strings (data: {...}\n\n)
+        If stream_to_client=True: event dicts ({'type': 'token', ...}) to be
+        sent to the client as SSE frames (see format_sse), plus
+        {'type': 'heartbeat'} while the LLM is silent or generating tool input
 
     Returns:
         dict with keys:
@@ -101,10 +649,6 @@ def multi_turn_streaming_handler(
             - suggested_actions: List of suggested action dicts
             - tool_uses_count: Total number of tools used across all turns
     """
-    import json
-    from .tools import execute_tool
-    from .response_parser import parse_dm_response
-
     def ends_with_partial_tag(text: str) -> int:
         """
         Check if text ends with a partial <actions> or </actions> tag.
@@ -131,96 +675,113 @@ def multi_turn_streaming_handler(
         in_actions_block = False
         buffer = ""
         current_tool = None
-        tool_input_json = ""
+        tool_input_parts = []  # partial_json fragments, joined once per tool
         tool_uses = []
 
-        for chunk in llm_client.generate_response_stream(
+        llm_stream = llm_client.generate_response_stream(
             messages=llm_messages,
             system=system_prompt,
             max_tokens=config.ai_max_tokens,
             temperature=config.ai_temperature if turn_number == 1 else config.ai_temperature,
             tools=tools if tools else None
-        ):
-            if chunk['type'] == 'text':
-                content = chunk['content']
-                full_response += content
-
-                # Combine buffer with new content to detect tags across boundaries
-                combined = buffer + content
-
-                # Filter out <actions> block from streaming
-                # Handle case where entire block is in combined content
-                if '<actions>' in combined and '</actions>' in combined:
-                    # Complete actions block - remove it entirely
-                    before = combined.split('<actions>')[0]
-                    after = combined.split('</actions>')[-1]
-                    filtered = before + after
-                    if filtered.strip() and stream_to_client:
-                        yield f"data: {json.dumps({'type': 'token', 'content': filtered})}\n\n"
-                    buffer = ""
-                elif '<actions>' in combined:
-                    # Opening tag - start filtering
-                    in_actions_block = True
-                    before_actions = combined.split('<actions>')[0]
-                    if before_actions and stream_to_client:
-                        yield f"data: {json.dumps({'type': 'token', 'content': before_actions})}\n\n"
-                    buffer = ""
-                elif '</actions>' in combined:
-                    # Closing tag - stop filtering
-                    in_actions_block = False
-                    after_actions = combined.split('</actions>')[-1]
-                    if after_actions and stream_to_client:
-                        yield f"data: {json.dumps({'type': 'token', 'content': after_actions})}\n\n"
-                    buffer = ""
-                elif not in_actions_block:
-                    # Normal content - check if combined ends with partial tag
-                    holdback_len = ends_with_partial_tag(combined)
-
-                    # Stream everything except potential partial tag
-                    if len(combined) > holdback_len:
-                        to_stream = combined[:len(combined) - holdback_len]
-                        if to_stream and stream_to_client:
-                            yield f"data: {json.dumps({'type': 'token', 'content': to_stream})}\n\n"
-
-                    # Keep potential partial tag in buffer
-                    buffer = combined[-holdback_len:] if holdback_len > 0 else ""
-                else:
-                    # Inside actions block, skip streaming
-                    buffer = ""
-
-            elif chunk['type'] == 'tool_use_start':
-                # Save previous tool if exists
-                if current_tool and tool_input_json:
-                    try:
-                        tool_uses.append({
-                            'id': current_tool['id'],
-                            'name': current_tool['name'],
-                            'input': json.loads(tool_input_json)
-                        })
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse tool input for {current_tool['name']}")
-
-                # Start new tool
-                current_tool = {
-                    'id': chunk['tool_use_id'],
-                    'name': chunk['tool_name']
-                }
-                tool_input_json = ""
-
-                # Notify frontend if streaming
-                if stream_to_client:
-                    yield f"data: {json.dumps({'type': 'tool_start', 'tool_name': chunk['tool_name']})}\n\n"
-                logger.info(f"Turn {turn_number} - AI using tool: {chunk['tool_name']}")
-
-            elif chunk['type'] == 'tool_input_delta':
-                # Accumulate tool input JSON
-                tool_input_json += chunk['partial_json']
+        )
+        if stream_to_client:
+            # Timer-driven keepalives while waiting on the provider
+            llm_stream = stream_with_heartbeats(llm_stream)
+
+        # Closed explicitly so an abandoned handler (client disconnect) also
+        # closes the upstream HTTP stream instead of letting it run on
+        with closing(llm_stream) as stream:
+            for chunk in stream:
+                if chunk['type'] == 'heartbeat':
+                    yield chunk
+
+                elif chunk['type'] == 'text':
+                    content = chunk['content']
+                    full_response += content
+
+                    # Combine buffer with new content to detect tags across boundaries
+                    combined = buffer + content
+
+                    # Filter out <actions> block from streaming
+                    # Handle case where entire block is in combined content
+                    if '<actions>' in combined and '</actions>' in combined:
+                        # Complete actions block - remove it entirely
+                        before = combined.partition('<actions>')[0]
+                        after = combined.rpartition('</actions>')[2]
+                        filtered = before + after
+                        if filtered.strip() and stream_to_client:
+                            yield {'type': 'token', 'content': filtered}
+                        buffer = ""
+                    elif '<actions>' in combined:
+                        # Opening tag - start filtering
+                        in_actions_block = True
+                        before_actions = combined.partition('<actions>')[0]
+                        if before_actions and stream_to_client:
+                            yield {'type': 'token', 'content': before_actions}
+                        buffer = ""
+                    elif '</actions>' in combined:
+                        # Closing tag - stop filtering
+                        in_actions_block = False
+                        after_actions = combined.rpartition('</actions>')[2]
+                        if after_actions and stream_to_client:
+                            yield {'type': 'token', 'content': after_actions}
+                        buffer = ""
+                    elif not in_actions_block:
+                        # Normal content - check if combined ends with partial tag
+                        holdback_len = ends_with_partial_tag(combined)
+
+                        # Stream everything except potential partial tag
+                        if len(combined) > holdback_len:
+                            to_stream = combined[:len(combined) - holdback_len]
+                            if to_stream and stream_to_client:
+                                yield {'type': 'token', 'content': to_stream}
+
+                        # Keep potential partial tag in buffer
+                        buffer = combined[-holdback_len:] if holdback_len > 0 else ""
+                    else:
+                        # Inside actions block, skip streaming
+                        buffer = ""
+
+                elif chunk['type'] == 'tool_use_start':
+                    # Save previous tool if exists
+                    tool_input_json = ''.join(tool_input_parts)
+                    if current_tool and tool_input_json:
+                        try:
+                            tool_uses.append({
+                                'id': current_tool['id'],
+                                'name': current_tool['name'],
+                                'input': json.loads(tool_input_json)
+                            })
+                        except json.JSONDecodeError:
+                            logger.error(f"Failed to parse tool input for {current_tool['name']}")
+
+                    # Start new tool
+                    current_tool = {
+                        'id': chunk['tool_use_id'],
+                        'name': chunk['tool_name']
+                    }
+                    tool_input_parts = []
+
+                    # Notify frontend if streaming
+                    if stream_to_client:
+                        yield {'type': 'tool_start', 'tool_name': chunk['tool_name']}
+                    logger.info(f"Turn {turn_number} - AI using tool: {chunk['tool_name']}")
+
+                elif chunk['type'] == 'tool_input_delta':
+                    # Accumulate tool input JSON
+                    tool_input_parts.append(chunk['partial_json'])
+
+                    # Nothing visible is streamed while the model writes tool input
+                    if stream_to_client:
+                        yield {'type': 'heartbeat'}
 
         # Flush any remaining buffer content
         if buffer and not in_actions_block and stream_to_client:
-            yield f"data: {json.dumps({'type': 'token', 'content': buffer})}\n\n"
+            yield {'type': 'token', 'content': buffer}
 
         # Save last tool
+        tool_input_json = ''.join(tool_input_parts)
         if current_tool and tool_input_json:
             try:
                 tool_uses.append({
@@ -256,11 +817,11 @@ def multi_turn_streaming_handler(
                 })
                 logger.info(f"  Result: {result['success']} - {result['message']}")
                 if stream_to_client:
-                    yield f"data: {json.dumps({'type': 'tool_result', 'tool_name': tool_use['name'], 'success': result['success']})}\n\n"
+                    yield {'type': 'tool_result', 'tool_name': tool_use['name'], 'success': result['success']}
             except Exception as e:
                 logger.error(f"Tool execution failed: {e}")
                 if stream_to_client:
-                    yield f"data: {json.dumps({'type': 'error', 'error': f'Tool execution failed: {str(e)}'})}\n\n"
+                    yield {'type': 'error', 'error': f'Tool execution failed: {str(e)}'}
 
         # Prepare next turn with tool results
         tool_result_content = []
@@ -318,13 +879,6 @@ def generate_intro_for_character(engine, entity_id, scenario_suggestion=None):
     Returns:
         dict with keys: success, message_id, intro_text, starting_location_id, error
     """
-    import json
-    from .llm_client import get_llm_client, LLMError
-    from .prompts import build_full_prompt
-    from .response_parser import parse_dm_response
-    from .tools import get_tool_definitions, execute_tool
-    from src.core.config import get_config
-
     try:
         # Verify entity exists
         entity = engine.get_entity(entity_id)
@@ -332,16 +886,12 @@ def generate_intro_for_character(engine, entity_id, scenario_suggestion=None):
             return {'success': False, 'error': f'Entity {entity_id} not found'}
 
         # Create Conversation component if missing
-        conversation = engine.get_component(entity_id, 'Conversation')
-        if not conversation:
-            result = engine.add_component(entity_id, 'Conversation', {
-                'message_ids': []
-            })
-            if not result.success:
-                return {'success': False, 'error': f'Failed to create conversation: {result.error}'}
+        conversation, error = get_or_create_conversation(engine, entity_id)
+        if error:
+            return {'success': False, 'error': f'Failed to create conversation: {error}'}
 
         # Build context and generate intro
-        ai_context = engine.generate_ai_context(entity_id)
+        ai_context = engine.generate_ai_context(entity_id, include_history=False)
         full_system_prompt = build_full_prompt(ai_context)
 
         # Build intro prompt with optional user suggestion
@@ -396,17 +946,8 @@ def generate_intro_for_character(engine, entity_id, scenario_suggestion=None):
         )
 
         config = get_config()
-        llm = get_llm_client(config)
-        tools = get_tool_definitions()
-
-        # Convert tools to Anthropic format
-        anthropic_tools = []
-        for tool in tools:
-            anthropic_tools.append({
-                "name": tool["name"],
-                "description": tool["description"],
-                "input_schema": tool["input_schema"]
-            })
+        llm = get_shared_llm_client()
+        anthropic_tools = get_anthropic_tools()
 
         logger.info("=== Starting AI intro generation ===")
         logger.info(f"Entity: {entity_id}")
@@ -419,18 +960,19 @@ def generate_intro_for_character(engine, entity_id, scenario_suggestion=None):
         # Note: stream_to_client=False since intro generation doesn't stream to frontend
         # The handler is a generator, so we consume it to get the final result
         result = None
-        for event in multi_turn_streaming_handler(
-            llm_messages=llm_messages,
-            system_prompt=full_system_prompt,
-            llm_client=llm,
-            engine=engine,
-            entity_id=entity_id,
-            tools=anthropic_tools,
-            config=config,
-            max_turns=10,
-            stream_to_client=False
-        ):
-            result = event  # The final event is the result dict
+        with get_llm_semaphore():
+            for event in multi_turn_streaming_handler(
+                llm_messages=llm_messages,
+                system_prompt=full_system_prompt,
+                llm_client=llm,
+                engine=engine,
+                entity_id=entity_id,
+                tools=anthropic_tools,
+                config=config,
+                max_turns=10,
+                stream_to_client=False
+            ):
+                result = event  # The final event is the result dict
 
         intro_text = result['narrative']
         intro_actions = result['suggested_actions']
@@ -442,21 +984,20 @@ def generate_intro_for_character(engine, entity_id, scenario_suggestion=None):
 
         dm_msg_id = dm_msg_result.data['id']
 
-        engine.add_component(dm_msg_id, 'ChatMessage', {
+        dm_msg_data = {
             'speaker': 'dm',
             'speaker_name': 'Dungeon Master',
+            'conversation_id': entity_id,
             'message': intro_text,
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': chat_timestamp(),
             'suggested_actions': intro_actions
-        })
+        }
+        engine.add_component(dm_msg_id, 'ChatMessage', dm_msg_data)
 
         # Add to conversation
         conversation = engine.get_component(entity_id, 'Conversation')
-        message_ids = conversation.data.get('message_ids', []) if conversation else []
-        message_ids.append(dm_msg_id)
-        engine.update_component(entity_id, 'Conversation', {
-            'message_ids': message_ids
-        })
+        if conversation:
+            append_conversation_message(engine, entity_id, conversation.data, dm_msg_id, dm_msg_data)
 
         logger.info(f"Generated AI intro for character {entity_id}")
 
@@ -540,39 +1081,24 @@ def dm_chat_page(entity_id: str):
             return redirect(url_for('client.index'))
 
         # Get or create Conversation component
-        conversation = engine.get_component(entity_id, 'Conversation')
-        if not conversation:
-            engine.add_component(entity_id, 'Conversation', {
-                'message_ids': [],
-                'active': True
-            })
-            conversation = engine.get_component(entity_id, 'Conversation')
+        conversation, _ = get_or_create_conversation(engine, entity_id)
 
-        # Get conversation messages
+        # Get conversation messages (recent window unless ?history=all)
         messages = []
+        hidden_count = 0
         if conversation:
-            message_ids = conversation.data.get('message_ids', [])
-            for msg_id in message_ids:
-                msg_entity = engine.get_entity(msg_id)
-                if msg_entity and msg_entity.is_active():
-                    msg_comp = engine.get_component(msg_id, 'ChatMessage')
-                    if msg_comp:
-                        messages.append({
-                            'id': msg_id,
-                            'data': msg_comp.data
-                        })
-
-        # Hardcoded UI preferences (no component needed)
-        ui_settings = {
-            'show_suggested_actions': True,
-            'show_timestamps': True
-        }
+            messages, hidden_count = load_chat_window(
+                engine,
+                conversation.data.get('message_ids', []),
+                show_all=request.args.get('history') == 'all'
+            )
 
         return render_template(
-            'dm_chat.html',
+            get_chat_template('dm_chat.html'),
             entity=entity,
             messages=messages,
-            ui_settings=ui_settings
+            hidden_count=hidden_count,
+            ui_settings=CHAT_UI_SETTINGS
         )
 
     except Exception as e:
@@ -603,167 +1129,166 @@ def api_send_message():
                 "suggested_actions": [...]
             }
         }
+
+    Clients sending "Accept: text/event-stream" get the streamed response
+    from send_dm_message_stream instead of waiting for the full reply.
     """
+    if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream':
+        return send_dm_message_stream()
+
     try:
+        data, error = parse_request_json(_message_request_validator)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+
         ensure_modules_loaded()
         engine = get_engine()
 
-        data = request.get_json()
-        entity_id = data.get('entity_id')
-        message = data.get('message')
+        entity_id = data['entity_id']
+        message = data['message']
 
-        if not entity_id or not message:
+        turn_key = (session.get('world_name'), entity_id)
+        if not claim_turn(turn_key):
+            logger.warning(f"Rejecting duplicate DM turn for entity {entity_id}")
             return jsonify({
                 'success': False,
-                'error': 'Missing required fields: entity_id, message'
-            }), 400
+                'error': TURN_IN_PROGRESS_ERROR
+            }), 409
 
-        # Get or create Conversation component
-        conversation = engine.get_component(entity_id, 'Conversation')
-        if not conversation:
-            result = engine.add_component(entity_id, 'Conversation', {
-                'message_ids': [],
-                'active': True
-            })
-            if not result.success:
+        try:
+            # Get or create Conversation component
+            conversation, error = get_or_create_conversation(engine, entity_id)
+            if error:
                 return jsonify({
                     'success': False,
-                    'error': f'Failed to create conversation: {result.error}'
+                    'error': f'Failed to create conversation: {error}'
                 }), 500
-            conversation = engine.get_component(entity_id, 'Conversation')
 
-        # Create player message entity
-        entity = engine.get_entity(entity_id)
-        player_name = entity.name if entity else "Player"
+            # Create player message entity
+            entity = engine.get_entity(entity_id)
+            player_name = entity.name if entity else "Player"
 
-        player_msg_result = engine.create_entity(
-            f"Player message from {player_name}"
-        )
+            player_msg_result = engine.create_entity(
+                f"Player message from {player_name}"
+            )
 
-        if not player_msg_result.success:
-            return jsonify({
-                'success': False,
-                'error': f'Failed to create message entity: {player_msg_result.error}'
-            }), 500
-
-        player_msg_id = player_msg_result.data['id']
-
-        # Add ChatMessage component to player message
-        timestamp = datetime.utcnow().isoformat()
-        engine.add_component(player_msg_id, 'ChatMessage', {
-            'speaker': 'player',
-            'speaker_name': player_name,
-            'message': message,
-            'timestamp': timestamp
-        })
+            if not player_msg_result.success:
+                return jsonify({
+                    'success': False,
+                    'error': f'Failed to create message entity: {player_msg_result.error}'
+                }), 500
 
-        # Add message to conversation history
-        message_ids = conversation.data.get('message_ids', [])
-        message_ids.append(player_msg_id)
+            player_msg_id = player_msg_result.data['id']
 
-        engine.update_component(entity_id, 'Conversation', {
-            'message_ids': message_ids,
-            'last_message_time': timestamp
-        })
+            # Snapshot prior history before the new message is appended
+            conversation_messages = list(get_conversation_history(engine, conversation.data))
+            message_count = len(conversation.data.get('message_ids', []))
 
-        # ========== AI INTEGRATION ==========
-        # Generate DM response using LLM
+            # Add ChatMessage component to player message
+            player_msg_data = {
+                'speaker': 'player',
+                'speaker_name': player_name,
+                'conversation_id': entity_id,
+                'message': message,
+                'timestamp': chat_timestamp()
+            }
+            engine.add_component(player_msg_id, 'ChatMessage', player_msg_data)
 
-        try:
-            from .llm_client import get_llm_client, LLMError
-            from .prompts import build_full_prompt, build_message_history
-            from .response_parser import parse_dm_response, get_fallback_actions
-            from src.core.config import get_config
-
-            # Generate AI context from game state
-            logger.info(f"Generating AI context for entity {entity_id}")
-            ai_context = engine.generate_ai_context(entity_id)
-
-            # Get conversation history
-            conversation_messages = []
-            for msg_id in message_ids[:-1]:  # Exclude the message we just added
-                msg_entity = engine.get_entity(msg_id)
-                if msg_entity and msg_entity.is_active():
-                    msg_comp = engine.get_component(msg_id, 'ChatMessage')
-                    if msg_comp:
-                        conversation_messages.append(msg_comp.data)
-
-            # Build prompts
-            logger.info("Building prompts for LLM")
-            full_system_prompt = build_full_prompt(ai_context)
-            llm_messages = build_message_history(conversation_messages)
-
-            # Add current player message
-            llm_messages.append({'role': 'user', 'content': message})
-
-            # Get LLM client and generate response
-            logger.info("Calling LLM for DM response")
-            config = get_config()
-            llm = get_llm_client(config)
-
-            raw_response = llm.generate_response(
-                messages=llm_messages,
-                system=full_system_prompt,
-                max_tokens=config.ai_max_tokens,
-                temperature=config.ai_temperature
-            )
+            # Add message to conversation history (saved together with the DM reply)
+            append_conversation_message(engine, entity_id, conversation.data, player_msg_id, player_msg_data, save=False)
+
+            # ========== AI INTEGRATION ==========
+            # Generate DM response using LLM
+
+            try:
+                # Generate AI context from game state
+                logger.info(f"Generating AI context for entity {entity_id}")
+                # History is sent as LLM messages, not as part of the context
+                ai_context = engine.generate_ai_context(entity_id, include_history=False)
+
+                # Build prompts: the system prompt stays byte-identical across turns
+                # (game state rides with the user turn) so the provider's prompt
+                # cache covers it and the committed history
+                logger.info("Building prompts for LLM")
+                full_system_prompt = build_full_prompt(ai_context, include_game_state=False)
+                llm_messages = build_cached_message_history(
+                    conversation_messages, message, ai_context, total_messages=message_count
+                )
 
-            # Parse response
-            logger.info("Parsing LLM response")
-            dm_response_text, dm_suggested_actions = parse_dm_response(raw_response)
+                # Get LLM client and generate response
+                logger.info("Calling LLM for DM response")
+                config = get_config()
+                llm = get_shared_llm_client()
 
-            logger.info(f"AI response generated: {len(dm_response_text)} chars, "
-                       f"{len(dm_suggested_actions)} actions")
+                with get_llm_semaphore():
+                    raw_response = llm.generate_response(
+                        messages=llm_messages,
+                        system=full_system_prompt,
+                        max_tokens=config.ai_max_tokens,
+                        temperature=config.ai_temperature
+                    )
 
-        except LLMError as e:
-            logger.error(f"LLM error during DM response: {e}", exc_info=True)
-            dm_response_text = "The DM seems distracted for a moment... (AI temporarily unavailable)"
-            dm_suggested_actions = get_fallback_actions()
+                # Parse response
+                logger.info("Parsing LLM response")
+                dm_response_text, dm_suggested_actions = parse_dm_response(raw_response)
 
-        except Exception as e:
-            logger.error(f"Unexpected error during AI response generation: {e}", exc_info=True)
-            dm_response_text = "The DM pauses, gathering their thoughts... (An error occurred)"
-            dm_suggested_actions = get_fallback_actions()
+                logger.info(f"AI response generated: {len(dm_response_text)} chars, "
+                           f"{len(dm_suggested_actions)} actions")
 
-        # Create DM message entity
-        dm_msg_result = engine.create_entity(
-            "DM response"
-        )
+            except LLMError as e:
+                logger.error(f"LLM error during DM response: {e}", exc_info=True)
+                dm_response_text = "The DM seems distracted for a moment... (AI temporarily unavailable)"
+                dm_suggested_actions = get_fallback_actions()
 
-        if dm_msg_result.success:
-            dm_msg_id = dm_msg_result.data['id']
+            except Exception as e:
+                logger.error(f"Unexpected error during AI response generation: {e}", exc_info=True)
+                dm_response_text = "The DM pauses, gathering their thoughts... (An error occurred)"
+                dm_suggested_actions = get_fallback_actions()
 
-            engine.add_component(dm_msg_id, 'ChatMessage', {
-                'speaker': 'dm',
-                'speaker_name': 'Dungeon Master',
-                'message': dm_response_text,
-                'timestamp': datetime.utcnow().isoformat(),
-                'suggested_actions': dm_suggested_actions
-            })
+            # Create DM message entity
+            dm_msg_result = engine.create_entity(
+                "DM response"
+            )
 
-            # Add DM message to conversation
-            message_ids.append(dm_msg_id)
-            engine.update_component(entity_id, 'Conversation', {
-                'message_ids': message_ids,
-                'last_message_time': datetime.utcnow().isoformat()
-            })
+            if dm_msg_result.success:
+                dm_msg_id = dm_msg_result.data['id']
 
-            return jsonify({
-                'success': True,
-                'message_id': player_msg_id,
-                'dm_response': {
-                    'message_id': dm_msg_id,
+                dm_msg_data = {
+                    'speaker': 'dm',
+                    'speaker_name': 'Dungeon Master',
+                    'conversation_id': entity_id,
                     'message': dm_response_text,
+                    'timestamp': chat_timestamp(),
                     'suggested_actions': dm_suggested_actions
                 }
-            })
-        else:
-            # Player message sent but DM response failed
-            return jsonify({
-                'success': True,
-                'message_id': player_msg_id,
-                'dm_response': None
-            })
+                engine.add_component(dm_msg_id, 'ChatMessage', dm_msg_data)
+
+                # Add DM message to conversation (saving the player message with it)
+                append_conversation_message(engine, entity_id, conversation.data, dm_msg_id, dm_msg_data,
+                                            unsaved_ids=[player_msg_id])
+
+                return jsonify({
+                    'success': True,
+                    'message_id': player_msg_id,
+                    'dm_response': {
+                        'message_id': dm_msg_id,
+                        'message': dm_response_text,
+                        'suggested_actions': dm_suggested_actions
+                    }
+                })
+            else:
+                # Player message sent but DM response failed - still persist the player message
+                save_conversation_messages(engine, entity_id, conversation.data, [player_msg_id])
+                return jsonify({
+                    'success': True,
+                    'message_id': player_msg_id,
+                    'dm_response': None
+                })
+        finally:
+            release_turn(turn_key)
 
     except Exception as e:
         logger.error(f"Error sending DM message: {e}", exc_info=True)
@@ -793,189 +1318,210 @@ def send_dm_message_stream():
         ...
         data: {"type": "done", "message_id": "msg_456", "suggested_actions": [...]}
     """
-    import json
-    from flask import Response, stream_with_context
-
     def generate():
+        # Flush response headers right away; otherwise the client sees nothing
+        # until history loading and prompt building finish and a token arrives
+        yield ": ok\n\n"
+
         try:
+            data, error = parse_request_json(_message_request_validator)
+            if error:
+                yield format_sse({'type': 'error', 'error': error})
+                return
+
             ensure_modules_loaded()
             engine = get_engine()
 
-            data = request.get_json()
-            entity_id = data.get('entity_id')
-            message = data.get('message')
-            skip_player_message = data.get('skip_player_message', False)  # New flag
+            entity_id = data['entity_id']
+            message = data['message']
+            skip_player_message = data.get('skip_player_message', False)
 
-            if not entity_id or not message:
-                yield f"data: {json.dumps({'type': 'error', 'error': 'Missing required fields'})}\n\n"
+            turn_key = (session.get('world_name'), entity_id)
+            if not claim_turn(turn_key):
+                logger.warning(f"Rejecting duplicate DM turn for entity {entity_id}")
+                yield SSE_TURN_IN_PROGRESS
                 return
+            turn_claimed = True
 
-            # Get or create Conversation component
-            conversation = engine.get_component(entity_id, 'Conversation')
-            if not conversation:
-                result = engine.add_component(entity_id, 'Conversation', {
-                    'message_ids': [],
-                    'active': True
-                })
-                if not result.success:
-                    yield f"data: {json.dumps({'type': 'error', 'error': f'Failed to create conversation'})}\n\n"
+            try:
+                # Get or create Conversation component
+                conversation, error = get_or_create_conversation(engine, entity_id)
+                if error:
+                    yield SSE_CONVERSATION_FAILED
                     return
-                conversation = engine.get_component(entity_id, 'Conversation')
 
-            # Get message_ids from conversation (needed for both paths)
-            message_ids = conversation.data.get('message_ids', [])
+                # Snapshot prior history before any new message is appended.
+                # If we create a player message it is sent via player_message instead;
+                # if we skipped creating it, all stored messages are included.
+                conversation_messages = list(get_conversation_history(engine, conversation.data))
+                message_count = len(conversation.data.get('message_ids', []))
 
-            # Create player message entity (unless skip_player_message is true)
-            if not skip_player_message:
-                entity = engine.get_entity(entity_id)
-                player_name = entity.name if entity else "Player"
-
-                player_msg_result = engine.create_entity(f"Player message from {player_name}")
+                # Create player message entity (unless skip_player_message is true)
+                if not skip_player_message:
+                    entity = engine.get_entity(entity_id)
+                    player_name = entity.name if entity else "Player"
 
-                if not player_msg_result.success:
-                    yield f"data: {json.dumps({'type': 'error', 'error': 'Failed to create message entity'})}\n\n"
-                    return
-
-                player_msg_id = player_msg_result.data['id']
-
-                # Add ChatMessage component to player message
-                timestamp = datetime.utcnow().isoformat()
-                engine.add_component(player_msg_id, 'ChatMessage', {
-                    'speaker': 'player',
-                    'speaker_name': player_name,
-                    'message': message,
-                    'timestamp': timestamp
-                })
+                    player_msg_result = engine.create_entity(f"Player message from {player_name}")
 
-                # Add message to conversation history
-                message_ids.append(player_msg_id)
+                    if not player_msg_result.success:
+                        yield SSE_MESSAGE_FAILED
+                        return
 
-                engine.update_component(entity_id, 'Conversation', {
-                    'message_ids': message_ids,
-                    'last_message_time': timestamp
-                })
+                    player_msg_id = player_msg_result.data['id']
 
-            # Generate DM response using streaming LLM with tools
-            try:
-                from .llm_client import get_llm_client, LLMError
-                from .prompts import build_full_prompt, build_message_history
-                from .response_parser import parse_dm_response, get_fallback_actions
-                from .tools import get_tool_definitions, execute_tool
-                from src.core.config import get_config
-
-                logger.info(f"Generating streaming AI response for entity {entity_id}")
-                ai_context = engine.generate_ai_context(entity_id)
-
-                # Get conversation history
-                conversation_messages = []
-                # If we created a player message, exclude it from history (it'll be added via player_message param)
-                # If we skipped creating it, include all messages
-                msg_list = message_ids[:-1] if not skip_player_message else message_ids
-                for msg_id in msg_list:
-                    msg_entity = engine.get_entity(msg_id)
-                    if msg_entity and msg_entity.is_active():
-                        msg_comp = engine.get_component(msg_id, 'ChatMessage')
-                        if msg_comp:
-                            conversation_messages.append(msg_comp.data)
-
-                # Build prompts
-                full_system_prompt = build_full_prompt(ai_context)
-                llm_messages = build_message_history(conversation_messages, player_message=message)
-
-                # Get LLM client and tool definitions
-                config = get_config()
-                llm = get_llm_client(config)
-                tools = get_tool_definitions()
-
-                # Convert tools to Anthropic format
-                anthropic_tools = []
-                for tool in tools:
-                    anthropic_tools.append({
-                        "name": tool["name"],
-                        "description": tool["description"],
-                        "input_schema": tool["input_schema"]
-                    })
+                    # Add ChatMessage component to player message
+                    player_msg_data = {
+                        'speaker': 'player',
+                        'speaker_name': player_name,
+                        'conversation_id': entity_id,
+                        'message': message,
+                        'timestamp': chat_timestamp()
+                    }
+                    engine.add_component(player_msg_id, 'ChatMessage', player_msg_data)
+
+                    # Add message to conversation history (saved together with the DM reply)
+                    append_conversation_message(engine, entity_id, conversation.data, player_msg_id, player_msg_data, save=False)
+
+                player_message_pending = not skip_player_message
+
+                # Generate DM response using streaming LLM with tools
+                try:
+                    logger.info(f"Generating streaming AI response for entity {entity_id}")
+                    # History reaches the LLM as messages (from the Conversation cache),
+                    # so skip reloading it into the context before the first token
+                    ai_context = engine.generate_ai_context(entity_id, include_history=False)
+
+                    # Build prompts: static system prompt + committed history form a
+                    # cache-stable prefix, the game state rides with the new user turn
+                    full_system_prompt = build_full_prompt(ai_context, include_game_state=False)
+                    llm_messages = build_cached_message_history(
+                        conversation_messages, message, ai_context, total_messages=message_count
+                    )
+
+                    # Get LLM client and tool definitions
+                    config = get_config()
+                    llm = get_shared_llm_client()
+                    anthropic_tools = get_anthropic_tools()
+
+                    # Wait for a free LLM slot, telling the client if it takes a while
+                    llm_semaphore = get_llm_semaphore()
+                    if not llm_semaphore.acquire(timeout=LLM_QUEUE_NOTICE_SECONDS):
+                        logger.info(f"LLM busy, queuing stream for entity {entity_id}")
+                        yield format_sse({'type': 'queued'})
+                        llm_semaphore.acquire()
 
-                # Use the unified multi-turn streaming handler
-                # stream_to_client=True enables SSE streaming to the frontend
-                for event in multi_turn_streaming_handler(
-                    llm_messages=llm_messages,
-                    system_prompt=full_system_prompt,
-                    llm_client=llm,
-                    engine=engine,
-                    entity_id=entity_id,
-                    tools=anthropic_tools,
-                    config=config,
-                    max_turns=10,
-                    stream_to_client=True
-                ):
-                    # If this is the final result (returned at the end), extract it
-                    if isinstance(event, dict) and 'narrative' in event:
-                        # This is the return value from the handler
-                        narrative = event['narrative']
-                        suggested_actions = event['suggested_actions']
-                        break
-                    else:
-                        # This is a streaming event - yield it to the client
-                        yield event
-
-                # Create DM message entity
-                logger.debug("Creating DM message entity...")
-                dm_msg_result = engine.create_entity("DM response")
-                logger.debug(f"Entity creation result: success={dm_msg_result.success}")
-                if dm_msg_result.success:
-                    dm_msg_id = dm_msg_result.data['id']
-                    dm_timestamp = datetime.utcnow().isoformat()
-                    logger.debug(f"Created DM message entity: {dm_msg_id}")
-
-                    logger.debug("Adding ChatMessage component...")
-                    engine.add_component(dm_msg_id, 'ChatMessage', {
+                    try:
+                        # Use the unified multi-turn streaming handler
+                        # stream_to_client=True enables SSE streaming to the frontend;
+                        # token events are batched to keep the number of frames small
+                        # and heartbeats become occasional keepalive comments
+                        handler = multi_turn_streaming_handler(
+                            llm_messages=llm_messages,
+                            system_prompt=full_system_prompt,
+                            llm_client=llm,
+                            engine=engine,
+                            entity_id=entity_id,
+                            tools=anthropic_tools,
+                            config=config,
+                            max_turns=10,
+                            stream_to_client=True
+                        )
+                        for event in throttle_heartbeats(batch_token_events(handler)):
+                            # If this is the final result (returned at the end), extract it
+                            if isinstance(event, dict) and 'narrative' in event:
+                                # This is the return value from the handler
+                                narrative = event['narrative']
+                                suggested_actions = event['suggested_actions']
+                                break
+                            elif event.get('type') == 'heartbeat':
+                                yield SSE_KEEPALIVE
+                            else:
+                                # This is a streaming event - send it to the client
+                                yield format_sse(event)
+                    finally:
+                        # If the client went away mid-stream, this closes the LLM
+                        # request so the provider stops generating (and billing)
+                        handler.close()
+                        llm_semaphore.release()
+
+                    dm_msg_id = generate_id('entity')
+                    dm_msg_data = {
                         'speaker': 'dm',
                         'speaker_name': 'Dungeon Master',
+                        'conversation_id': entity_id,
                         'message': narrative,
-                        'timestamp': dm_timestamp,
+                        'timestamp': chat_timestamp(),
                         'suggested_actions': suggested_actions
-                    })
-                    logger.debug("ChatMessage component added")
+                    }
+
+                    logger.debug(f"Creating DM message entity {dm_msg_id}...")
+                    dm_msg_result = engine.create_entity("DM response", entity_id=dm_msg_id)
+                    if dm_msg_result.success:
+                        engine.add_component(dm_msg_id, 'ChatMessage', dm_msg_data)
+
+                        # Add to conversation
+                        logger.debug(f"Updating conversation with {len(conversation.data.get('message_ids', [])) + 1} total messages")
+                        append_conversation_message(
+                            engine, entity_id, conversation.data, dm_msg_id, dm_msg_data,
+                            unsaved_ids=[player_msg_id] if player_message_pending else []
+                        )
+                        player_message_pending = False
+                        logger.info("✓ AI response complete and saved")
+                    else:
+                        logger.error("Failed to create DM message entity!")
+                        logger.error(f"Entity creation error: {dm_msg_result.error if hasattr(dm_msg_result, 'error') else 'Unknown error'}")
+                    if player_message_pending:
+                        save_conversation_messages(engine, entity_id, conversation.data, [player_msg_id])
+                        player_message_pending = False
 
-                    # Add to conversation
-                    logger.debug(f"Updating conversation with {len(message_ids) + 1} total messages")
-                    message_ids.append(dm_msg_id)
-                    engine.update_component(entity_id, 'Conversation', {
-                        'message_ids': message_ids
-                    })
-                    logger.debug("Conversation updated")
+                    # Saved and released before 'done': the client re-enables its input
+                    # on 'done', and the next turn must be accepted and see this reply
+                    release_turn(turn_key)
+                    turn_claimed = False
 
-                    # Send completion event with actions
                     logger.info(f"Sending 'done' event with {len(suggested_actions)} actions")
-                    yield f"data: {json.dumps({'type': 'done', 'message_id': dm_msg_id, 'suggested_actions': suggested_actions})}\n\n"
-                    logger.info("✓ AI response complete and sent to client")
-                else:
-                    logger.error("Failed to create DM message entity!")
-                    logger.error(f"Entity creation error: {dm_msg_result.error if hasattr(dm_msg_result, 'error') else 'Unknown error'}")
-                    yield f"data: {json.dumps({'type': 'error', 'error': 'Failed to save DM response'})}\n\n"
-
-            except LLMError as e:
-                logger.error(f"LLM error during streaming: {e}")
-                fallback_actions = get_fallback_actions()
-                yield f"data: {json.dumps({'type': 'error', 'error': str(e), 'fallback_actions': fallback_actions})}\n\n"
-
-            except Exception as e:
-                logger.error(f"Error during streaming response: {e}", exc_info=True)
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Error details: {str(e)}")
-                yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                    yield format_sse({'type': 'done', 'message_id': dm_msg_id, 'suggested_actions': suggested_actions})
+                    if not dm_msg_result.success:
+                        yield SSE_SAVE_FAILED
+
+                except LLMError as e:
+                    logger.error(f"LLM error during streaming: {e}")
+                    fallback_actions = get_fallback_actions()
+                    yield format_sse({'type': 'error', 'error': str(e), 'fallback_actions': fallback_actions})
+
+                except Exception as e:
+                    logger.error(f"Error during streaming response: {e}", exc_info=True)
+                    logger.error(f"Error type: {type(e).__name__}")
+                    logger.error(f"Error details: {str(e)}")
+                    yield format_sse({'type': 'error', 'error': str(e)})
+
+                finally:
+                    # No DM reply was saved (error or client disconnect) - don't lose the player message
+                    if player_message_pending:
+                        save_conversation_messages(engine, entity_id, conversation.data, [player_msg_id])
+
+            finally:
+                # Unless already released before 'done' (a new turn may hold the key by now)
+                if turn_claimed:
+                    release_turn(turn_key)
 
         except GeneratorExit:
-            logger.warning("⚠️  Generator exit detected - client may have closed connection prematurely")
+            logger.warning("⚠️  Client closed the connection - upstream LLM stream aborted")
             raise
 
         except Exception as e:
             logger.error(f"Error in stream generator: {e}", exc_info=True)
             logger.error(f"Error type: {type(e).__name__}")
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
-
-    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+            yield format_sse({'type': 'error', 'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+        }
+    )
 
 
 @ai_dm_bp.route('/api/dm/chat_display/<entity_id>')
@@ -984,9 +1530,16 @@ def api_chat_display(entity_id: str):
     Get rendered chat messages HTML for an entity.
 
     Returns just the messages HTML fragment for AJAX updates.
+    Read-only, so it doesn't call ensure_modules_loaded(): the AI DM
+    module's event handlers are subscribed when the StateEngine loads its
+    modules (StateEngine._load_modules), before any route can run.
+
+    The fragment is cached per Conversation version (every new, edited
+    or deleted message updates the Conversation, see
+    AIDMModule.on_chat_message_changed) and served with an ETag, so
+    unchanged polls get a 304 without rendering.
     """
     try:
-        ensure_modules_loaded()
         engine = get_engine()
 
         # Get entity
@@ -994,34 +1547,43 @@ def api_chat_display(entity_id: str):
         if not entity:
             return '<p>Error: Entity not found</p>', 404
 
-        # Hardcoded UI settings (no component needed)
-        ui_settings = {
-            'show_suggested_actions': True,
-            'show_timestamps': True
-        }
-
-        # Get conversation messages
         conversation = engine.get_component(entity_id, 'Conversation')
-        messages = []
-        if conversation:
-            message_ids = conversation.data.get('message_ids', [])
-            for msg_id in message_ids:
-                msg_entity = engine.get_entity(msg_id)
-                if msg_entity and msg_entity.is_active():
-                    msg_comp = engine.get_component(msg_id, 'ChatMessage')
-                    if msg_comp:
-                        messages.append({
-                            'id': msg_id,
-                            'data': msg_comp.data
-                        })
-
-        # Render messages partial
-        return render_template(
-            'dm_chat_messages.html',
-            entity=entity,
-            messages=messages,
-            ui_settings=ui_settings
-        ), 200, {'Content-Type': 'text/html; charset=utf-8'}
+        show_all = request.args.get('history') == 'all'
+        etag = f"{entity_id}-{conversation.version if conversation else 0}{'-all' if show_all else ''}"
+
+        cache_key = (session.get('world_name'), entity_id, show_all)
+        cached = _chat_html_cache.get(cache_key)
+        if cached and cached[0] == etag:
+            html = cached[1]
+            _chat_html_cache.move_to_end(cache_key)
+        else:
+            # Get conversation messages (recent window unless ?history=all)
+            messages = []
+            hidden_count = 0
+            if conversation:
+                messages, hidden_count = load_chat_window(
+                    engine, conversation.data.get('message_ids', []), show_all=show_all
+                )
+
+            # Render messages partial
+            html = render_template(
+                get_chat_template('dm_chat_messages.html'),
+                entity=entity,
+                messages=messages,
+                hidden_count=hidden_count,
+                ui_settings=CHAT_UI_SETTINGS
+            )
+
+            _chat_html_cache[cache_key] = (etag, html)
+            _chat_html_cache.move_to_end(cache_key)
+            if len(_chat_html_cache) > CHAT_HTML_CACHE_SIZE:
+                _chat_html_cache.popitem(last=False)
+
+        response = make_response(html)
+        response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        response.headers['Cache-Control'] = 'private, no-cache'  # Always revalidate via ETag
+        response.set_etag(etag)
+        return response.make_conditional(request)
 
     except Exception as e:
         logger.error(f"Error rendering DM chat messages for entity {entity_id}: {e}", exc_info=True)
@@ -1047,18 +1609,18 @@ def api_generate_intro():
         }
     """
     try:
-        ensure_modules_loaded()
-        engine = get_engine()
-
-        data = request.get_json()
-        entity_id = data.get('entity_id')
-
-        if not entity_id:
+        data, error = parse_request_json(_generate_intro_request_validator)
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'Missing required field: entity_id'
+                'error': error
             }), 400
 
+        ensure_modules_loaded()
+        engine = get_engine()
+
+        entity_id = data['entity_id']
+
         # Use the shared intro generation function
         result = generate_intro_for_character(engine, entity_id)
 
@@ -1096,20 +1658,20 @@ def api_execute_action():
         }
     """
     try:
+        data, error = parse_request_json(_execute_action_request_validator)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+
         ensure_modules_loaded()
         engine = get_engine()
 
-        data = request.get_json()
-        entity_id = data.get('entity_id')
-        action_type = data.get('action_type')
+        entity_id = data['entity_id']
+        action_type = data['action_type']
         action_data = data.get('action_data', {})
 
-        if not entity_id or not action_type:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required fields: entity_id, action_type'
-            }), 400
-
         reload_sheet = False
 
         # Handle different action types
@@ -1118,24 +1680,27 @@ def api_execute_action():
             dice = action_data.get('dice', '1d20')
             label = action_data.get('label', 'Custom Roll')
 
-            # Create a system message about the roll
-            conversation = engine.get_component(entity_id, 'Conversation')
+            # Create a system message about the roll. Without the RNG module no
+            # roll follows, so skip the writes; the action itself still succeeds
+            conversation = None
+            if world_has_module('rng'):
+                conversation = engine.get_component(entity_id, 'Conversation')
+            else:
+                logger.debug(f"RNG module not loaded, not announcing roll {dice} for {label}")
             if conversation:
                 roll_msg = engine.create_entity(f"Roll: {label}")
 
                 if roll_msg.success:
-                    engine.add_component(roll_msg.data['id'], 'ChatMessage', {
+                    roll_msg_data = {
                         'speaker': 'system',
                         'speaker_name': 'System',
+                        'conversation_id': entity_id,
                         'message': f"🎲 Rolling {dice} for {label}...",
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
+                        'timestamp': chat_timestamp()
+                    }
+                    engine.add_component(roll_msg.data['id'], 'ChatMessage', roll_msg_data)
 
-                    message_ids = conversation.data.get('message_ids', [])
-                    message_ids.append(roll_msg.data['id'])
-                    engine.update_component(entity_id, 'Conversation', {
-                        'message_ids': message_ids
-                    })
+                    append_conversation_message(engine, entity_id, conversation.data, roll_msg.data['id'], roll_msg_data)
 
             result_data = {
                 'type': 'roll_dice',
@@ -1165,18 +1730,16 @@ def api_execute_action():
                 if player_msg_result.success:
                     player_msg_id = player_msg_result.data['id']
 
-                    engine.add_component(player_msg_id, 'ChatMessage', {
+                    player_msg_data = {
                         'speaker': 'player',
                         'speaker_name': player_name,
+                        'conversation_id': entity_id,
                         'message': message_text,
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
+                        'timestamp': chat_timestamp()
+                    }
+                    engine.add_component(player_msg_id, 'ChatMessage', player_msg_data)
 
-                    message_ids = conversation.data.get('message_ids', [])
-                    message_ids.append(player_msg_id)
-                    engine.update_component(entity_id, 'Conversation', {
-                        'message_ids': message_ids
-                    })
+                    append_conversation_message(engine, entity_id, conversation.data, player_msg_id, player_msg_data)
 
             result_data = {
                 'type': 'custom',
@@ -11,6 +11,91 @@ from datetime import datetime
 from ..base import ComponentTypeDefinition
 
 
+# Schemas are built once at import and shared by every validation
+CHAT_MESSAGE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "speaker": {
+            "type": "string",
+            "description": "Who sent the message: 'dm', 'player', or 'system'"
+        },
+        "speaker_name": {
+            "type": "string",
+            "description": "Display name of the speaker"
+        },
+        "conversation_id": {
+            "type": "string",
+            "description": "ID of the entity whose Conversation holds this message"
+        },
+        "message": {
+            "type": "string",
+            "description": "The message content"
+        },
+        "timestamp": {
+            "type": "string",
+            "format": "date-time",
+            "description": "When the message was sent"
+        },
+        "suggested_actions": {
+            "type": "array",
+            "description": "Actions the player can take",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "label": {"type": "string"},
+                    "action_type": {"type": "string"},
+                    "action_data": {"type": "object"}
+                },
+                "required": ["label", "action_type"]
+            }
+        },
+        "context": {
+            "type": "object",
+            "description": "Game state context when message was sent"
+        }
+    },
+    "required": ["speaker", "message", "timestamp"]
+}
+
+CONVERSATION_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "message_ids": {
+            "type": "array",
+            "description": "Ordered list of message entity IDs",
+            "items": {"type": "string"}
+        },
+        "last_message_time": {
+            "type": "string",
+            "format": "date-time",
+            "description": "Timestamp of most recent message"
+        },
+        "history_cache": {
+            "type": "array",
+            "description": "Most recent messages (speaker + text) denormalized for building LLM context",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "speaker": {"type": "string"},
+                    "message": {"type": "string"}
+                },
+                "required": ["speaker", "message"]
+            }
+        },
+        "context_summary": {
+            "type": "string",
+            "description": "Summary of conversation context (for AI)"
+        },
+        "active": {
+            "type": "boolean",
+            "description": "Is the DM actively engaged with this character",
+            "default": True
+        }
+    },
+    "required": []
+}
+
+
 class ChatMessageComponent(ComponentTypeDefinition):
     """
     Individual chat message in a conversation.
@@ -25,46 +110,7 @@ class ChatMessageComponent(ComponentTypeDefinition):
     module = "ai_dm"
 
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "speaker": {
-                    "type": "string",
-                    "description": "Who sent the message: 'dm', 'player', or 'system'"
-                },
-                "speaker_name": {
-                    "type": "string",
-                    "description": "Display name of the speaker"
-                },
-                "message": {
-                    "type": "string",
-                    "description": "The message content"
-                },
-                "timestamp": {
-                    "type": "string",
-                    "format": "date-time",
-                    "description": "When the message was sent"
-                },
-                "suggested_actions": {
-                    "type": "array",
-                    "description": "Actions the player can take",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "label": {"type": "string"},
-                            "action_type": {"type": "string"},
-                            "action_data": {"type": "object"}
-                        },
-                        "required": ["label", "action_type"]
-                    }
-                },
-                "context": {
-                    "type": "object",
-                    "description": "Game state context when message was sent"
-                }
-            },
-            "required": ["speaker", "message", "timestamp"]
-        }
+        return CHAT_MESSAGE_SCHEMA
 
     def get_character_sheet_config(self) -> Dict[str, Any]:
         """Chat messages don't appear individually on character sheets."""
@@ -79,7 +125,9 @@ class ConversationComponent(ComponentTypeDefinition):
     Conversation history component for entities.
 
     Tracks the ongoing conversation between a player character and the DM.
-    Stores message IDs in order and maintains conversation context.
+    Stores message IDs in order and maintains conversation context, plus a
+    capped cache of recent message text so LLM history can be built without
+    loading every ChatMessage entity.
 
     This is a data-only component - the UI is rendered on the dedicated
     DM chat page, not on the character sheet.
@@ -91,31 +139,7 @@ class ConversationComponent(ComponentTypeDefinition):
     module = "ai_dm"
 
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "message_ids": {
-                    "type": "array",
-                    "description": "Ordered list of message entity IDs",
-                    "items": {"type": "string"}
-                },
-                "last_message_time": {
-                    "type": "string",
-                    "format": "date-time",
-                    "description": "Timestamp of most recent message"
-                },
-                "context_summary": {
-                    "type": "string",
-                    "description": "Summary of conversation context (for AI)"
-                },
-                "active": {
-                    "type": "boolean",
-                    "description": "Is the DM actively engaged with this character",
-                    "default": True
-                }
-            },
-            "required": []
-        }
+        return CONVERSATION_SCHEMA
 
     def get_default_data(self) -> Dict[str, Any]:
         return {
@@ -10,12 +10,99 @@ This implements the architectural principle:
 - This resolver bridges the gap between the two
 """
 
+import heapq
 import logging
+from collections import Counter
+from operator import itemgetter
 from typing import Optional, List
-from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None
 
 logger = logging.getLogger(__name__)
 
+# Entity types accepted as expected_type, and the component that marks them
+TYPE_TO_COMPONENT = {
+    'npc': 'NPC',
+    'player': 'PlayerCharacter',
+    'location': 'Location',
+    'item': 'Item'
+}
+
+
+def indel_ratio(a: str, b: str) -> float:
+    """
+    Normalized InDel similarity of two strings.
+
+    2 * (longest common subsequence) / (total length), the score behind
+    rapidfuzz's fuzz.ratio (divided by 100). Pure Python, used when
+    rapidfuzz isn't installed so both paths resolve the same names.
+
+    Args:
+        a: First string
+        b: Second string
+
+    Returns:
+        Similarity from 0.0 to 1.0 (1.0 for two empty strings)
+    """
+    total = len(a) + len(b)
+    if not total:
+        return 1.0
+    previous = [0] * (len(b) + 1)
+    for char_a in a:
+        current = [0]
+        for j, char_b in enumerate(b):
+            current.append(previous[j] + 1 if char_a == char_b else max(previous[j + 1], current[j]))
+        previous = current
+    return 2 * previous[-1] / total
+
+
+def rank_by_similarity(query: str, choices: List[str], threshold: float,
+                       limit: Optional[int] = None) -> List[int]:
+    """
+    Rank strings by similarity to a query.
+
+    Scores are the normalized InDel ratio (see indel_ratio): computed by
+    rapidfuzz when it is installed (optional dependency), in pure Python
+    otherwise. Both paths return the same matches in the same order.
+
+    Args:
+        query: String to compare against
+        choices: Candidate strings
+        threshold: Minimum similarity (0.0-1.0) to include a choice
+        limit: Return only the best N matches (all matches if None)
+
+    Returns:
+        Indices into choices, best match first (ties keep input order)
+    """
+    if process is not None:
+        matches = process.extract(query, choices, scorer=fuzz.ratio, processor=None,
+                                  score_cutoff=threshold * 100, limit=limit)
+        return [index for _, _, index in matches]
+
+    scored = []
+    query_chars = Counter(query)
+    for index, choice in enumerate(choices):
+        total = len(query) + len(choice)
+        # Cheap upper bounds first: the length bound, then a character-count
+        # bound; most names are rejected before the full ratio runs
+        if total and 2 * min(len(query), len(choice)) / total < threshold:
+            continue
+        if total and 2 * sum((query_chars & Counter(choice)).values()) / total < threshold:
+            continue
+        ratio = indel_ratio(query, choice)
+        if ratio >= threshold:
+            scored.append((ratio, index))
+
+    # Sort by score descending (best matches first); a top-N heap when limited
+    if limit is None:
+        scored.sort(key=itemgetter(0), reverse=True)
+    else:
+        scored = heapq.nlargest(limit, scored, key=itemgetter(0))
+    return [index for _, index in scored]
+
 
 class EntityResolver:
     """
@@ -99,10 +186,10 @@ class EntityResolver:
             return None
 
         # Strategy 2: Try exact name match
-        entity = self._find_by_exact_name(reference, expected_type)
-        if entity:
+        candidates = self._find_all_by_exact_name(reference, expected_type)
+        if candidates:
+            entity = candidates[0]
             # If multiple matches, use context to disambiguate
-            candidates = self._find_all_by_exact_name(reference, expected_type)
             if len(candidates) > 1 and context_location:
                 local = self._filter_by_location(candidates, context_location)
                 if local:
@@ -151,10 +238,11 @@ class EntityResolver:
         # Sort by location context (prefer nearby)
         if context_location:
             # Put entities in context location first
+            positions = self.engine.get_components_bulk([e.id for e in candidates], 'Position')
             local = []
             remote = []
             for entity in candidates:
-                if self._is_in_location(entity, context_location):
+                if self._is_in_location(positions.get(entity.id), context_location):
                     local.append(entity)
                 else:
                     remote.append(entity)
@@ -166,48 +254,28 @@ class EntityResolver:
 
     def _has_type(self, entity: 'Entity', expected_type: str) -> bool:
         """Check if entity has the expected type."""
-        type_to_component = {
-            'npc': 'NPC',
-            'player': 'PlayerCharacter',
-            'location': 'Location',
-            'item': 'Item'
-        }
-        component = type_to_component.get(expected_type)
+        component = TYPE_TO_COMPONENT.get(expected_type)
         if not component:
             return True  # Unknown type, don't filter
 
         return self.engine.get_component(entity.id, component) is not None
 
-    def _find_by_exact_name(self,
-                           name: str,
-                           expected_type: Optional[str] = None) -> Optional['Entity']:
-        """Find first entity with exact name match."""
-        candidates = self._find_all_by_exact_name(name, expected_type)
-        return candidates[0] if candidates else None
-
     def _find_all_by_exact_name(self,
                                name: str,
                                expected_type: Optional[str] = None) -> List['Entity']:
         """
         Find all entities with exact name match (case-insensitive).
 
-        Note: Uses query_entities() without component filter to ensure
-        newly-created entities are visible within the same execution batch.
-        Component-filtered queries may have caching issues.
+        Note: Queries storage directly so newly-created entities are visible
+        within the same execution batch.
         """
-        all_entities = self.engine.query_entities()
         matches = []
 
-        for entity in all_entities:
-            if not entity.is_active():
+        for entity in self.engine.find_entities_by_name(name):
+            # Filter by type if specified (check component manually)
+            if expected_type and not self._has_type(entity, expected_type):
                 continue
-
-            # Case-insensitive name comparison
-            if entity.name.lower() == name.lower():
-                # Filter by type if specified (check component manually)
-                if expected_type and not self._has_type(entity, expected_type):
-                    continue
-                matches.append(entity)
+            matches.append(entity)
 
         return matches
 
@@ -217,7 +285,9 @@ class EntityResolver:
                            context_location: Optional[str] = None,
                            threshold: float = 0.6) -> Optional['Entity']:
         """Find entity using fuzzy name matching."""
-        candidates = self._find_all_by_fuzzy_name(name, expected_type, threshold)
+        # Without a location to disambiguate by, only the best match matters
+        limit = None if context_location else 1
+        candidates = self._find_all_by_fuzzy_name(name, expected_type, threshold, limit)
 
         if not candidates:
             return None
@@ -233,61 +303,37 @@ class EntityResolver:
     def _find_all_by_fuzzy_name(self,
                                name: str,
                                expected_type: Optional[str] = None,
-                               threshold: float = 0.6) -> List['Entity']:
-        """Find all entities using fuzzy name matching, ranked by similarity."""
-        all_entities = self.engine.query_entities()
-        scored_matches = []
-
-        for entity in all_entities:
-            if not entity.is_active():
-                continue
-
-            # Filter by type first (efficiency)
-            if expected_type and not self._has_type(entity, expected_type):
-                continue
-
-            # Calculate similarity ratio
-            ratio = SequenceMatcher(None, name.lower(), entity.name.lower()).ratio()
-
-            if ratio >= threshold:
-                scored_matches.append((ratio, entity))
-
-        # Sort by score descending (best matches first)
-        scored_matches.sort(key=lambda x: x[0], reverse=True)
-
-        return [entity for _, entity in scored_matches]
+                               threshold: float = 0.6,
+                               limit: Optional[int] = None) -> List['Entity']:
+        """Find entities using fuzzy name matching, ranked by similarity (best `limit` if given)."""
+        # Filter by type first (efficiency) - one query instead of a component
+        # lookup per entity. query_entities() only returns active entities.
+        component = TYPE_TO_COMPONENT.get(expected_type) if expected_type else None
+        candidates = self.engine.query_entities([component] if component else None)
+
+        ranked = rank_by_similarity(
+            name.lower(), [entity.name.lower() for entity in candidates], threshold, limit
+        )
+        return [candidates[index] for index in ranked]
 
     def _filter_by_location(self,
                            entities: List['Entity'],
                            location_id: str) -> List['Entity']:
         """Filter entities to those in the specified location."""
+        # One bulk query for every candidate's Position
+        positions = self.engine.get_components_bulk([e.id for e in entities], 'Position')
         filtered = []
 
         for entity in entities:
-            if self._is_in_location(entity, location_id):
+            if self._is_in_location(positions.get(entity.id), location_id):
                 filtered.append(entity)
 
         return filtered
 
-    def _is_in_location(self, entity: 'Entity', location_id: str) -> bool:
-        """Check if entity is in the specified location."""
-        position = self.engine.get_component(entity.id, 'Position')
-        if not position:
-            return False
-
-        # Check if positioned at this location
-        region = position.data.get('region')
-
-        # Direct match
-        if region == location_id:
-            return True
-
-        # If region is an entity, check if it's the location
-        if region and region.startswith('entity_'):
-            # The entity is positioned AT the region entity
-            return region == location_id
-
-        return False
+    def _is_in_location(self, position: Optional['Component'], location_id: str) -> bool:
+        """Check if an entity's Position component places it in the specified location."""
+        # Positioned at this location: region holds the location's entity ID
+        return bool(position) and position.data.get('region') == location_id
 
 
-__all__ = ['EntityResolver']
+__all__ = ['EntityResolver', 'TYPE_TO_COMPONENT', 'rank_by_similarity']
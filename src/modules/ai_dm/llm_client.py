@@ -6,12 +6,103 @@ with error handling, retries, and response validation.
 """
 
 import logging
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Iterator
+from typing import List, Dict, Any, Optional, Iterator, Callable, Tuple, Type
 from src.core.config import Config
+from .rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Retry policy for rate-limit and connection errors
+LLM_MAX_ATTEMPTS = 3
+LLM_RETRY_BASE_DELAY = 1.0
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Get the delay before retrying a failed LLM request.
+
+    Uses exponential backoff with jitter so concurrent requests that
+    failed together don't all retry at the same moment.
+
+    Args:
+        attempt: Zero-based index of the attempt that just failed
+
+    Returns:
+        Delay in seconds
+    """
+    return LLM_RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, LLM_RETRY_BASE_DELAY)
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract the retry-after delay from a provider error response.
+
+    Args:
+        error: Exception raised by the provider SDK
+
+    Returns:
+        Seconds to wait, or None if the response didn't specify one
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMStream:
+    """
+    Chunks from a streaming LLM request that can be aborted from any thread.
+
+    Iterating runs the request (including retries) on the iterating thread,
+    just like the generator it wraps. abort() may be called from another
+    thread - e.g. the request thread after the client disconnected while a
+    background reader is blocked waiting on the provider. It closes the open
+    SDK stream, which ends the upstream request and unblocks the read.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self.chunks: Optional[Iterator[Any]] = None
+        self._response = None
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.chunks)
+
+    def close(self) -> None:
+        """Close the stream from the thread iterating it."""
+        self.chunks.close()
+
+    def attach(self, response: Any) -> None:
+        """
+        Register the SDK stream currently being read.
+
+        Args:
+            response: Open SDK stream with a close() method
+        """
+        with self._lock:
+            self._response = response
+            if not self.aborted:
+                return
+        response.close()
+
+    def abort(self) -> None:
+        """Stop the request, closing its SDK stream if one is open."""
+        with self._lock:
+            self.aborted = True
+            response = self._response
+        if response is not None:
+            response.close()
+
 
 class LLMProvider(ABC):
     """
@@ -19,8 +110,144 @@ class LLMProvider(ABC):
 
     Subclasses implement specific provider APIs (Anthropic, OpenAI, etc.)
     with a common interface for the AI DM module.
+
+    If rate_limiter is set, every API call waits for quota first and
+    reports its outcome back so the limiter can adapt. Subclasses run
+    their SDK calls through _call_with_retries() / _open_stream(),
+    the only retry layer (SDK clients are built with max_retries=0).
     """
 
+    rate_limiter: Optional[RateLimiter] = None
+    provider_name: str = 'llm'
+    display_name: str = 'LLM'
+    retryable_errors: Tuple[Type[Exception], ...] = ()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Get the delay before retrying after a retryable API error.
+
+        Rate-limit responses also lower the rate limiter's ceiling and
+        honour the provider's retry-after header.
+
+        Args:
+            error: Rate-limit or connection error from the SDK
+            attempt: Zero-based index of the attempt that failed
+
+        Returns:
+            Delay in seconds
+        """
+        delay = backoff_delay(attempt)
+        if getattr(error, 'status_code', None) == 429:
+            retry_after = parse_retry_after(error)
+            if self.rate_limiter:
+                self.rate_limiter.record_rate_limit(retry_after)
+            if retry_after:
+                delay = max(delay, retry_after)
+        return delay
+
+    def _call_with_retries(self, call: Callable[[], Any], tokens: int) -> Any:
+        """
+        Run a blocking API call with rate limiting and backoff.
+
+        Args:
+            call: Performs one API request and returns its result
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Result of the first successful call
+
+        Raises:
+            LLMError: If the call fails or retries are exhausted
+        """
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(tokens)
+
+                result = call()
+
+                if self.rate_limiter:
+                    self.rate_limiter.record_success()
+                return result
+
+            except self.retryable_errors as e:
+                delay = self._retry_delay(e, attempt)
+                if attempt + 1 < LLM_MAX_ATTEMPTS:
+                    logger.warning(f"⚠️  {self.display_name} API busy ({type(e).__name__}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                raise self._error(f"{self.display_name} API error", e)
+
+            except Exception as e:
+                raise self._error(f"{self.display_name} API error", e)
+
+    def _open_stream(self, open_stream: Callable[[LLMStream], Iterator[Any]], tokens: int) -> LLMStream:
+        """
+        Stream an API response with rate limiting and backoff.
+
+        A request is only retried if it failed before yielding anything;
+        a partially streamed response can't be replayed. Errors caused by
+        LLMStream.abort() end the stream quietly instead of retrying.
+
+        Args:
+            open_stream: Starts one streaming request, attaches its SDK
+                         stream to the given LLMStream and yields its chunks
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            LLMStream over the chunks of the first stream that succeeds
+            (iterating it raises LLMError if retries are exhausted)
+        """
+        handle = LLMStream()
+        handle.chunks = self._stream_with_retries(open_stream, tokens, handle)
+        return handle
+
+    def _stream_with_retries(
+        self,
+        open_stream: Callable[[LLMStream], Iterator[Any]],
+        tokens: int,
+        handle: LLMStream
+    ) -> Iterator[Any]:
+        """Retry loop behind _open_stream()."""
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            if handle.aborted:
+                return
+            started = False
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(tokens)
+
+                for chunk in open_stream(handle):
+                    started = True
+                    yield chunk
+
+                if self.rate_limiter:
+                    self.rate_limiter.record_success()
+
+                logger.debug(f"Streaming response completed")
+                return
+
+            except self.retryable_errors as e:
+                if handle.aborted:
+                    return
+                delay = self._retry_delay(e, attempt)
+                if not started and attempt + 1 < LLM_MAX_ATTEMPTS:
+                    logger.warning(f"⚠️  {self.display_name} API busy ({type(e).__name__}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                raise self._error(f"{self.display_name} API streaming error", e)
+
+            except Exception as e:
+                if handle.aborted:
+                    return
+                raise self._error(f"{self.display_name} API streaming error", e)
+
+    def _error(self, prefix: str, error: Exception) -> 'LLMError':
+        """Log a failed API call and wrap it in an LLMError."""
+        error_msg = f"{prefix}: {str(error)}"
+        logger.error(error_msg, exc_info=True)
+        return LLMError(error_msg, provider=self.provider_name, original_error=error)
+
     @abstractmethod
     def generate_response(
         self,
@@ -68,8 +295,10 @@ class LLMProvider(ABC):
             temperature: Sampling temperature (0.0-1.0)
             **kwargs: Provider-specific options (including 'tools' for function calling)
 
-        Yields:
-            Dict chunks with 'type' and relevant data
+        Returns:
+            Iterator of dict chunks with 'type' and relevant data. Built-in
+            providers return an LLMStream, which can also be aborted from
+            another thread.
 
         Raises:
             LLMError: If generation fails
@@ -93,6 +322,9 @@ class AnthropicProvider(LLMProvider):
     Uses the Anthropic API to generate responses with Claude models.
     """
 
+    provider_name = 'anthropic'
+    display_name = 'Anthropic'
+
     def __init__(self, api_key: str, model: str = 'claude-sonnet-4-5-20250929'):
         """
         Initialize Anthropic provider.
@@ -106,7 +338,7 @@ class AnthropicProvider(LLMProvider):
             LLMError: If API key is invalid or client creation fails
         """
         try:
-            from anthropic import Anthropic
+            from anthropic import Anthropic, RateLimitError, APIConnectionError
         except ImportError:
             raise ImportError(
                 "anthropic package not installed. "
@@ -120,8 +352,10 @@ class AnthropicProvider(LLMProvider):
             )
 
         try:
-            self.client = Anthropic(api_key=api_key)
+            # LLMProvider's backoff is the only retry layer, so rate limits reach the limiter
+            self.client = Anthropic(api_key=api_key, max_retries=0)
             self.model = model
+            self.retryable_errors = (RateLimitError, APIConnectionError)
             logger.info(f"Initialized Anthropic provider with model: {model}")
         except Exception as e:
             raise LLMError(
@@ -154,20 +388,19 @@ class AnthropicProvider(LLMProvider):
         Raises:
             LLMError: If API call fails
         """
-        try:
+        api_kwargs = {
+            'model': kwargs.get('model', self.model),
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'messages': messages
+        }
+
+        # Support both string and list format for system (list enables caching)
+        if system:
+            api_kwargs['system'] = system
+
+        def call():
             logger.debug(f"Calling Anthropic API with {len(messages)} messages")
-
-            api_kwargs = {
-                'model': kwargs.get('model', self.model),
-                'max_tokens': max_tokens,
-                'temperature': temperature,
-                'messages': messages
-            }
-
-            # Support both string and list format for system (list enables caching)
-            if system:
-                api_kwargs['system'] = system
-
             response = self.client.messages.create(**api_kwargs)
 
             # Extract text from response
@@ -175,10 +408,7 @@ class AnthropicProvider(LLMProvider):
             logger.debug(f"Received response: {len(text)} characters")
             return text
 
-        except Exception as e:
-            error_msg = f"Anthropic API error: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise LLMError(error_msg, provider="anthropic", original_error=e)
+        return self._call_with_retries(call, estimate_tokens(messages, system, max_tokens))
 
     def generate_response_stream(
         self,
@@ -187,7 +417,7 @@ class AnthropicProvider(LLMProvider):
         max_tokens: int = 4096,
         temperature: float = 0.7,
         **kwargs
-    ) -> Iterator[Dict[str, Any]]:
+    ) -> LLMStream:
         """
         Generate streaming response using Anthropic Claude API.
 
@@ -198,31 +428,31 @@ class AnthropicProvider(LLMProvider):
             temperature: Sampling temperature
             **kwargs: Additional Anthropic-specific parameters (including 'tools')
 
-        Yields:
-            Dict chunks with 'type' and 'content' or 'tool_use' data
+        Returns:
+            LLMStream of dict chunks with 'type' and 'content' or 'tool_use' data
 
         Raises:
             LLMError: If API call fails
         """
-        try:
+        tools = kwargs.get('tools')
+        stream_kwargs = {
+            'model': kwargs.get('model', self.model),
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'messages': messages
+        }
+
+        # Support both string and list format for system (list enables caching)
+        if system:
+            stream_kwargs['system'] = system
+
+        if tools:
+            stream_kwargs['tools'] = tools
+
+        def open_stream(handle):
             logger.debug(f"Calling Anthropic API (streaming) with {len(messages)} messages")
-
-            tools = kwargs.get('tools')
-            stream_kwargs = {
-                'model': kwargs.get('model', self.model),
-                'max_tokens': max_tokens,
-                'temperature': temperature,
-                'messages': messages
-            }
-
-            # Support both string and list format for system (list enables caching)
-            if system:
-                stream_kwargs['system'] = system
-
-            if tools:
-                stream_kwargs['tools'] = tools
-
             with self.client.messages.stream(**stream_kwargs) as stream:
+                handle.attach(stream)
                 for event in stream:
                     if event.type == "content_block_start":
                         if hasattr(event, 'content_block') and event.content_block.type == "tool_use":
@@ -247,12 +477,7 @@ class AnthropicProvider(LLMProvider):
                         # Tool use block is complete
                         pass
 
-            logger.debug(f"Streaming response completed")
-
-        except Exception as e:
-            error_msg = f"Anthropic API streaming error: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise LLMError(error_msg, provider="anthropic", original_error=e)
+        return self._open_stream(open_stream, estimate_tokens(messages, system, max_tokens))
 
 
 class OpenAIProvider(LLMProvider):
@@ -262,6 +487,9 @@ class OpenAIProvider(LLMProvider):
     Uses the OpenAI API to generate responses with GPT models.
     """
 
+    provider_name = 'openai'
+    display_name = 'OpenAI'
+
     def __init__(self, api_key: str, model: str = 'gpt-4-turbo-preview'):
         """
         Initialize OpenAI provider.
@@ -275,7 +503,7 @@ class OpenAIProvider(LLMProvider):
             LLMError: If API key is invalid or client creation fails
         """
         try:
-            from openai import OpenAI
+            from openai import OpenAI, RateLimitError, APIConnectionError
         except ImportError:
             raise ImportError(
                 "openai package not installed. "
@@ -289,8 +517,10 @@ class OpenAIProvider(LLMProvider):
             )
 
         try:
-            self.client = OpenAI(api_key=api_key)
+            # LLMProvider's backoff is the only retry layer, so rate limits reach the limiter
+            self.client = OpenAI(api_key=api_key, max_retries=0)
             self.model = model
+            self.retryable_errors = (RateLimitError, APIConnectionError)
             logger.info(f"Initialized OpenAI provider with model: {model}")
         except Exception as e:
             raise LLMError(
@@ -323,13 +553,12 @@ class OpenAIProvider(LLMProvider):
         Raises:
             LLMError: If API call fails
         """
-        try:
-            # OpenAI uses system message in messages array
-            if system:
-                messages = [{"role": "system", "content": system}] + messages
+        # OpenAI uses system message in messages array
+        if system:
+            messages = [{"role": "system", "content": system}] + messages
 
+        def call():
             logger.debug(f"Calling OpenAI API with {len(messages)} messages")
-
             response = self.client.chat.completions.create(
                 model=kwargs.get('model', self.model),
                 max_tokens=max_tokens,
@@ -341,10 +570,7 @@ class OpenAIProvider(LLMProvider):
             logger.debug(f"Received response: {len(text)} characters")
             return text
 
-        except Exception as e:
-            error_msg = f"OpenAI API error: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise LLMError(error_msg, provider="openai", original_error=e)
+        return self._call_with_retries(call, estimate_tokens(messages, max_tokens=max_tokens))
 
     def generate_response_stream(
         self,
@@ -353,7 +579,7 @@ class OpenAIProvider(LLMProvider):
         max_tokens: int = 4096,
         temperature: float = 0.7,
         **kwargs
-    ) -> Iterator[str]:
+    ) -> LLMStream:
         """
         Generate streaming response using OpenAI GPT API.
 
@@ -364,37 +590,31 @@ class OpenAIProvider(LLMProvider):
             temperature: Sampling temperature
             **kwargs: Additional OpenAI-specific parameters
 
-        Yields:
-            Text chunks as they are generated
+        Returns:
+            LLMStream of text chunks as they are generated
 
         Raises:
             LLMError: If API call fails
         """
-        try:
-            # OpenAI uses system message in messages array
-            if system:
-                messages = [{"role": "system", "content": system}] + messages
+        # OpenAI uses system message in messages array
+        if system:
+            messages = [{"role": "system", "content": system}] + messages
 
+        def open_stream(handle):
             logger.debug(f"Calling OpenAI API (streaming) with {len(messages)} messages")
-
-            stream = self.client.chat.completions.create(
+            with self.client.chat.completions.create(
                 model=kwargs.get('model', self.model),
                 max_tokens=max_tokens,
                 temperature=temperature,
                 messages=messages,
                 stream=True
-            )
+            ) as stream:
+                handle.attach(stream)
+                for chunk in stream:
+                    if chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
 
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-
-            logger.debug(f"Streaming response completed")
-
-        except Exception as e:
-            error_msg = f"OpenAI API streaming error: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            raise LLMError(error_msg, provider="openai", original_error=e)
+        return self._open_stream(open_stream, estimate_tokens(messages, max_tokens=max_tokens))
 
 
 def get_llm_client(config: Optional[Config] = None) -> LLMProvider:
@@ -447,10 +667,72 @@ def get_llm_client(config: Optional[Config] = None) -> LLMProvider:
         )
 
 
+# Shared LLM client instance (lazy-loaded)
+_llm_client: Optional[LLMProvider] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_shared_llm_client() -> LLMProvider:
+    """
+    Get the process-wide LLM client (singleton pattern).
+
+    Request handlers should use this instead of calling get_llm_client()
+    per request, so the underlying SDK client (and its HTTP connection
+    pool) is reused across requests. The shared client paces its calls
+    through the shared rate limiter.
+
+    Returns:
+        Shared LLM provider built from the global config
+
+    Raises:
+        LLMError: If provider is invalid or initialization fails
+    """
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                from src.core.config import get_config
+                client = get_llm_client(get_config())
+                client.rate_limiter = get_rate_limiter()
+                _llm_client = client
+    return _llm_client
+
+
+# Shared concurrency limit for LLM requests (lazy-loaded)
+_llm_semaphore: Optional[threading.BoundedSemaphore] = None
+_llm_semaphore_lock = threading.Lock()
+
+
+def get_llm_semaphore() -> threading.BoundedSemaphore:
+    """
+    Get the semaphore bounding simultaneous LLM requests.
+
+    Providers enforce tight concurrent-connection limits; exceeding them
+    produces rate-limit errors long before the nominal request quota is
+    reached. Hold this semaphore for the duration of each LLM call so
+    extra requests queue locally instead of failing upstream.
+
+    Returns:
+        Semaphore sized from config.ai_max_concurrent
+    """
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        with _llm_semaphore_lock:
+            if _llm_semaphore is None:
+                from src.core.config import get_config
+                _llm_semaphore = threading.BoundedSemaphore(get_config().ai_max_concurrent)
+    return _llm_semaphore
+
+
 __all__ = [
     'LLMProvider',
+    'LLMStream',
     'LLMError',
     'AnthropicProvider',
     'OpenAIProvider',
-    'get_llm_client'
+    'get_llm_client',
+    'get_shared_llm_client',
+    'get_llm_semaphore',
+    'backoff_delay',
+    'parse_retry_after'
 ]
@@ -6,6 +6,7 @@ and conversation history formatting.
 """
 
 import logging
+from functools import lru_cache
 from typing import Dict, Any, List
 from pathlib import Path
 
@@ -14,17 +15,57 @@ logger = logging.getLogger(__name__)
 # Default system prompt path
 DEFAULT_SYSTEM_PROMPT_PATH = Path(__file__).parent / 'prompts' / 'dm_system.txt'
 
+# Ability scores in display order with their abbreviations
+ATTRIBUTE_ABBREVIATIONS = (
+    ('strength', 'STR'),
+    ('dexterity', 'DEX'),
+    ('constitution', 'CON'),
+    ('intelligence', 'INT'),
+    ('wisdom', 'WIS'),
+    ('charisma', 'CHA')
+)
+
+# Chat message speaker -> LLM message role (other speakers are left out of the history)
+SPEAKER_TO_ROLE = {
+    'player': 'user',
+    'dm': 'assistant'
+}
+
 # In-memory cache for static prompt components
 _PROMPT_CACHE = {
-    'system_prompt': None,
     'tool_documentation': None
 }
 
 
+@lru_cache(maxsize=8)
+def _read_prompt(path: str, mtime: float) -> str:
+    """
+    Read a prompt file, cached per (path, modification time).
+
+    Editing the file changes its mtime and therefore the cache key, so
+    changes are picked up without restarting the server.
+
+    Args:
+        path: Path to prompt file
+        mtime: File modification time (cache key only)
+
+    Returns:
+        Prompt text
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        prompt = f.read()
+
+    logger.info(f"Loaded system prompt from {path} ({len(prompt)} characters)")
+    return prompt
+
+
 def load_system_prompt(prompt_path: str = None, use_cache: bool = True) -> str:
     """
     Load system prompt from file with optional caching.
 
+    Cached reads are keyed on the file's modification time, so edits to
+    the prompt file invalidate the cache.
+
     Args:
         prompt_path: Path to prompt file (uses default if not provided)
         use_cache: Whether to use in-memory cache (default: True)
@@ -35,31 +76,21 @@ def load_system_prompt(prompt_path: str = None, use_cache: bool = True) -> str:
     Raises:
         FileNotFoundError: If prompt file doesn't exist
     """
-    # Return cached version if available and caching is enabled
-    if use_cache and prompt_path is None and _PROMPT_CACHE['system_prompt']:
-        logger.debug("Using cached system prompt")
-        return _PROMPT_CACHE['system_prompt']
-
     if prompt_path is None:
         prompt_path = DEFAULT_SYSTEM_PROMPT_PATH
     else:
         prompt_path = Path(prompt_path)
 
-    if not prompt_path.exists():
+    try:
+        mtime = prompt_path.stat().st_mtime
+    except FileNotFoundError:
         logger.error(f"System prompt not found at: {prompt_path}")
         raise FileNotFoundError(f"System prompt file not found: {prompt_path}")
 
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        prompt = f.read()
-
-    logger.info(f"Loaded system prompt from {prompt_path} ({len(prompt)} characters)")
+    if not use_cache:
+        return _read_prompt.__wrapped__(str(prompt_path), mtime)
 
-    # Cache if using default path
-    if use_cache and prompt_path == DEFAULT_SYSTEM_PROMPT_PATH:
-        _PROMPT_CACHE['system_prompt'] = prompt
-        logger.debug("Cached system prompt for future use")
-
-    return prompt
+    return _read_prompt(str(prompt_path), mtime)
 
 
 def build_context_prompt(ai_context: Dict[str, Any]) -> str:
@@ -84,197 +115,200 @@ def build_context_prompt(ai_context: Dict[str, Any]) -> str:
         Race: Human, Alignment: Neutral Good
         ...
     """
-    prompt_parts = []
-
-    # === Character Info ===
-    character = ai_context.get('character', {})
-    if character:
-        prompt_parts.append("## Character Information")
-        prompt_parts.append(f"**Name:** {character.get('name', 'Unknown')}")
-
-        if 'description' in character:
-            prompt_parts.append(f"**Description:** {character['description']}")
-
-        # Class and Level
-        char_class = character.get('class', 'unknown').title()
-        level = character.get('level', 1)
-        prompt_parts.append(f"**Class:** {char_class}, Level {level}")
-
-        # Race and Alignment
-        race = character.get('race', 'unknown').title()
-        alignment = character.get('alignment', 'unknown').replace('_', ' ').title()
-        prompt_parts.append(f"**Race:** {race}, **Alignment:** {alignment}")
-
-        # Attributes
-        if 'attributes' in character:
-            attrs = character['attributes']
-            mods = character.get('modifiers', {})
-            attr_line = []
-            for attr in ['strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma']:
-                score = attrs.get(attr, 10)
-                mod = mods.get(attr, 0)
-                mod_str = f"+{mod}" if mod >= 0 else str(mod)
-                attr_line.append(f"{attr[:3].upper()} {score} ({mod_str})")
-            prompt_parts.append(f"**Attributes:** {' | '.join(attr_line)}")
-
-        # HP
-        if 'hp' in character:
-            hp = character['hp']
-            current = hp.get('current', 0)
-            max_hp = hp.get('max', 0)
-            hp_percent = (current / max_hp * 100) if max_hp > 0 else 0
-            status = "healthy" if hp_percent > 75 else "wounded" if hp_percent > 25 else "critical"
-            prompt_parts.append(f"**HP:** {current}/{max_hp} ({status})")
-
-        # Skills
-        if 'skills' in character:
-            skills = character['skills']
-            prof_bonus = skills.get('proficiency_bonus', 2)
-            proficient = skills.get('proficient_skills', [])
-            if proficient:
-                prompt_parts.append(f"**Proficient Skills (+{prof_bonus}):** {', '.join(proficient)}")
-
-        # Magic
-        if 'magic' in character:
-            magic = character['magic']
+    sections = [
+        _format_character(ai_context.get('character', {})),
+        _format_location(ai_context.get('location', {})),
+        _format_inventory(ai_context.get('inventory', [])),
+        _format_recent_events(ai_context.get('recent_events', [])),
+        _format_game_system(ai_context.get('game_system', {})),
+    ]
+    return "\n\n".join(filter(None, sections)) + "\n"
+
+
+def _format_character(character: Dict[str, Any]) -> str:
+    """Format the character section of the context prompt ('' if no character)."""
+    if not character:
+        return ""
+
+    lines = [
+        "## Character Information",
+        f"**Name:** {character.get('name', 'Unknown')}"
+    ]
+
+    if 'description' in character:
+        lines.append(f"**Description:** {character['description']}")
+
+    # Class, level, race and alignment
+    char_class = character.get('class', 'unknown').title()
+    race = character.get('race', 'unknown').title()
+    alignment = character.get('alignment', 'unknown').replace('_', ' ').title()
+    lines.append(f"**Class:** {char_class}, Level {character.get('level', 1)}")
+    lines.append(f"**Race:** {race}, **Alignment:** {alignment}")
+
+    # Attributes
+    attrs = character.get('attributes')
+    if attrs is not None:
+        mods = character.get('modifiers', {})
+        attr_line = ' | '.join(
+            f"{abbr} {attrs.get(attr, 10)} ({mods.get(attr, 0):+d})" for attr, abbr in ATTRIBUTE_ABBREVIATIONS
+        )
+        lines.append(f"**Attributes:** {attr_line}")
+
+    # HP
+    hp = character.get('hp')
+    if hp is not None:
+        current = hp.get('current', 0)
+        max_hp = hp.get('max', 0)
+        hp_percent = (current / max_hp * 100) if max_hp > 0 else 0
+        status = "healthy" if hp_percent > 75 else "wounded" if hp_percent > 25 else "critical"
+        lines.append(f"**HP:** {current}/{max_hp} ({status})")
+
+    # Skills
+    skills = character.get('skills')
+    if skills is not None:
+        proficient = skills.get('proficient_skills', [])
+        if proficient:
+            lines.append(f"**Proficient Skills (+{skills.get('proficiency_bonus', 2)}):** {', '.join(proficient)}")
+
+    # Magic
+    magic = character.get('magic')
+    if magic is not None:
+        slots = magic.get('available_spell_slots', {})
+        if slots:
             spell_ability = magic.get('spellcasting_ability', 'intelligence').upper()
-            slots = magic.get('available_spell_slots', {})
-            if slots:
-                slot_str = ', '.join([f"Level {lvl}: {count}" for lvl, count in slots.items()])
-                prompt_parts.append(f"**Spellcasting ({spell_ability}):** {slot_str} slots available")
-                prompt_parts.append(f"**Known Spells:** {magic.get('known_spells_count', 0)}, "
-                                  f"**Prepared:** {magic.get('prepared_spells_count', 0)}, "
-                                  f"**Cantrips:** {magic.get('cantrips_count', 0)}")
-
-        prompt_parts.append("")  # Blank line
-
-    # === Location ===
-    location = ai_context.get('location', {})
-    if location:
-        prompt_parts.append("## Current Location")
-        region = location.get('region', 'Unknown')
-        prompt_parts.append(f"**Region:** {region}")
-
-        # Nearby entities - show full details so AI knows what exists
-        nearby = location.get('nearby_entities', [])
-        if nearby:
-            npcs = [e for e in nearby if e.get('type') == 'npc']
-            players = [e for e in nearby if e.get('type') == 'player']
-            items = [e for e in nearby if e.get('type') == 'item']
-            containers = [e for e in nearby if e.get('type') == 'container']
-            locations = [e for e in nearby if e.get('type') == 'location']
-
-            if npcs:
-                prompt_parts.append(f"**Nearby NPCs ({len(npcs)}):**")
-                for npc in npcs:
-                    desc_parts = [f"  • **{npc['name']}**"]
-                    if npc.get('race'):
-                        desc_parts.append(f"({npc['race']}")
-                        if npc.get('occupation'):
-                            desc_parts[-1] += f" {npc['occupation']}"
-                        desc_parts[-1] += ")"
-                    elif npc.get('occupation'):
-                        desc_parts.append(f"({npc['occupation']})")
-                    if npc.get('description'):
-                        desc_parts.append(f"- {npc['description']}")
-                    prompt_parts.append(' '.join(desc_parts))
-
-            if players:
-                player_list = ', '.join([p['name'] for p in players])
-                prompt_parts.append(f"**Other Players:** {player_list}")
-
-            if items:
-                prompt_parts.append(f"**Nearby Items ({len(items)}):**")
-                for item in items:
-                    desc = f"  • **{item['name']}**"
-                    # Show ownership if item is owned by an NPC
-                    if item.get('owned_by'):
-                        desc += f" (owned by {item['owned_by']})"
-                    if item.get('description'):
-                        desc += f" - {item['description']}"
-                    prompt_parts.append(desc)
-
-            if containers:
-                prompt_parts.append(f"**Nearby Containers ({len(containers)}):**")
-                for container in containers:
-                    desc = f"  • **{container['name']}**"
-                    if container.get('description'):
-                        desc += f" - {container['description']}"
-                    prompt_parts.append(desc)
-
-            if locations:
-                prompt_parts.append(f"**Nearby Locations ({len(locations)}):**")
-                for loc in locations:
-                    desc = f"  • **{loc['name']}**"
-                    if loc.get('description'):
-                        desc += f" - {loc['description']}"
-                    prompt_parts.append(desc)
-
-            # Catch-all for any other entity types
-            other = [e for e in nearby if e.get('type') not in ['npc', 'player', 'item', 'container', 'location']]
-            if other:
-                prompt_parts.append(f"**Other Nearby Entities ({len(other)}):**")
-                for entity in other:
-                    desc = f"  • **{entity['name']}** (type: {entity.get('type', 'unknown')})"
-                    if entity.get('description'):
-                        desc += f" - {entity['description']}"
-                    prompt_parts.append(desc)
-
-        prompt_parts.append("")  # Blank line
-
-    # === Inventory ===
-    inventory = ai_context.get('inventory', [])
-    prompt_parts.append("## Inventory")
-    prompt_parts.append("**Items currently owned by the player character:**")
-
+            slot_str = ', '.join([f"Level {lvl}: {count}" for lvl, count in slots.items()])
+            lines.append(f"**Spellcasting ({spell_ability}):** {slot_str} slots available")
+            lines.append(f"**Known Spells:** {magic.get('known_spells_count', 0)}, "
+                         f"**Prepared:** {magic.get('prepared_spells_count', 0)}, "
+                         f"**Cantrips:** {magic.get('cantrips_count', 0)}")
+
+    return "\n".join(lines)
+
+
+def _format_location(location: Dict[str, Any]) -> str:
+    """Format the location and nearby entities section ('' if no location)."""
+    if not location:
+        return ""
+
+    lines = [
+        "## Current Location",
+        f"**Region:** {location.get('region', 'Unknown')}"
+    ]
+
+    # Nearby entities - show full details so AI knows what exists
+    nearby = location.get('nearby_entities', [])
+    if nearby:
+        # Group by type in a single pass; unknown types go to the catch-all
+        npcs, players, items, containers, locations, other = [], [], [], [], [], []
+        by_type = {'npc': npcs, 'player': players, 'item': items, 'container': containers, 'location': locations}
+        for entity in nearby:
+            by_type.get(entity.get('type'), other).append(entity)
+
+        if npcs:
+            lines.append(f"**Nearby NPCs ({len(npcs)}):**")
+            for npc in npcs:
+                race = npc.get('race')
+                occupation = npc.get('occupation')
+                description = npc.get('description')
+                if race and occupation:
+                    identity = f" ({race} {occupation})"
+                else:
+                    identity = f" ({race or occupation})" if race or occupation else ""
+                details = f" - {description}" if description else ""
+                lines.append(f"  • **{npc['name']}**{identity}{details}")
+
+        if players:
+            player_list = ', '.join([p['name'] for p in players])
+            lines.append(f"**Other Players:** {player_list}")
+
+        if items:
+            lines.append(f"**Nearby Items ({len(items)}):**")
+            for item in items:
+                desc = f"  • **{item['name']}**"
+                # Show ownership if item is owned by an NPC
+                owned_by = item.get('owned_by')
+                if owned_by:
+                    desc += f" (owned by {owned_by})"
+                description = item.get('description')
+                if description:
+                    desc += f" - {description}"
+                lines.append(desc)
+
+        if containers:
+            lines.append(f"**Nearby Containers ({len(containers)}):**")
+            for container in containers:
+                description = container.get('description')
+                lines.append(f"  • **{container['name']}** - {description}" if description
+                             else f"  • **{container['name']}**")
+
+        if locations:
+            lines.append(f"**Nearby Locations ({len(locations)}):**")
+            for loc in locations:
+                description = loc.get('description')
+                lines.append(f"  • **{loc['name']}** - {description}" if description
+                             else f"  • **{loc['name']}**")
+
+        # Catch-all for any other entity types
+        if other:
+            lines.append(f"**Other Nearby Entities ({len(other)}):**")
+            for entity in other:
+                desc = f"  • **{entity['name']}** (type: {entity.get('type', 'unknown')})"
+                description = entity.get('description')
+                if description:
+                    desc += f" - {description}"
+                lines.append(desc)
+
+    return "\n".join(lines)
+
+
+def _format_inventory(inventory: List[Dict[str, Any]]) -> str:
+    """Format the inventory section (always present, even when empty)."""
     # List all items with quantities
     items_list = []
     for item in inventory:
-        name = item['name']
         qty = item.get('quantity', 1)
-        if qty > 1:
-            items_list.append(f"{name} x{qty}")
-        else:
-            items_list.append(name)
+        items_list.append(f"{item['name']} x{qty}" if qty > 1 else item['name'])
 
-    if items_list:
-        # Show in comma-separated list
-        prompt_parts.append(', '.join(items_list))
-    else:
-        prompt_parts.append("*Empty - player owns no items*")
-
-    prompt_parts.append("")
-    prompt_parts.append("⚠️ IMPORTANT: If your narrative describes the player using, holding, or manipulating an item, it MUST be in this inventory list. If it's not, you must use transfer_item to give it to them first.")
-    prompt_parts.append("")  # Blank line
-
-    # === Recent Events ===
-    recent_events = ai_context.get('recent_events', [])
-    if recent_events and len(recent_events) > 0:
-        prompt_parts.append("## Recent Events")
-        for event in recent_events[-3:]:  # Last 3 events
-            summary = event.get('summary', 'Unknown event')
-            prompt_parts.append(f"- {summary}")
-        prompt_parts.append("")  # Blank line
-
-    # === Game System (Registries) ===
-    game_system = ai_context.get('game_system', {})
-    if game_system:
-        prompt_parts.append("## Game System")
-        prompt_parts.append("Available options in this game world:")
-        prompt_parts.append("")
-
-        for registry_name, items in game_system.items():
-            if items:
-                # Format registry name nicely (e.g., "skill_types" -> "Skill Types")
-                display_name = registry_name.replace('_', ' ').title()
-                prompt_parts.append(f"**{display_name}:**")
-
-                # Show items in a compact list
-                item_list = ', '.join([f"{item['key']}" for item in items])
-                prompt_parts.append(f"  {item_list}")
-                prompt_parts.append("")  # Blank line between registries
-
-    return "\n".join(prompt_parts)
+    # Show in comma-separated list
+    items_line = ', '.join(items_list) if items_list else "*Empty - player owns no items*"
+
+    return (
+        "## Inventory\n"
+        "**Items currently owned by the player character:**\n"
+        f"{items_line}\n"
+        "\n"
+        "⚠️ IMPORTANT: If your narrative describes the player using, holding, or manipulating an item, "
+        "it MUST be in this inventory list. If it's not, you must use transfer_item to give it to them first."
+    )
+
+
+def _format_recent_events(recent_events: List[Dict[str, Any]]) -> str:
+    """Format the last three recent events ('' if there are none)."""
+    if not recent_events:
+        return ""
+
+    lines = ["## Recent Events"]
+    lines.extend(f"- {event.get('summary', 'Unknown event')}" for event in recent_events[-3:])
+    return "\n".join(lines)
+
+
+def _format_game_system(game_system: Dict[str, List[Dict]]) -> str:
+    """Format the registry options section ('' if no registries)."""
+    if not game_system:
+        return ""
+
+    lines = ["## Game System", "Available options in this game world:"]
+
+    for registry_name, items in game_system.items():
+        if items:
+            # Format registry name nicely (e.g., "skill_types" -> "Skill Types")
+            display_name = registry_name.replace('_', ' ').title()
+
+            # Show items in a compact list, blank line between registries
+            item_list = ', '.join([item['key'] for item in items])
+            lines.append(f"\n**{display_name}:**\n  {item_list}")
+
+    return "\n".join(lines)
 
 
 def build_message_history(messages: List[Dict], limit: int = 10, player_message: str = None) -> List[Dict[str, str]]:
@@ -304,14 +338,9 @@ def build_message_history(messages: List[Dict], limit: int = 10, player_message:
     llm_messages = []
 
     for msg in messages[-limit:]:  # Last N messages
-        # Map speaker to LLM role
-        speaker = msg.get('speaker', 'unknown')
-        if speaker == 'player':
-            role = 'user'
-        elif speaker == 'dm':
-            role = 'assistant'
-        else:
-            # System messages are skipped (or could be included as user)
+        # Map speaker to LLM role; system messages are skipped
+        role = SPEAKER_TO_ROLE.get(msg.get('speaker'))
+        if role is None:
             continue
 
         content = msg.get('message', '')
@@ -332,11 +361,83 @@ def build_message_history(messages: List[Dict], limit: int = 10, player_message:
     return llm_messages
 
 
+def build_cached_message_history(
+    messages: List[Dict],
+    player_message: str,
+    ai_context: Dict[str, Any],
+    limit: int = 10,
+    total_messages: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Build LLM messages with a cache-stable prefix (Anthropic format).
+
+    Anthropic prompt caching only hits on an exact prefix match, so the
+    committed conversation turns are laid out to stay byte-identical across
+    requests and the per-turn game state travels with the new user turn at
+    the tail instead of in the system prompt:
+
+    - The history window start is snapped to a multiple of ``limit`` of the
+      absolute message position, so it only moves once every ``limit``
+      messages (between ``limit`` and ``2 * limit - 1`` messages are sent)
+      rather than sliding every turn. Pass ``total_messages`` when
+      ``messages`` is only the tail of a longer conversation (e.g. the
+      capped history cache), otherwise the window would slide with the cap.
+    - The last committed turn carries a ``cache_control`` breakpoint.
+    - The final user turn holds the current game state followed by the
+      player's message.
+
+    Use together with ``build_full_prompt(..., include_game_state=False)``.
+
+    Args:
+        messages: List of message dicts from conversation history
+        player_message: Current player message
+        ai_context: Context from engine.generate_ai_context()
+        limit: Base history window size (default: 10)
+        total_messages: Number of messages in the whole conversation that
+                        ``messages`` ends with (default: len(messages))
+
+    Returns:
+        List of formatted messages for LLM
+    """
+    if total_messages is None:
+        total_messages = len(messages)
+
+    # Snap on the absolute position, then map into the (possibly capped) list
+    first_position = total_messages - len(messages)
+    window_start = (max(0, total_messages - limit) // limit) * limit
+    window = messages[max(0, window_start - first_position):]
+    llm_messages = build_message_history(window, limit=len(window))
+
+    # Cache breakpoint on the last committed turn
+    if llm_messages:
+        last = llm_messages[-1]
+        llm_messages[-1] = {
+            'role': last['role'],
+            'content': [{
+                'type': 'text',
+                'text': last['content'],
+                'cache_control': {'type': 'ephemeral'}
+            }]
+        }
+
+    llm_messages.append({
+        'role': 'user',
+        'content': [
+            {'type': 'text', 'text': f"# Current Game State\n\n{build_context_prompt(ai_context)}"},
+            {'type': 'text', 'text': player_message}
+        ]
+    })
+
+    logger.debug(f"Built {len(llm_messages)} cache-stable messages for LLM context")
+    return llm_messages
+
+
 def build_full_prompt(
     ai_context: Dict[str, Any],
     system_prompt: str = None,
     include_tool_docs: bool = True,
-    use_caching: bool = True
+    use_caching: bool = True,
+    include_game_state: bool = True
 ):
     """
     Build complete system prompt with context.
@@ -351,6 +452,10 @@ def build_full_prompt(
         use_caching: Whether to use Anthropic prompt caching (default: True)
                     Returns list format with cache_control when True,
                     string format when False
+        include_game_state: Whether to append the current game state (default: True).
+                    Pass False when the game state is sent with the user turn
+                    (see build_cached_message_history) so the system prompt
+                    stays fully static and cacheable
 
     Returns:
         Complete system prompt - either as structured list (with caching) or string
@@ -367,7 +472,7 @@ def build_full_prompt(
     if system_prompt is None:
         system_prompt = load_system_prompt()
 
-    context_prompt = build_context_prompt(ai_context)
+    context_prompt = build_context_prompt(ai_context) if include_game_state else None
 
     # Get tool documentation if requested (with caching)
     tool_docs = None
@@ -406,10 +511,11 @@ def build_full_prompt(
             })
 
         # Block 3: Current game state (NOT CACHED - changes every turn)
-        system_blocks.append({
-            "type": "text",
-            "text": f"---\n\n# Current Game State\n\n{context_prompt}"
-        })
+        if include_game_state:
+            system_blocks.append({
+                "type": "text",
+                "text": f"---\n\n# Current Game State\n\n{context_prompt}"
+            })
 
         total_chars = sum(len(block["text"]) for block in system_blocks)
         logger.debug(f"Built prompt with caching: {total_chars} characters across {len(system_blocks)} blocks")
@@ -422,7 +528,8 @@ def build_full_prompt(
         if tool_docs:
             prompt_sections.append(f"---\n\n{tool_docs}")
 
-        prompt_sections.append(f"---\n\n# Current Game State\n\n{context_prompt}")
+        if include_game_state:
+            prompt_sections.append(f"---\n\n# Current Game State\n\n{context_prompt}")
 
         full_prompt = "\n\n".join(prompt_sections)
         logger.debug(f"Built full prompt (string): {len(full_prompt)} characters")
@@ -433,5 +540,6 @@ __all__ = [
     'load_system_prompt',
     'build_context_prompt',
     'build_message_history',
+    'build_cached_message_history',
     'build_full_prompt'
 ]
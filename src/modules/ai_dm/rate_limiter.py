@@ -0,0 +1,236 @@
+"""
+Client-side Rate Limiter for AI DM.
+
+Paces LLM requests against the provider's requests-per-minute and
+tokens-per-minute quotas using sliding one-minute windows. When the
+provider still answers with a rate-limit error, the limits are cut
+multiplicatively and then recovered additively on each success (AIMD),
+so bursts turn into smooth pacing instead of rejected requests.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter for request and token throughput.
+
+    Limits of 0 disable the corresponding check.
+
+    Example:
+        limiter = RateLimiter(requests_per_minute=50, tokens_per_minute=80000)
+        limiter.acquire(estimated_tokens=5000)  # Blocks until within quota
+        ...
+        limiter.record_success()
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    # AIMD: limits are multiplied by DECREASE_FACTOR on a rate-limit error and
+    # grow back by 1/RECOVERY_STEPS of the configured maximum per success
+    DECREASE_FACTOR = 0.5
+    RECOVERY_STEPS = 50
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Optional[Callable[[float], None]] = None
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            requests_per_minute: Maximum requests per minute (0 for unlimited)
+            tokens_per_minute: Maximum tokens per minute (0 for unlimited)
+            clock: Monotonic time source (injectable for tests)
+            sleep: Sleep function (injectable for tests). Defaults to
+                   time.sleep looked up at call time, so it is eventlet's
+                   green sleep once the server has monkey-patched.
+        """
+        self.max_requests = requests_per_minute
+        self.max_tokens = tokens_per_minute
+        self.request_limit = float(requests_per_minute)
+        self.token_limit = float(tokens_per_minute)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._window = deque()  # (timestamp, tokens) per admitted request
+        self._window_tokens = 0
+        self._blocked_until = 0.0
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """
+        Wait until a request of the given size fits within the limits.
+
+        Args:
+            estimated_tokens: Expected input + output tokens for the request
+
+        Returns:
+            Total time spent waiting, in seconds
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._prune(now)
+                delay = self._wait_time(now, estimated_tokens)
+                if delay <= 0:
+                    self._window.append((now, estimated_tokens))
+                    self._window_tokens += estimated_tokens
+                    if waited:
+                        logger.info(f"Rate limiter delayed LLM request by {waited:.1f}s")
+                    return waited
+
+            (self._sleep or time.sleep)(delay)
+            waited += delay
+
+    def record_success(self) -> None:
+        """Additively raise the limits back toward their configured maximum."""
+        with self._lock:
+            if self.max_requests:
+                self.request_limit = min(
+                    self.max_requests,
+                    self.request_limit + self.max_requests / self.RECOVERY_STEPS
+                )
+            if self.max_tokens:
+                self.token_limit = min(
+                    self.max_tokens,
+                    self.token_limit + self.max_tokens / self.RECOVERY_STEPS
+                )
+
+    def record_rate_limit(self, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicatively lower the limits after the provider rejected a request.
+
+        Args:
+            retry_after: Seconds the provider asked us to wait, if given
+        """
+        with self._lock:
+            if self.max_requests:
+                self.request_limit = max(1.0, self.request_limit * self.DECREASE_FACTOR)
+            if self.max_tokens:
+                self.token_limit = max(1.0, self.token_limit * self.DECREASE_FACTOR)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+
+            logger.warning(
+                f"⚠️  Rate limited by provider, lowering limits to "
+                f"{self.request_limit:.0f} RPM / {self.token_limit:.0f} TPM"
+            )
+
+    def _prune(self, now: float) -> None:
+        """Drop requests that have left the sliding window."""
+        cutoff = now - self.WINDOW_SECONDS
+        while self._window and self._window[0][0] <= cutoff:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Seconds until a request of the given size may proceed (<= 0 if now)."""
+        delay = self._blocked_until - now
+
+        if self.max_requests and len(self._window) >= self.request_limit:
+            # Wait until enough old requests expire to get below the limit
+            excess = len(self._window) - math.ceil(self.request_limit)
+            expires_at = self._window[excess][0] + self.WINDOW_SECONDS
+            delay = max(delay, expires_at - now)
+
+        if self.max_tokens and self._window and self._window_tokens + tokens > self.token_limit:
+            # Wait until enough tokens expire; an oversized request only needs an empty window
+            remaining = self._window_tokens
+            for timestamp, used in self._window:
+                remaining -= used
+                if remaining + tokens <= self.token_limit or remaining == 0:
+                    delay = max(delay, timestamp + self.WINDOW_SECONDS - now)
+                    break
+
+        return delay
+
+
+# Expected response length used for budgeting; most DM replies are far
+# shorter than max_tokens, and reserving the full budget per call starves
+# the token quota during tool-use rounds
+ESTIMATED_OUTPUT_TOKENS = 1024
+
+
+def estimate_tokens(messages, system=None, max_tokens: int = 0) -> int:
+    """
+    Roughly estimate the tokens a request will consume.
+
+    Uses the common ~4 characters per token heuristic for the prompt and
+    min(max_tokens, ESTIMATED_OUTPUT_TOKENS) for the response. Content up
+    to the last cache_control breakpoint is read from the provider's
+    prompt cache and not counted (the first, cache-writing request is
+    underestimated; the AIMD backoff absorbs that).
+
+    Args:
+        messages: LLM messages (string or content-block content)
+        system: System prompt (string or content blocks)
+        max_tokens: Maximum response tokens
+
+    Returns:
+        Estimated token count
+    """
+    segments = []
+    if system:
+        segments.extend(system if isinstance(system, list) else [system])
+    for message in messages:
+        content = message.get('content', '')
+        segments.extend(content if isinstance(content, list) else [content])
+
+    # Everything up to and including the last breakpoint is a cached prefix
+    for index in range(len(segments) - 1, -1, -1):
+        if isinstance(segments[index], dict) and 'cache_control' in segments[index]:
+            segments = segments[index + 1:]
+            break
+
+    chars = 0
+    for segment in segments:
+        if isinstance(segment, dict) and 'text' in segment:
+            chars += len(segment['text'])
+        else:
+            chars += len(str(segment))
+    return chars // 4 + min(max_tokens, ESTIMATED_OUTPUT_TOKENS)
+
+
+# Shared rate limiter instance (lazy-loaded)
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide rate limiter (singleton pattern).
+
+    Returns:
+        RateLimiter sized from config.ai_requests_per_minute and
+        config.ai_tokens_per_minute
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                from src.core.config import get_config
+                config = get_config()
+                _rate_limiter = RateLimiter(
+                    requests_per_minute=config.ai_requests_per_minute,
+                    tokens_per_minute=config.ai_tokens_per_minute
+                )
+    return _rate_limiter
+
+
+__all__ = [
+    'RateLimiter',
+    'ESTIMATED_OUTPUT_TOKENS',
+    'estimate_tokens',
+    'get_rate_limiter'
+]
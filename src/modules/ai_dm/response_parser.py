@@ -5,13 +5,53 @@ Extracts narrative text and suggested actions from LLM responses.
 Handles various response formats and provides fallback actions.
 """
 
+import copy
 import re
 import json
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# <actions>[...]</actions> block at the end of a DM response
+ACTIONS_OPEN_TAG = '<actions>'
+ACTIONS_CLOSE_TAG = '</actions>'
+ACTIONS_PATTERN = re.compile(r'<actions>\s*(.*?)\s*</actions>', re.DOTALL | re.IGNORECASE)
+
+# Generic actions used when the LLM response has none (see get_fallback_actions)
+FALLBACK_ACTIONS = (
+    {
+        'label': '🔍 Look Around',
+        'action_type': 'roll_dice',
+        'action_data': {
+            'dice': '1d20',
+            'label': 'Perception Check'
+        }
+    },
+    {
+        'label': '💬 Talk',
+        'action_type': 'custom',
+        'action_data': {
+            'action': 'initiate_dialogue'
+        }
+    },
+    {
+        'label': '🚶 Move',
+        'action_type': 'custom',
+        'action_data': {
+            'action': 'move'
+        }
+    }
+)
+
+# Types json.dumps serializes as-is (also valid as object keys)
+JSON_SCALAR_TYPES = (str, int, float, bool, type(None))
+
 
 def parse_dm_response(raw_response: str) -> Tuple[str, List[Dict]]:
     """
@@ -47,19 +87,16 @@ def parse_dm_response(raw_response: str) -> Tuple[str, List[Dict]]:
     logger.debug(f"Parsing response: {len(raw_response)} characters")
 
     # Extract actions section
-    actions_match = re.search(
-        r'<actions>\s*(.*?)\s*</actions>',
-        raw_response,
-        re.DOTALL | re.IGNORECASE
-    )
+    actions_block = _find_actions_block(raw_response)
 
     suggested_actions = []
-    if actions_match:
-        actions_json = actions_match.group(1).strip()
+    if actions_block:
+        narrative_end, actions_json = actions_block
         logger.debug(f"Found <actions> block, length: {len(actions_json)} chars")
 
         try:
-            suggested_actions = json.loads(actions_json)
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            suggested_actions = orjson.loads(actions_json) if orjson else json.loads(actions_json)
             logger.info(f"✓ Parsed {len(suggested_actions)} actions from response")
 
             # Validate action format
@@ -79,12 +116,12 @@ def parse_dm_response(raw_response: str) -> Tuple[str, List[Dict]]:
             logger.info(f"Using {len(suggested_actions)} fallback actions")
 
         # Remove actions section from narrative
-        narrative = raw_response[:actions_match.start()].strip()
+        narrative = raw_response[:narrative_end]
         logger.debug(f"Extracted narrative: {len(narrative)} chars")
     else:
         logger.warning("⚠️  No <actions> section found in AI response!")
         logger.debug(f"Response preview: {raw_response[:300]}...")
-        narrative = raw_response.strip()
+        narrative = raw_response
         suggested_actions = get_fallback_actions()
         logger.info(f"Using {len(suggested_actions)} fallback actions")
 
@@ -101,6 +138,34 @@ def parse_dm_response(raw_response: str) -> Tuple[str, List[Dict]]:
     return narrative, suggested_actions
 
 
+def _find_actions_block(raw_response: str) -> Optional[Tuple[int, str]]:
+    """
+    Locate the <actions> block in a response.
+
+    Tries plain substring search for the lowercase tags the system prompt
+    asks for, and only falls back to the case-insensitive regex when they
+    aren't both present.
+
+    Args:
+        raw_response: Raw text from LLM
+
+    Returns:
+        Tuple of (offset where the block starts, stripped block contents),
+        or None if there is no actions block
+    """
+    start = raw_response.find(ACTIONS_OPEN_TAG)
+    if start != -1:
+        content_start = start + len(ACTIONS_OPEN_TAG)
+        end = raw_response.find(ACTIONS_CLOSE_TAG, content_start)
+        if end != -1:
+            return start, raw_response[content_start:end].strip()
+
+    actions_match = ACTIONS_PATTERN.search(raw_response)
+    if actions_match:
+        return actions_match.start(), actions_match.group(1).strip()
+    return None
+
+
 def validate_action(action: Dict) -> bool:
     """
     Validate that an action has required fields and safe data.
@@ -132,9 +197,11 @@ def validate_action(action: Dict) -> bool:
     # Ensure action_data can be safely JSON-serialized
     if 'action_data' in action:
         try:
-            json.dumps(action['action_data'])
-        except (TypeError, ValueError) as e:
-            logger.warning(f"action_data cannot be JSON-serialized: {e}")
+            serializable = _is_json_serializable(action['action_data'])
+        except RecursionError:
+            serializable = False  # Circular reference
+        if not serializable:
+            logger.warning(f"action_data cannot be JSON-serialized: {action}")
             return False
 
     # Validate string fields don't contain problematic characters for HTML/JS
@@ -146,11 +213,34 @@ def validate_action(action: Dict) -> bool:
     return True
 
 
+def _is_json_serializable(value) -> bool:
+    """
+    Check whether json.dumps would accept a value, without serializing it.
+
+    Args:
+        value: Value to check
+
+    Returns:
+        True if value only contains JSON-compatible types
+    """
+    if isinstance(value, JSON_SCALAR_TYPES):
+        return True
+    if isinstance(value, dict):
+        return all(
+            isinstance(key, JSON_SCALAR_TYPES) and _is_json_serializable(item)
+            for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return all(_is_json_serializable(item) for item in value)
+    return False
+
+
 def clean_narrative(text: str) -> str:
     """
     Clean up narrative text.
 
-    Removes extra whitespace, fixes common formatting issues.
+    Removes trailing whitespace from lines and collapses consecutive
+    blank (or whitespace-only) lines into one.
 
     Args:
         text: Raw narrative text
@@ -158,50 +248,34 @@ def clean_narrative(text: str) -> str:
     Returns:
         Cleaned narrative text
     """
-    # Remove multiple blank lines
-    text = re.sub(r'\n\n\n+', '\n\n', text)
-
-    # Remove leading/trailing whitespace from lines
-    lines = [line.rstrip() for line in text.split('\n')]
-    text = '\n'.join(lines)
+    # Strip trailing whitespace from lines and collapse runs of blank lines, in one pass
+    lines = []
+    blank_run = 0
+    for line in text.split('\n'):
+        line = line.rstrip()
+        if line:
+            blank_run = 0
+        else:
+            blank_run += 1
+            if blank_run > 1:
+                continue
+        lines.append(line)
 
     # Remove leading/trailing whitespace overall
-    text = text.strip()
-
-    return text
+    return '\n'.join(lines).strip()
 
 
 def get_fallback_actions() -> List[Dict]:
     """
     Get default fallback actions when LLM doesn't provide them.
 
+    Each call returns fresh copies, so callers may modify the actions
+    without affecting FALLBACK_ACTIONS.
+
     Returns:
         List of generic actions suitable for most situations
     """
-    return [
-        {
-            'label': '🔍 Look Around',
-            'action_type': 'roll_dice',
-            'action_data': {
-                'dice': '1d20',
-                'label': 'Perception Check'
-            }
-        },
-        {
-            'label': '💬 Talk',
-            'action_type': 'custom',
-            'action_data': {
-                'action': 'initiate_dialogue'
-            }
-        },
-        {
-            'label': '🚶 Move',
-            'action_type': 'custom',
-            'action_data': {
-                'action': 'move'
-            }
-        }
-    ]
+    return copy.deepcopy(list(FALLBACK_ACTIONS))
 
 
 def extract_dice_notation(action: Dict) -> str:
@@ -9,7 +9,7 @@ their own tools (e.g., spell casting, crafting, etc.).
 """
 
 import logging
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Optional
 from datetime import datetime
 from .entity_resolver import EntityResolver
 
@@ -30,6 +30,9 @@ def _format_success(message: str) -> str:
 _tool_registry: Dict[str, Callable] = {}
 _tool_definitions: List[Dict[str, Any]] = []
 
+# Anthropic-format tool list, rebuilt only when the registry changes
+_anthropic_tools_cache: Optional[List[Dict[str, Any]]] = None
+
 
 def register_tool(definition: Dict[str, Any], handler: Callable):
     """
@@ -57,9 +60,11 @@ def register_tool(definition: Dict[str, Any], handler: Callable):
             }
         }, cast_spell_handler)
     """
+    global _anthropic_tools_cache
     tool_name = definition['name']
     _tool_registry[tool_name] = handler
     _tool_definitions.append(definition)
+    _anthropic_tools_cache = None
     logger.info(f"Registered tool: {tool_name}")
 
 
@@ -68,6 +73,27 @@ def get_tool_definitions() -> List[Dict[str, Any]]:
     return _tool_definitions.copy()
 
 
+def get_anthropic_tools() -> List[Dict[str, Any]]:
+    """
+    Get all registered tools in Anthropic API format.
+
+    The list is built once and reused until another tool is registered, so
+    every request sends a byte-identical tools block (which also keeps the
+    provider prompt cache warm). Callers must not mutate the result.
+    """
+    global _anthropic_tools_cache
+    if _anthropic_tools_cache is None:
+        _anthropic_tools_cache = [
+            {
+                "name": tool["name"],
+                "description": tool["description"],
+                "input_schema": tool["input_schema"]
+            }
+            for tool in _tool_definitions
+        ]
+    return _anthropic_tools_cache
+
+
 def get_tool_handler(tool_name: str) -> Callable:
     """Get the handler function for a tool."""
     return _tool_registry.get(tool_name)
@@ -2639,4 +2665,4 @@ def _initialize_core_tools():
 _initialize_core_tools()
 
 
-__all__ = ['execute_tool', 'register_tool', 'get_tool_definitions', 'get_tool_handler', 'generate_tool_documentation']
+__all__ = ['execute_tool', 'register_tool', 'get_tool_definitions', 'get_anthropic_tools', 'get_tool_handler', 'generate_tool_documentation']
@@ -0,0 +1,88 @@
+"""
+Fast JSON provider for Flask.
+
+Serializes jsonify() responses with orjson when it is installed (optional
+dependency) and keeps Flask's built-in provider otherwise.
+"""
+
+import logging
+from typing import Any
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Output matches DefaultJSONProvider for everything jsonify() is used
+    with here: keys are sorted, datetimes and dataclasses still go through
+    Flask's default() (RFC 822 dates, dataclasses.asdict). Non-ASCII text
+    is written as UTF-8 instead of escapes. Calls that need json.dumps
+    options orjson doesn't have (e.g. indent for debug pretty-printing)
+    fall back to the built-in implementation.
+    """
+
+    # json.dumps keyword arguments orjson's compact output already satisfies
+    COMPATIBLE_DUMPS_ARGS = {'separators'}
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """
+        Serialize data as JSON to a string.
+
+        Args:
+            obj: The data to serialize
+            **kwargs: json.dumps arguments (anything beyond compact
+                      separators uses the built-in json module)
+
+        Returns:
+            JSON string
+        """
+        if kwargs.keys() - self.COMPATIBLE_DUMPS_ARGS:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        """
+        Deserialize JSON from a string or bytes.
+
+        Args:
+            s: Text or UTF-8 bytes
+            **kwargs: json.loads arguments (uses the built-in json module if given)
+
+        Returns:
+            Deserialized data
+        """
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def configure_json_provider(app: Flask) -> None:
+    """
+    Use OrjsonProvider for the app if orjson is installed.
+
+    Args:
+        app: Flask application
+    """
+    if orjson is None:
+        logger.debug("orjson not installed, using Flask's built-in JSON provider")
+        return
+
+    app.json = OrjsonProvider(app)
+    logger.info("Using orjson for JSON responses")
+
+
+__all__ = ['OrjsonProvider', 'configure_json_provider']
@@ -8,7 +8,17 @@ Flask app with separate client (player) and host (DM) interfaces.
 - WebSocket support for real-time updates
 """
 
+# Patch blocking I/O for eventlet before anything else imports socket/threading.
+# Without this a long-running LLM request blocks the single eventlet hub, and
+# with it every other HTTP and WebSocket request, until the model finishes.
+# This covers `python src/web/server.py`; WSGI servers import src.web.wsgi,
+# which patches the same way before importing this module.
+if __name__ == '__main__':
+    import eventlet
+    eventlet.monkey_patch()
+
 import logging
+from eventlet import patcher as eventlet_patcher
 from flask import Flask, jsonify, request, redirect, url_for, session, render_template, flash
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import sys
@@ -22,6 +32,7 @@ from src.core.state_engine import StateEngine
 from src.core.module_loader import ModuleLoader
 from src.core.models import Event
 from src.web.blueprints import client_bp, host_bp
+from src.web.json_provider import configure_json_provider
 from src.core.logging_config import setup_logging
 
 # Setup logging for the application
@@ -36,6 +47,13 @@ def create_app(worlds_dir: str = 'worlds'):
     """
     Create Flask app with SocketIO support for real-time features.
 
+    The app runs SocketIO in eventlet mode but does not monkey-patch the
+    standard library itself: patching has to happen before anything else
+    is imported. Use src.web.wsgi (or run this file) to get an app that is
+    patched in the right order; a warning is logged if the app is created
+    unpatched, since blocking I/O such as LLM requests would then stall
+    every other request.
+
     Args:
         worlds_dir: Directory containing world folders (default: 'worlds')
 
@@ -44,9 +62,16 @@ def create_app(worlds_dir: str = 'worlds'):
     """
     global socketio
 
+    if not eventlet_patcher.is_monkey_patched('socket'):
+        logger.warning(
+            "⚠️  eventlet.monkey_patch() has not run - LLM calls will block other requests. "
+            "Serve the app through src.web.wsgi instead of importing create_app() directly."
+        )
+
     app = Flask(__name__)
     app.config['WORLDS_DIR'] = worlds_dir
     app.config['SECRET_KEY'] = os.urandom(24)  # For sessions and flash messages
+    configure_json_provider(app)  # orjson for jsonify() if installed
 
     # Initialize StateEngine instance cache
     # Each world gets one StateEngine that persists for the app lifetime
@@ -0,0 +1,477 @@
+const entityId = document.querySelector('.dm-chat-page-container').dataset.entityId;
+let isLoading = false;
+
+function reloadMessages() {
+    // Fetch updated messages HTML without reloading the page
+    // Keep the page's ?history=all (if any) so expanded history stays expanded
+    fetch('/api/dm/chat_display/' + entityId + window.location.search)
+    .then(response => response.text())
+    .then(html => {
+        const messagesDiv = document.getElementById('dm-messages');
+        if (messagesDiv) {
+            messagesDiv.innerHTML = html;
+            // Auto-scroll to bottom
+            messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        }
+    })
+    .catch(error => {
+        console.error('Failed to reload messages:', error);
+    });
+}
+
+function setLoadingState(loading) {
+    isLoading = loading;
+    const input = document.getElementById('dm-input');
+    const button = document.getElementById('send-button');
+    const buttonText = document.getElementById('send-button-text');
+    const buttonSpinner = document.getElementById('send-button-spinner');
+
+    if (loading) {
+        input.disabled = true;
+        button.disabled = true;
+        button.style.opacity = '0.6';
+        button.style.cursor = 'not-allowed';
+        buttonText.style.display = 'none';
+        buttonSpinner.style.display = 'inline-block';
+    } else {
+        input.disabled = false;
+        button.disabled = false;
+        button.style.opacity = '1';
+        button.style.cursor = 'pointer';
+        buttonText.style.display = 'inline';
+        buttonSpinner.style.display = 'none';
+    }
+}
+
+function sendDMMessage() {
+    const input = document.getElementById('dm-input');
+    const message = input.value.trim();
+
+    if (!message || isLoading) return;
+
+    setLoadingState(true);
+    input.value = '';  // Clear input immediately
+
+    // Add player message to UI immediately
+    const messagesDiv = document.getElementById('dm-messages');
+    const playerMsgDiv = document.createElement('div');
+    playerMsgDiv.className = 'dm-message dm-speaker-player';
+    playerMsgDiv.innerHTML = `
+        <div class="dm-message-header">
+            <strong class="dm-speaker-name">
+                You
+            </strong>
+        </div>
+        <div class="dm-message-text">
+            ${escapeHtml(message)}
+        </div>
+    `;
+    messagesDiv.appendChild(playerMsgDiv);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+
+    // Create DM message div that will be populated via streaming
+    const dmMsgDiv = document.createElement('div');
+    dmMsgDiv.className = 'dm-message dm-speaker-dm';
+    dmMsgDiv.innerHTML = `
+        <div class="dm-message-header">
+            <strong class="dm-speaker-name">
+                Dungeon Master
+            </strong>
+        </div>
+        <div class="dm-message-text dm-streaming-text">
+            <span class="cursor-blink">▊</span>
+        </div>
+    `;
+    messagesDiv.appendChild(dmMsgDiv);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+
+    const streamingTextDiv = dmMsgDiv.querySelector('.dm-streaming-text');
+
+    // Use fetch with streaming
+    fetch('/api/dm/message_stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            entity_id: entityId,
+            message: message
+        })
+    })
+    .then(response => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function readStream() {
+            reader.read().then(({ done, value }) => {
+                if (done) {
+                    setLoadingState(false);
+                    return;
+                }
+
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop(); // Keep incomplete line in buffer
+
+                for (const line of lines) {
+                    if (line.startsWith('data: ')) {
+                        try {
+                            const data = JSON.parse(line.substring(6));
+
+                            if (data.type === 'token') {
+                                // Remove cursor if present
+                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                if (cursor) cursor.remove();
+
+                                // Add new text
+                                const textNode = document.createTextNode(data.content);
+                                streamingTextDiv.appendChild(textNode);
+
+                                // Add cursor back at end
+                                const newCursor = document.createElement('span');
+                                newCursor.className = 'cursor-blink';
+                                newCursor.textContent = '▊';
+                                streamingTextDiv.appendChild(newCursor);
+
+                                // Auto-scroll
+                                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                            } else if (data.type === 'tool_start') {
+                                // Remove cursor if present
+                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                if (cursor) cursor.remove();
+
+                                // Show tool execution indicator
+                                const toolDiv = document.createElement('div');
+                                toolDiv.className = 'tool-execution';
+                                toolDiv.style.cssText = `
+                                    color: #8e44ad;
+                                    font-style: italic;
+                                    margin: 0.5rem 0;
+                                    padding: 0.5rem;
+                                    background: rgba(142, 68, 173, 0.1);
+                                    border-left: 3px solid #8e44ad;
+                                    border-radius: 4px;
+                                `;
+                                toolDiv.innerHTML = `🔧 Using tool: <strong>${escapeHtml(data.tool_name)}</strong>...`;
+                                streamingTextDiv.appendChild(toolDiv);
+
+                                // Add cursor back at end
+                                const newCursor = document.createElement('span');
+                                newCursor.className = 'cursor-blink';
+                                newCursor.textContent = '▊';
+                                streamingTextDiv.appendChild(newCursor);
+
+                                // Auto-scroll
+                                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                            } else if (data.type === 'tool_result') {
+                                // Remove cursor if present
+                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                if (cursor) cursor.remove();
+
+                                // Show tool result
+                                const resultDiv = document.createElement('div');
+                                resultDiv.className = 'tool-result';
+                                const success = data.result && data.result.success;
+                                const message = data.result ? data.result.message : 'Unknown result';
+
+                                resultDiv.style.cssText = `
+                                    color: ${success ? '#27ae60' : '#e74c3c'};
+                                    font-style: italic;
+                                    margin: 0.5rem 0;
+                                    padding: 0.5rem;
+                                    background: ${success ? 'rgba(39, 174, 96, 0.1)' : 'rgba(231, 76, 60, 0.1)'};
+                                    border-left: 3px solid ${success ? '#27ae60' : '#e74c3c'};
+                                    border-radius: 4px;
+                                `;
+                                resultDiv.innerHTML = `${success ? '✓' : '✗'} ${escapeHtml(message)}`;
+                                streamingTextDiv.appendChild(resultDiv);
+
+                                // Add cursor back at end
+                                const newCursor = document.createElement('span');
+                                newCursor.className = 'cursor-blink';
+                                newCursor.textContent = '▊';
+                                streamingTextDiv.appendChild(newCursor);
+
+                                // Auto-scroll
+                                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                            } else if (data.type === 'done') {
+                                // Remove cursor
+                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                if (cursor) cursor.remove();
+
+                                // Add suggested actions if any
+                                if (data.suggested_actions && data.suggested_actions.length > 0) {
+                                    const actionsDiv = document.createElement('div');
+                                    actionsDiv.className = 'dm-suggested-actions';
+
+                                    for (const action of data.suggested_actions) {
+                                        const button = document.createElement('button');
+                                        button.className = 'dm-suggested-action';
+                                        button.setAttribute('data-entity-id', entityId);
+                                        button.setAttribute('data-action-type', action.action_type || 'custom');
+                                        button.setAttribute('data-action-data', JSON.stringify(action.action_data || {}));
+                                        button.textContent = action.label || 'Action';
+                                        button.onclick = () => executeSuggestedActionFromData(button);
+
+                                        actionsDiv.appendChild(button);
+                                    }
+
+                                    dmMsgDiv.appendChild(actionsDiv);
+                                }
+
+                                setLoadingState(false);
+                            } else if (data.type === 'error') {
+                                // Remove cursor
+                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                if (cursor) cursor.remove();
+
+                                streamingTextDiv.innerHTML = `<span style="color: #e74c3c;">⚠️ Error: ${escapeHtml(data.error)}</span>`;
+                                setLoadingState(false);
+                            }
+                        } catch (e) {
+                            console.error('Error parsing SSE data:', e);
+                        }
+                    }
+                }
+
+                readStream(); // Continue reading
+            }).catch(error => {
+                console.error('Stream read error:', error);
+                setLoadingState(false);
+                alert('Connection error during streaming');
+            });
+        }
+
+        readStream();
+    })
+    .catch(error => {
+        console.error('DM message error:', error);
+        alert('Failed to send message');
+        setLoadingState(false);
+    });
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function executeSuggestedAction(entityId, actionType, actionData, callback) {
+    fetch('/api/dm/execute_action', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            entity_id: entityId,
+            action_type: actionType,
+            action_data: actionData
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Reload messages to show the player's action message
+            reloadMessages();
+
+            // Check if we should trigger an AI response
+            if (data.result && data.result.trigger_ai_response) {
+                // For custom actions, automatically trigger AI DM response
+                console.log('Triggering AI response for custom action');
+
+                // Wait a moment for messages to reload, then trigger AI
+                setTimeout(() => {
+                    setLoadingState(true);
+
+                    // Create DM message div for streaming response
+                    const messagesDiv = document.getElementById('dm-messages');
+                    const dmMsgDiv = document.createElement('div');
+                    dmMsgDiv.className = 'dm-message dm-speaker-dm';
+                    dmMsgDiv.innerHTML = `
+                        <div class="dm-message-header">
+                            <strong class="dm-speaker-name">
+                                Dungeon Master
+                            </strong>
+                        </div>
+                        <div class="dm-message-text dm-streaming-text">
+                            <span class="cursor-blink">▊</span>
+                        </div>
+                    `;
+                    messagesDiv.appendChild(dmMsgDiv);
+                    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+
+                    const streamingTextDiv = dmMsgDiv.querySelector('.dm-streaming-text');
+
+                    // Stream AI response using the message endpoint
+                    fetch('/api/dm/message_stream', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({
+                            entity_id: entityId,
+                            message: data.result.message || 'Continue the story',
+                            skip_player_message: true  // Don't create duplicate player message
+                        })
+                    })
+                    .then(response => {
+                        const reader = response.body.getReader();
+                        const decoder = new TextDecoder();
+                        let buffer = '';
+
+                        function readStream() {
+                            reader.read().then(({ done, value }) => {
+                                if (done) {
+                                    setLoadingState(false);
+                                    if (callback) callback();
+                                    return;
+                                }
+
+                                buffer += decoder.decode(value, { stream: true });
+                                const lines = buffer.split('\n');
+                                buffer = lines.pop();
+
+                                for (const line of lines) {
+                                    if (line.startsWith('data: ')) {
+                                        try {
+                                            const eventData = JSON.parse(line.substring(6));
+
+                                            if (eventData.type === 'token') {
+                                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                                if (cursor) cursor.remove();
+
+                                                const textNode = document.createTextNode(eventData.content);
+                                                streamingTextDiv.appendChild(textNode);
+
+                                                const newCursor = document.createElement('span');
+                                                newCursor.className = 'cursor-blink';
+                                                newCursor.textContent = '▊';
+                                                streamingTextDiv.appendChild(newCursor);
+
+                                                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+                                            } else if (eventData.type === 'done') {
+                                                const cursor = streamingTextDiv.querySelector('.cursor-blink');
+                                                if (cursor) cursor.remove();
+
+                                                // Add suggested actions if any
+                                                if (eventData.suggested_actions && eventData.suggested_actions.length > 0) {
+                                                    const actionsDiv = document.createElement('div');
+                                                    actionsDiv.className = 'dm-suggested-actions';
+
+                                                    for (const action of eventData.suggested_actions) {
+                                                        const button = document.createElement('button');
+                                                        button.className = 'dm-suggested-action';
+                                                        button.setAttribute('data-entity-id', entityId);
+                                                        button.setAttribute('data-action-type', action.action_type || 'custom');
+                                                        button.setAttribute('data-action-data', JSON.stringify(action.action_data || {}));
+                                                        button.textContent = action.label || 'Action';
+                                                        button.onclick = () => executeSuggestedActionFromData(button);
+
+                                                        actionsDiv.appendChild(button);
+                                                    }
+
+                                                    dmMsgDiv.appendChild(actionsDiv);
+                                                }
+
+                                                setLoadingState(false);
+                                                if (callback) callback();
+                                            }
+                                        } catch (e) {
+                                            console.error('Error parsing SSE data:', e);
+                                        }
+                                    }
+                                }
+
+                                readStream();
+                            }).catch(error => {
+                                console.error('Stream read error:', error);
+                                setLoadingState(false);
+                                if (callback) callback();
+                            });
+                        }
+
+                        readStream();
+                    })
+                    .catch(error => {
+                        console.error('AI response error:', error);
+                        setLoadingState(false);
+                        if (callback) callback();
+                    });
+                }, 500);
+            } else {
+                // For non-AI-triggering actions (like dice rolls), just reload
+                setTimeout(() => {
+                    if (callback) callback();
+                }, 500);
+            }
+        } else {
+            alert('Action failed: ' + (data.error || 'Unknown error'));
+            if (callback) callback();
+        }
+    })
+    .catch(error => {
+        console.error('Action execution error:', error);
+        alert('Failed to execute action');
+        if (callback) callback();
+    });
+}
+
+function executeSuggestedActionFromData(button) {
+    try {
+        const entityId = button.getAttribute('data-entity-id');
+        const actionType = button.getAttribute('data-action-type');
+        const actionDataStr = button.getAttribute('data-action-data');
+
+        // Parse the JSON safely
+        let actionData = {};
+        if (actionDataStr) {
+            try {
+                actionData = JSON.parse(actionDataStr);
+            } catch (parseError) {
+                console.error('Failed to parse action data:', parseError);
+                console.error('Malformed action data string:', actionDataStr);
+                alert('Error: Invalid action data. Please try a different action or refresh the page.');
+                return;
+            }
+        }
+
+        // Show visual feedback
+        button.disabled = true;
+        button.style.opacity = '0.5';
+        const originalText = button.textContent;
+        button.textContent = '⏳ ' + originalText;
+
+        executeSuggestedAction(entityId, actionType, actionData, () => {
+            // Re-enable after completion
+            button.disabled = false;
+            button.style.opacity = '1';
+            button.textContent = originalText;
+        });
+    } catch (error) {
+        console.error('Error reading action data from button:', error);
+        alert('Failed to execute action due to a technical error.');
+    }
+}
+
+// Auto-scroll to bottom on load
+document.addEventListener('DOMContentLoaded', function() {
+    const messagesDiv = document.getElementById('dm-messages');
+    if (messagesDiv) {
+        messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    }
+
+    // Add Enter key handler to textarea
+    const input = document.getElementById('dm-input');
+    if (input) {
+        input.addEventListener('keydown', function(e) {
+            // Send on Enter (without Shift)
+            if (e.key === 'Enter' && !e.shiftKey) {
+                e.preventDefault(); // Prevent newline
+                sendDMMessage();
+            }
+            // Shift+Enter allows newline (default behavior)
+        });
+
+        // Auto-resize textarea as user types
+        input.addEventListener('input', function() {
+            this.style.height = 'auto';
+            this.style.height = Math.min(this.scrollHeight, 192) + 'px'; // Max 12rem
+        });
+    }
+});
@@ -0,0 +1,22 @@
+"""
+WSGI entry point for Arcane Arsenal.
+
+Import this module (not server.py) from WSGI servers and scripts that need
+the app object, e.g.:
+
+    gunicorn -k eventlet -w 1 src.web.wsgi:app
+
+It monkey-patches the standard library for eventlet before anything else
+is imported, so blocking I/O (LLM requests, time.sleep, locks) yields to
+other green threads. The worlds directory comes from WORLDS_DIR
+(default: 'worlds').
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import os
+
+from src.web.server import create_app
+
+app, socketio = create_app(os.getenv('WORLDS_DIR', 'worlds'))
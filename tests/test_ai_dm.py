@@ -0,0 +1,1489 @@
+"""
+Tests for AI DM module.
+"""
+
+import json
+import os
+import pytest
+import tempfile
+import shutil
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timedelta
+from flask import Flask
+from src.core.state_engine import StateEngine
+from src.modules.ai_dm import llm_client
+from src.modules.ai_dm import api
+from src.modules.ai_dm import tools
+from src.modules.ai_dm import entity_resolver
+from src.modules.ai_dm import rate_limiter
+from src.modules.ai_dm.entity_resolver import EntityResolver
+from src.modules.ai_dm.prompts import (
+    build_cached_message_history, build_context_prompt, build_full_prompt, load_system_prompt
+)
+from src.modules.ai_dm.response_parser import get_fallback_actions, parse_dm_response, validate_action
+from src.modules.ai_dm.rate_limiter import ESTIMATED_OUTPUT_TOKENS, RateLimiter, estimate_tokens
+
+
+@pytest.fixture
+def engine():
+    """Create a temporary world with the AI DM module enabled."""
+    temp_dir = tempfile.mkdtemp()
+    engine = StateEngine.initialize_world(
+        world_path=temp_dir,
+        world_name="Test World",
+        modules=['ai_dm']
+    )
+    yield engine
+    engine.close()
+    shutil.rmtree(temp_dir)
+
+
+def _add_message(engine, entity_id, speaker, text):
+    """Create a ChatMessage entity and append it to the conversation."""
+    msg_id = engine.create_entity(f"{speaker} message").data['id']
+    msg_data = {
+        'speaker': speaker,
+        'speaker_name': speaker.title(),
+        'conversation_id': entity_id,
+        'message': text,
+        'timestamp': '2024-01-01T12:00:00'
+    }
+    engine.add_component(msg_id, 'ChatMessage', msg_data)
+    conversation = engine.get_component(entity_id, 'Conversation')
+    result = api.append_conversation_message(engine, entity_id, conversation.data, msg_id, msg_data)
+    assert result.success
+    return msg_id
+
+
+class TestSharedLLMClient:
+    """Test the process-wide LLM client singleton."""
+
+    def test_client_created_once(self, monkeypatch):
+        """Test that repeated calls reuse the same client instance."""
+        created = []
+
+        def fake_factory(config=None):
+            client = type('FakeProvider', (), {})()
+            created.append(client)
+            return client
+
+        limiter = RateLimiter(requests_per_minute=50, tokens_per_minute=80000)
+        monkeypatch.setattr(llm_client, '_llm_client', None)
+        monkeypatch.setattr(llm_client, 'get_llm_client', fake_factory)
+        monkeypatch.setattr(llm_client, 'get_rate_limiter', lambda: limiter)
+
+        first = llm_client.get_shared_llm_client()
+        second = llm_client.get_shared_llm_client()
+
+        assert first is second
+        assert len(created) == 1
+        assert first.rate_limiter is limiter
+
+    def test_concurrent_first_calls_create_one_client(self, monkeypatch):
+        """Test that racing first requests still share a single client."""
+        created = []
+
+        def slow_factory(config=None):
+            time.sleep(0.05)
+            client = type('FakeProvider', (), {})()
+            created.append(client)
+            return client
+
+        monkeypatch.setattr(llm_client, '_llm_client', None)
+        monkeypatch.setattr(llm_client, 'get_llm_client', slow_factory)
+        monkeypatch.setattr(llm_client, 'get_rate_limiter', lambda: None)
+
+        threads = [threading.Thread(target=llm_client.get_shared_llm_client) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(created) == 1
+
+    def test_sdk_retries_disabled(self, monkeypatch):
+        """Test that the SDK doesn't retry underneath our own backoff loop."""
+        client_kwargs = {}
+        fake_anthropic = types.ModuleType('anthropic')
+        fake_anthropic.Anthropic = lambda **kwargs: client_kwargs.update(kwargs)
+        fake_anthropic.RateLimitError = FakeRateLimitError
+        fake_anthropic.APIConnectionError = ConnectionError
+        monkeypatch.setitem(sys.modules, 'anthropic', fake_anthropic)
+
+        llm_client.AnthropicProvider(api_key='test-key')
+
+        assert client_kwargs == {'api_key': 'test-key', 'max_retries': 0}
+
+    def test_openai_sdk_retries_disabled(self, monkeypatch):
+        """Test that the OpenAI SDK doesn't retry underneath our own backoff loop."""
+        client_kwargs = {}
+        fake_openai = types.ModuleType('openai')
+        fake_openai.OpenAI = lambda **kwargs: client_kwargs.update(kwargs)
+        fake_openai.RateLimitError = FakeRateLimitError
+        fake_openai.APIConnectionError = ConnectionError
+        monkeypatch.setitem(sys.modules, 'openai', fake_openai)
+
+        provider = llm_client.OpenAIProvider(api_key='test-key')
+
+        assert client_kwargs == {'api_key': 'test-key', 'max_retries': 0}
+        assert provider.retryable_errors == (FakeRateLimitError, ConnectionError)
+
+    def test_client_prewarmed_on_registration(self, monkeypatch):
+        """Test that registering the blueprint creates the shared client once."""
+        calls = []
+        monkeypatch.setattr(api, 'get_shared_llm_client', lambda: calls.append(True))
+
+        app = Flask(__name__)
+        app.register_blueprint(api.ai_dm_bp)
+
+        assert calls == [True]
+
+    def test_prewarm_tolerates_missing_provider(self, monkeypatch):
+        """Test that an unconfigured provider doesn't break app setup."""
+        def fail():
+            raise llm_client.LLMError("API key not provided", provider="anthropic")
+
+        monkeypatch.setattr(api, 'get_shared_llm_client', fail)
+
+        Flask(__name__).register_blueprint(api.ai_dm_bp)
+
+
+class FakeRateLimitError(Exception):
+    """Stand-in for the SDK's rate limit error."""
+
+
+class FakeStream:
+    """Minimal stand-in for the Anthropic streaming context manager."""
+
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for event in self.events:
+            yield event
+        if self.error:
+            raise self.error
+
+
+class SilentStream(FakeStream):
+    """Provider stream that sends nothing until its connection is closed."""
+
+    def __init__(self):
+        super().__init__([])
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+    def __iter__(self):
+        self.closed.wait(5)
+        raise ConnectionError("connection closed")
+        yield
+
+
+def _text_event(text):
+    """Build a streamed text delta event."""
+    delta = type('Delta', (), {'type': 'text_delta', 'text': text})()
+    return type('Event', (), {'type': 'content_block_delta', 'delta': delta})()
+
+
+def _anthropic_provider(streams):
+    """Create an AnthropicProvider whose client replays the given streams."""
+    provider = object.__new__(llm_client.AnthropicProvider)
+    provider.model = 'test-model'
+    provider.retryable_errors = (FakeRateLimitError,)
+    calls = iter(streams)
+
+    def stream(**kwargs):
+        result = next(calls)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    messages = type('Messages', (), {'stream': staticmethod(stream)})()
+    provider.client = type('Client', (), {'messages': messages})()
+    return provider
+
+
+def _openai_provider(responses):
+    """Create an OpenAIProvider whose client replays the given completions."""
+    provider = object.__new__(llm_client.OpenAIProvider)
+    provider.model = 'test-model'
+    provider.retryable_errors = (FakeRateLimitError,)
+    calls = iter(responses)
+
+    def create(**kwargs):
+        result = next(calls)
+        if isinstance(result, Exception):
+            raise result
+        message = type('Message', (), {'content': result})()
+        choice = type('Choice', (), {'message': message})()
+        return type('Completion', (), {'choices': [choice]})()
+
+    completions = type('Completions', (), {'create': staticmethod(create)})()
+    chat = type('Chat', (), {'completions': completions})()
+    provider.client = type('Client', (), {'chat': chat})()
+    return provider
+
+
+class TestLLMRetries:
+    """Test rate-limit handling around provider calls."""
+
+    def test_semaphore_sized_from_config(self, monkeypatch):
+        """Test that the shared semaphore is created once with the configured size."""
+        config = type('Config', (), {'ai_max_concurrent': 2})()
+        monkeypatch.setattr(llm_client, '_llm_semaphore', None)
+        monkeypatch.setattr('src.core.config.get_config', lambda: config)
+
+        semaphore = llm_client.get_llm_semaphore()
+
+        assert semaphore is llm_client.get_llm_semaphore()
+        assert semaphore.acquire(blocking=False)
+        assert semaphore.acquire(blocking=False)
+        assert not semaphore.acquire(blocking=False)
+        semaphore.release()
+        semaphore.release()
+
+    def test_backoff_grows_exponentially(self):
+        """Test that each retry waits roughly twice as long as the previous one."""
+        base = llm_client.LLM_RETRY_BASE_DELAY
+        for attempt in range(3):
+            delay = llm_client.backoff_delay(attempt)
+            assert base * 2 ** attempt <= delay <= base * 2 ** attempt + base
+
+    def test_stream_retried_on_rate_limit(self, monkeypatch):
+        """Test that a rate-limited stream is retried before anything is yielded."""
+        monkeypatch.setattr(llm_client.time, 'sleep', lambda seconds: None)
+        provider = _anthropic_provider([
+            FakeRateLimitError("429"),
+            FakeStream([_text_event("Hello")])
+        ])
+
+        chunks = list(provider.generate_response_stream([{'role': 'user', 'content': 'Hi'}]))
+
+        assert chunks == [{'type': 'text', 'content': 'Hello'}]
+
+    def test_partial_stream_not_retried(self, monkeypatch):
+        """Test that errors after streaming started are surfaced instead of replayed."""
+        monkeypatch.setattr(llm_client.time, 'sleep', lambda seconds: None)
+        provider = _anthropic_provider([
+            FakeStream([_text_event("Hel")], error=FakeRateLimitError("429")),
+            FakeStream([_text_event("Hello")])
+        ])
+
+        chunks = []
+        with pytest.raises(llm_client.LLMError):
+            for chunk in provider.generate_response_stream([{'role': 'user', 'content': 'Hi'}]):
+                chunks.append(chunk)
+
+        assert chunks == [{'type': 'text', 'content': 'Hel'}]
+
+    def test_rate_limit_feeds_limiter(self, monkeypatch):
+        """Test that a 429 lowers the limiter ceiling and honours retry-after."""
+        sleeps = []
+        monkeypatch.setattr(llm_client.time, 'sleep', sleeps.append)
+        error = FakeRateLimitError("429")
+        error.status_code = 429
+        error.response = type('Response', (), {'headers': {'retry-after': '30'}})()
+        provider = _anthropic_provider([error, FakeStream([_text_event("Hello")])])
+        clock = FakeClock()
+        provider.rate_limiter = RateLimiter(50, 0, clock=clock, sleep=clock.sleep)
+
+        list(provider.generate_response_stream([{'role': 'user', 'content': 'Hi'}]))
+
+        assert sleeps == [30.0]
+        assert provider.rate_limiter.request_limit == 26
+
+    def test_openai_rate_limit_feeds_limiter(self, monkeypatch):
+        """Test that OpenAI calls share the backoff loop and limiter feedback."""
+        sleeps = []
+        monkeypatch.setattr(llm_client.time, 'sleep', sleeps.append)
+        error = FakeRateLimitError("429")
+        error.status_code = 429
+        error.response = type('Response', (), {'headers': {'retry-after': '30'}})()
+        provider = _openai_provider([error, 'Hello'])
+        clock = FakeClock()
+        provider.rate_limiter = RateLimiter(50, 0, clock=clock, sleep=clock.sleep)
+
+        text = provider.generate_response([{'role': 'user', 'content': 'Hi'}])
+
+        assert text == 'Hello'
+        assert sleeps == [30.0]
+        # Halved to 25 by the 429, then raised by one on success
+        assert provider.rate_limiter.request_limit == 26
+
+    def test_aborted_stream_not_retried(self):
+        """Test that an abort ends the stream quietly instead of retrying."""
+        upstream = SilentStream()
+        provider = _anthropic_provider([upstream, FakeStream([_text_event("Hello")])])
+        provider.retryable_errors = (ConnectionError,)
+        stream = provider.generate_response_stream([{'role': 'user', 'content': 'Hi'}])
+
+        threading.Timer(0.05, stream.abort).start()
+
+        assert list(stream) == []
+        assert upstream.closed.is_set()
+
+    def test_gives_up_after_max_attempts(self, monkeypatch):
+        """Test that persistent rate limiting raises LLMError."""
+        monkeypatch.setattr(llm_client.time, 'sleep', lambda seconds: None)
+        provider = _anthropic_provider(
+            [FakeRateLimitError("429")] * llm_client.LLM_MAX_ATTEMPTS
+        )
+
+        with pytest.raises(llm_client.LLMError):
+            list(provider.generate_response_stream([{'role': 'user', 'content': 'Hi'}]))
+
+
+class FakeClock:
+    """Manually advanced clock; sleeping moves time forward."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter:
+    """Test sliding-window request/token pacing."""
+
+    def _limiter(self, rpm, tpm):
+        clock = FakeClock()
+        return RateLimiter(rpm, tpm, clock=clock, sleep=clock.sleep), clock
+
+    def test_requests_within_limit_not_delayed(self):
+        """Test that requests under the RPM limit proceed immediately."""
+        limiter, clock = self._limiter(rpm=3, tpm=0)
+
+        for _ in range(3):
+            assert limiter.acquire() == 0
+
+        assert clock.slept == []
+
+    def test_request_limit_waits_for_window(self):
+        """Test that exceeding the RPM limit waits until the oldest request expires."""
+        limiter, clock = self._limiter(rpm=2, tpm=0)
+        limiter.acquire()
+        clock.now = 10.0
+        limiter.acquire()
+
+        waited = limiter.acquire()
+
+        assert waited == pytest.approx(50.0)
+        assert clock.now == pytest.approx(60.0)
+
+    def test_default_sleep_looked_up_at_call_time(self, monkeypatch):
+        """Test that time.sleep is resolved per wait, so a later monkey-patch applies."""
+        clock = FakeClock()
+        limiter = RateLimiter(1, 0, clock=clock)
+        monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+        limiter.acquire()
+
+        limiter.acquire()
+
+        assert clock.slept == [pytest.approx(60.0)]
+
+    def test_token_limit_waits_for_window(self):
+        """Test that exceeding the TPM limit waits until enough tokens expire."""
+        limiter, clock = self._limiter(rpm=0, tpm=1000)
+        limiter.acquire(600)
+        clock.now = 5.0
+        limiter.acquire(300)
+
+        waited = limiter.acquire(500)
+
+        assert waited == pytest.approx(55.0)
+
+    def test_oversized_request_allowed_on_empty_window(self):
+        """Test that a request larger than the TPM limit doesn't block forever."""
+        limiter, clock = self._limiter(rpm=0, tpm=1000)
+
+        assert limiter.acquire(5000) == 0
+
+    def test_rate_limit_halves_and_success_recovers(self):
+        """Test AIMD adjustment of the limits."""
+        limiter, clock = self._limiter(rpm=50, tpm=80000)
+
+        limiter.record_rate_limit()
+        assert limiter.request_limit == 25
+        assert limiter.token_limit == 40000
+
+        limiter.record_success()
+        assert limiter.request_limit == 26
+        assert limiter.token_limit == 41600
+
+        for _ in range(100):
+            limiter.record_success()
+        assert limiter.request_limit == 50
+        assert limiter.token_limit == 80000
+
+    def test_retry_after_blocks_requests(self):
+        """Test that the provider's retry-after delays the next request."""
+        limiter, clock = self._limiter(rpm=50, tpm=0)
+
+        limiter.record_rate_limit(retry_after=12)
+
+        assert limiter.acquire() == pytest.approx(12.0)
+
+    def test_estimate_tokens(self):
+        """Test the ~4 characters per token estimate plus the response budget."""
+        messages = [{'role': 'user', 'content': 'a' * 400}]
+
+        assert estimate_tokens(messages, system='b' * 100, max_tokens=1000) == 1125
+
+    def test_estimate_tokens_skips_cached_prefix(self):
+        """Test that content up to the last cache breakpoint isn't counted."""
+        cached = {'type': 'text', 'text': 'x' * 40000, 'cache_control': {'type': 'ephemeral'}}
+        system = [cached, dict(cached)]
+        messages = [
+            {'role': 'user', 'content': 'y' * 4000},
+            {'role': 'assistant', 'content': [dict(cached, text='z' * 4000)]},
+            {'role': 'user', 'content': [{'type': 'text', 'text': 'a' * 400}]}
+        ]
+
+        # Only the final user turn plus a realistic response length remain
+        assert estimate_tokens(messages, system=system, max_tokens=4096) == 100 + ESTIMATED_OUTPUT_TOKENS
+
+
+class TestConversationHistoryCache:
+    """Test the denormalized history cache on the Conversation component."""
+
+    def test_append_updates_ids_and_cache(self, engine):
+        """Test that appending a message persists both the ID and the cached text."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': [], 'active': True})
+
+        msg_id = _add_message(engine, entity_id, 'player', 'I search the room')
+
+        data = engine.get_component(entity_id, 'Conversation').data
+        assert data['message_ids'] == [msg_id]
+        assert data['history_cache'] == [{'speaker': 'player', 'message': 'I search the room'}]
+        assert data['active'] is True
+        assert data['last_message_time'] == '2024-01-01T12:00:00'
+
+    def test_unsaved_append_batches_into_one_write(self, engine):
+        """Test that save=False defers persistence to the next saved append."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        conversation = engine.get_component(entity_id, 'Conversation')
+        player_data = {'speaker': 'player', 'message': 'Hello', 'timestamp': '2024-01-01T12:00:00'}
+        dm_data = {'speaker': 'dm', 'message': 'Welcome', 'timestamp': '2024-01-01T12:00:05'}
+
+        result = api.append_conversation_message(
+            engine, entity_id, conversation.data, 'msg_player', player_data, save=False
+        )
+        assert result is None
+        assert engine.get_component(entity_id, 'Conversation').data['message_ids'] == []
+
+        api.append_conversation_message(engine, entity_id, conversation.data, 'msg_dm', dm_data,
+                                        unsaved_ids=['msg_player'])
+
+        stored = engine.get_component(entity_id, 'Conversation')
+        assert stored.data['message_ids'] == ['msg_player', 'msg_dm']
+        assert stored.data['last_message_time'] == '2024-01-01T12:00:05'
+        assert stored.version == 2
+
+    def test_cache_is_capped(self, engine):
+        """Test that only the most recent messages are cached."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+
+        for i in range(api.HISTORY_CACHE_LIMIT + 5):
+            _add_message(engine, entity_id, 'player', f"message {i}")
+
+        data = engine.get_component(entity_id, 'Conversation').data
+        assert len(data['message_ids']) == api.HISTORY_CACHE_LIMIT + 5
+        assert len(data['history_cache']) == api.HISTORY_CACHE_LIMIT
+        assert data['history_cache'][-1]['message'] == f"message {api.HISTORY_CACHE_LIMIT + 4}"
+
+    def test_legacy_conversation_rebuilt_from_entities(self, engine):
+        """Test that conversations without a cache are rebuilt from ChatMessage entities."""
+        entity_id = engine.create_entity("Theron").data['id']
+        msg_id = engine.create_entity("DM response").data['id']
+        engine.add_component(msg_id, 'ChatMessage', {
+            'speaker': 'dm',
+            'message': 'You enter the tavern',
+            'timestamp': '2024-01-01T12:00:00'
+        })
+        engine.add_component(entity_id, 'Conversation', {'message_ids': [msg_id]})
+
+        data = engine.get_component(entity_id, 'Conversation').data
+        history = api.get_conversation_history(engine, data)
+
+        assert history == [{'speaker': 'dm', 'message': 'You enter the tavern'}]
+
+    def test_cache_invalidated_when_message_deleted(self, engine):
+        """Test that deleting a chat message drops the stale history cache."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        first_id = _add_message(engine, entity_id, 'player', 'Hello')
+        _add_message(engine, entity_id, 'dm', 'Welcome, traveler')
+
+        engine.delete_entity(first_id)
+
+        data = engine.get_component(entity_id, 'Conversation').data
+        assert 'history_cache' not in data
+        assert api.get_conversation_history(engine, data) == [
+            {'speaker': 'dm', 'message': 'Welcome, traveler'}
+        ]
+
+
+    def test_edit_during_turn_not_overwritten(self, engine):
+        """Test that saving a turn doesn't restore a cache invalidated mid-turn."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        first_id = _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+
+        # Turn starts: history snapshot taken, player message appended in memory
+        conversation = engine.get_component(entity_id, 'Conversation')
+        player_id = engine.create_entity("player message").data['id']
+        player_data = {'speaker': 'player', 'message': 'I order an ale', 'timestamp': '2024-01-01T12:00:05'}
+        engine.add_component(player_id, 'ChatMessage', player_data)
+        api.append_conversation_message(engine, entity_id, conversation.data, player_id, player_data, save=False)
+
+        # Edited while the LLM is responding
+        message = engine.get_component(first_id, 'ChatMessage')
+        engine.update_component(first_id, 'ChatMessage', {**message.data, 'message': 'You enter the inn'})
+
+        api.save_conversation_messages(engine, entity_id, conversation.data, [player_id])
+
+        assert engine.get_component(entity_id, 'Conversation').data['history_cache'] == [
+            {'speaker': 'dm', 'message': 'You enter the inn'},
+            {'speaker': 'player', 'message': 'I order an ale'}
+        ]
+
+    def test_edit_invalidates_owner_without_scanning(self, engine, monkeypatch):
+        """Test that a message's conversation_id leads straight to its Conversation."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        msg_id = _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+        assert 'history_cache' in engine.get_component(entity_id, 'Conversation').data
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError("conversations should not be scanned")
+
+        monkeypatch.setattr(engine, 'query_entities', no_scan)
+        message = engine.get_component(msg_id, 'ChatMessage')
+        engine.update_component(msg_id, 'ChatMessage', {**message.data, 'message': 'You enter the inn'})
+
+        assert 'history_cache' not in engine.get_component(entity_id, 'Conversation').data
+
+class TestContextPrompt:
+    """Test game state formatting for the LLM."""
+
+    def test_sections_separated_by_blank_lines(self):
+        """Test that only sections with data are emitted, one blank line apart."""
+        prompt = build_context_prompt({
+            'character': {'name': 'Theron', 'hp': {'current': 5, 'max': 20}},
+            'inventory': [{'name': 'Rope', 'quantity': 2}, {'name': 'Torch'}],
+            'recent_events': [{'summary': f"event {i}"} for i in range(5)]
+        })
+
+        sections = prompt.rstrip('\n').split('\n\n')
+        assert sections[0].startswith("## Character Information\n**Name:** Theron")
+        assert "**HP:** 5/20 (critical)" in sections[0]
+        assert sections[1] == ("## Inventory\n"
+                               "**Items currently owned by the player character:**\n"
+                               "Rope x2, Torch")
+        assert sections[2].startswith("⚠️ IMPORTANT")
+        assert sections[3] == "## Recent Events\n- event 2\n- event 3\n- event 4"
+        assert "## Current Location" not in prompt
+
+    def test_empty_context_still_lists_inventory(self):
+        """Test that an empty inventory is called out explicitly."""
+        prompt = build_context_prompt({})
+
+        assert prompt.startswith("## Inventory\n")
+        assert "*Empty - player owns no items*" in prompt
+
+
+class TestCachedMessageHistory:
+    """Test the cache-stable LLM message layout."""
+
+    def _history(self, count):
+        speakers = ['player', 'dm']
+        return [{'speaker': speakers[i % 2], 'message': f"message {i}"} for i in range(count)]
+
+    def test_game_state_and_player_message_at_tail(self):
+        """Test that the dynamic game state travels with the new user turn."""
+        llm_messages = build_cached_message_history(
+            self._history(4), "I search the room", {'location': {'region': 'Tavern'}}
+        )
+
+        tail = llm_messages[-1]
+        assert tail['role'] == 'user'
+        assert tail['content'][0]['text'].startswith("# Current Game State")
+        assert 'Tavern' in tail['content'][0]['text']
+        assert tail['content'][1]['text'] == "I search the room"
+
+    def test_breakpoint_on_last_committed_turn(self):
+        """Test that the last committed turn carries a cache_control breakpoint."""
+        llm_messages = build_cached_message_history(self._history(4), "Hello", {})
+
+        last_committed = llm_messages[-2]
+        assert last_committed['content'][0]['text'] == "message 3"
+        assert last_committed['content'][0]['cache_control'] == {'type': 'ephemeral'}
+        assert all(isinstance(m['content'], str) for m in llm_messages[:-2])
+
+    def test_window_prefix_is_stable_across_turns(self):
+        """Test that the history window only moves every `limit` messages."""
+        first = build_cached_message_history(self._history(12), "Hello", {}, limit=10)
+        second = build_cached_message_history(self._history(14), "Hello", {}, limit=10)
+
+        assert first[0] == second[0]
+        assert first[0]['content'] == "message 0"
+        assert len(second) - len(first) == 2
+
+        # Once the window advances it starts at the next multiple of limit
+        advanced = build_cached_message_history(self._history(21), "Hello", {}, limit=10)
+        assert advanced[0]['content'] == "message 10"
+
+    def test_prefix_stable_past_history_cache_limit(self):
+        """Test that the cached prefix survives the history cache being capped."""
+        data = {'message_ids': [], 'history_cache': []}
+        previous = []
+        prefix_changes = 0
+        turns = 40
+
+        for turn in range(turns):
+            history = list(api.get_conversation_history(None, data))
+            llm_messages = build_cached_message_history(
+                history, f"player {turn}", {}, limit=10, total_messages=len(data['message_ids'])
+            )
+            # Committed turns as sent; only the breakpoint's cache_control wrapper moves
+            committed = [
+                m['content'] if isinstance(m['content'], str) else m['content'][0]['text']
+                for m in llm_messages[:-1]
+            ]
+            if committed[:len(previous)] != previous:
+                prefix_changes += 1
+            previous = committed
+
+            for speaker in ('player', 'dm'):
+                message = {'speaker': speaker, 'message': f"{speaker} {turn}", 'timestamp': ''}
+                api.append_conversation_message(None, 'e1', data, f"{speaker}-{turn}", message, save=False)
+
+        assert len(data['history_cache']) == api.HISTORY_CACHE_LIMIT
+        # The window only advances once per `limit` (10) messages = every 5 turns
+        assert prefix_changes <= turns * 2 // 10
+
+    def test_system_prompt_without_game_state_is_static(self):
+        """Test that the system prompt can omit the per-turn game state."""
+        blocks = build_full_prompt({'location': {'region': 'Tavern'}},
+                                   system_prompt="You are the DM.",
+                                   include_tool_docs=False,
+                                   include_game_state=False)
+
+        assert blocks == [{
+            'type': 'text',
+            'text': "You are the DM.",
+            'cache_control': {'type': 'ephemeral'}
+        }]
+
+    def test_system_prompt_cache_follows_file_edits(self, tmp_path):
+        """Test that cached prompt reads are invalidated when the file changes."""
+        prompt_file = tmp_path / 'prompt.txt'
+        prompt_file.write_text("Version one")
+        assert load_system_prompt(str(prompt_file)) == "Version one"
+
+        stat = prompt_file.stat()
+        prompt_file.write_text("Version two")
+        os.utime(prompt_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert load_system_prompt(str(prompt_file)) == "Version two"
+
+        with pytest.raises(FileNotFoundError):
+            load_system_prompt(str(tmp_path / 'missing.txt'))
+
+
+class TestChatTimestamp:
+    """Test ChatMessage timestamp formatting."""
+
+    def test_timezone_aware_milliseconds(self):
+        """Test that timestamps are UTC with millisecond precision."""
+        timestamp = api.chat_timestamp()
+        parsed = datetime.fromisoformat(timestamp)
+
+        assert parsed.utcoffset() == timedelta(0)
+        assert len(timestamp.split('T')[1].split('.')[1]) == len('123+00:00')
+        # The chat template shows the time of day from this format
+        assert timestamp[10] == 'T'
+        assert timestamp[11:19] == parsed.strftime('%H:%M:%S')
+
+
+class TestFormatSSE:
+    """Test SSE frame encoding."""
+
+    def test_token_fast_path_matches_json(self):
+        """Test that hand-built token frames are valid, escaped JSON."""
+        content = 'He said "run"\n\\ — ünïcode'
+        frame = api.format_sse({'type': 'token', 'content': content})
+
+        assert frame.startswith('data: ') and frame.endswith('\n\n')
+        assert '\n' not in frame[:-2]
+        assert json.loads(frame[len('data: '):]) == {'type': 'token', 'content': content}
+
+    def test_other_events_compact(self):
+        """Test that other events are encoded compactly."""
+        frame = api.format_sse({'type': 'done', 'message_id': 'msg_1', 'suggested_actions': []})
+
+        assert frame == 'data: {"type":"done","message_id":"msg_1","suggested_actions":[]}\n\n'
+
+
+class TestTokenBatching:
+    """Test coalescing of streamed token events."""
+
+    def test_tokens_merged_until_threshold(self, monkeypatch):
+        """Test that small tokens are merged into one event."""
+        monkeypatch.setattr(api, 'SSE_TOKEN_BATCH_SECONDS', 60)
+        events = [{'type': 'token', 'content': 'ab'} for _ in range(30)]
+
+        batched = list(api.batch_token_events(events))
+
+        assert [len(e['content']) for e in batched] == [50, 10]
+        assert ''.join(e['content'] for e in batched) == 'ab' * 30
+
+    def test_other_events_flush_buffer(self, monkeypatch):
+        """Test that non-token events flush pending tokens and keep their order."""
+        monkeypatch.setattr(api, 'SSE_TOKEN_BATCH_SECONDS', 60)
+        result = {'narrative': 'Hello there', 'suggested_actions': []}
+        events = [
+            {'type': 'token', 'content': 'Hello'},
+            {'type': 'tool_start', 'tool_name': 'roll_dice'},
+            {'type': 'token', 'content': ' there'},
+            result
+        ]
+
+        batched = list(api.batch_token_events(events))
+
+        assert batched == [
+            {'type': 'token', 'content': 'Hello'},
+            {'type': 'tool_start', 'tool_name': 'roll_dice'},
+            {'type': 'token', 'content': ' there'},
+            result
+        ]
+
+
+class TestHeartbeats:
+    """Test keepalives during silent stretches."""
+
+    def test_heartbeats_throttled(self, monkeypatch):
+        """Test that heartbeats only pass after SSE_KEEPALIVE_SECONDS of silence."""
+        clock = FakeClock()
+        monkeypatch.setattr(api.time, 'monotonic', clock)
+        monkeypatch.setattr(api, 'SSE_KEEPALIVE_SECONDS', 15)
+
+        def events():
+            yield {'type': 'tool_start', 'tool_name': 'create_npc'}
+            for _ in range(4):
+                clock.now += 5
+                yield {'type': 'heartbeat'}
+            yield {'type': 'tool_result', 'tool_name': 'create_npc', 'success': True}
+
+        passed = list(api.throttle_heartbeats(events()))
+
+        assert [e['type'] for e in passed] == ['tool_start', 'heartbeat', 'tool_result']
+
+
+    def test_heartbeats_while_llm_silent(self):
+        """Test that a slow provider stream produces timer-driven heartbeats."""
+        def slow_stream():
+            time.sleep(0.2)
+            yield {'type': 'text', 'content': 'At last.'}
+
+        events = list(api.stream_with_heartbeats(slow_stream(), interval=0.02))
+
+        assert events[-1] == {'type': 'text', 'content': 'At last.'}
+        assert events[0] == {'type': 'heartbeat'}
+        assert all(e['type'] == 'heartbeat' for e in events[:-1])
+
+    def test_disconnect_aborts_silent_provider_stream(self):
+        """Test that closing mid-silence closes the upstream stream without waiting."""
+        upstream = SilentStream()
+        provider = _anthropic_provider([upstream])
+        events = api.stream_with_heartbeats(
+            provider.generate_response_stream([{'role': 'user', 'content': 'Hi'}]),
+            interval=0.02
+        )
+
+        assert next(events) == {'type': 'heartbeat'}
+        started = time.monotonic()
+        events.close()
+
+        assert upstream.closed.is_set()
+        assert time.monotonic() - started < 0.5
+
+    def test_stream_errors_reach_caller(self):
+        """Test that provider errors are re-raised on the consuming thread."""
+        def failing_stream():
+            yield {'type': 'text', 'content': 'The'}
+            raise llm_client.LLMError("overloaded", provider="anthropic")
+
+        events = api.stream_with_heartbeats(failing_stream(), interval=1)
+
+        assert next(events)['content'] == 'The'
+        with pytest.raises(llm_client.LLMError):
+            next(events)
+
+
+class TestStreamAbort:
+    """Test that abandoning the streaming handler closes the LLM stream."""
+
+    def test_closing_handler_closes_llm_stream(self):
+        """Test that a client disconnect stops the upstream generation."""
+        closed = threading.Event()
+
+        class FakeLLM:
+            def generate_response_stream(self, **kwargs):
+                try:
+                    while True:
+                        yield {'type': 'text', 'content': 'The cave is dark. '}
+                finally:
+                    closed.set()
+
+        config = type('Config', (), {'ai_max_tokens': 100, 'ai_temperature': 0.7})()
+        handler = api.multi_turn_streaming_handler(
+            llm_messages=[{'role': 'user', 'content': 'Look around'}],
+            system_prompt='You are a DM',
+            llm_client=FakeLLM(),
+            engine=None,
+            entity_id='entity_1',
+            tools=[],
+            config=config,
+            stream_to_client=True
+        )
+
+        assert next(handler)['type'] == 'token'
+        handler.close()
+
+        # A plain generator can't be aborted; its reader closes it at the next chunk
+        assert closed.wait(1)
+
+    def test_tool_input_reassembled_from_deltas(self, monkeypatch):
+        """Test that streamed partial_json fragments are joined into each tool's input."""
+        executed = []
+        turns = iter([
+            [
+                {'type': 'tool_use_start', 'tool_use_id': 'tool_1', 'tool_name': 'roll_dice'},
+                {'type': 'tool_input_delta', 'partial_json': '{"dice": '},
+                {'type': 'tool_input_delta', 'partial_json': '"1d20"}'},
+                {'type': 'tool_use_start', 'tool_use_id': 'tool_2', 'tool_name': 'advance_time'},
+                {'type': 'tool_input_delta', 'partial_json': '{"minutes": 5}'}
+            ],
+            [{'type': 'text', 'content': 'The die clatters.'}]
+        ])
+
+        class FakeLLM:
+            def generate_response_stream(self, **kwargs):
+                yield from next(turns)
+
+        def fake_execute_tool(name, tool_input, engine, entity_id):
+            executed.append((name, tool_input))
+            return {'success': True, 'message': 'ok'}
+
+        monkeypatch.setattr(api, 'execute_tool', fake_execute_tool)
+        config = type('Config', (), {'ai_max_tokens': 100, 'ai_temperature': 0.7})()
+        events = list(api.multi_turn_streaming_handler(
+            llm_messages=[{'role': 'user', 'content': 'Roll'}],
+            system_prompt='You are a DM',
+            llm_client=FakeLLM(),
+            engine=None,
+            entity_id='entity_1',
+            tools=[],
+            config=config
+        ))
+
+        assert executed == [('roll_dice', {'dice': '1d20'}), ('advance_time', {'minutes': 5})]
+        assert events[-1]['narrative'] == 'The die clatters.'
+
+
+class TestAnthropicTools:
+    """Test the cached Anthropic-format tool list."""
+
+    def test_tools_built_once_until_registry_changes(self, monkeypatch):
+        """Test that the same list is reused until a new tool is registered."""
+        monkeypatch.setattr(tools, '_tool_registry', {})
+        monkeypatch.setattr(tools, '_tool_definitions', [])
+        monkeypatch.setattr(tools, '_anthropic_tools_cache', None)
+        definition = {
+            'name': 'wave',
+            'description': 'Wave at someone',
+            'input_schema': {'type': 'object', 'properties': {}},
+            'category': 'social'
+        }
+        tools.register_tool(definition, lambda engine, player_id, tool_input: None)
+
+        first = tools.get_anthropic_tools()
+        assert first is tools.get_anthropic_tools()
+        assert first == [{
+            'name': 'wave',
+            'description': 'Wave at someone',
+            'input_schema': {'type': 'object', 'properties': {}}
+        }]
+
+        tools.register_tool({**definition, 'name': 'bow'}, lambda engine, player_id, tool_input: None)
+        assert [t['name'] for t in tools.get_anthropic_tools()] == ['wave', 'bow']
+
+
+class TestMessageStream:
+    """Test the SSE streaming endpoint."""
+
+    @pytest.fixture
+    def client(self, engine, monkeypatch):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.engine_instances = {'stream_world': engine}
+        app.register_blueprint(api.ai_dm_bp)
+        monkeypatch.setattr(api, '_world_modules_cache', {'stream_world': []})
+        monkeypatch.setattr(api, 'get_shared_llm_client', lambda: None)
+
+        def fake_handler(**kwargs):
+            yield {'type': 'token', 'content': 'You enter the tavern'}
+            yield {'narrative': 'You enter the tavern', 'suggested_actions': []}
+
+        monkeypatch.setattr(api, 'multi_turn_streaming_handler', fake_handler)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['world_name'] = 'stream_world'
+        return client
+
+    def _frames(self, response):
+        for chunk in response.response:
+            chunk = chunk if isinstance(chunk, bytes) else chunk.encode()
+            if chunk.startswith(b'data: '):
+                yield json.loads(chunk[len(b'data: '):])
+
+    def test_done_sent_after_turn_saved_and_released(self, engine, client, monkeypatch):
+        """Test that a client resending on 'done' finds the reply saved and the turn free."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        monkeypatch.setattr(api, '_turns_in_flight', set())
+
+        response = client.post('/api/dm/message_stream',
+                               json={'entity_id': entity_id, 'message': 'I enter'})
+        frames = self._frames(response)
+        done = next(f for f in frames if f['type'] == 'done')
+
+        assert api._turns_in_flight == set()
+        message = engine.get_component(done['message_id'], 'ChatMessage')
+        assert message.data['message'] == 'You enter the tavern'
+        conversation = engine.get_component(entity_id, 'Conversation')
+        assert conversation.data['message_ids'][-1] == done['message_id']
+        assert len(conversation.data['message_ids']) == 2
+
+        # The next turn claims the character; finishing this stream must not release it
+        api.claim_turn(('stream_world', entity_id))
+        assert list(frames) == []
+        assert api._turns_in_flight == {('stream_world', entity_id)}
+
+    def test_concurrent_turn_for_same_entity_rejected(self, engine, client, monkeypatch):
+        """Test that a second turn while one is streaming neither stores nor generates anything."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        monkeypatch.setattr(api, '_turns_in_flight', {('stream_world', entity_id)})
+
+        response = client.post('/api/dm/message_stream',
+                               json={'entity_id': entity_id, 'message': 'I enter'})
+        frames = list(self._frames(response))
+
+        assert [f['type'] for f in frames] == ['error']
+        assert engine.get_component(entity_id, 'Conversation').data['message_ids'] == []
+
+    def test_turn_released_after_stream(self, engine, client, monkeypatch):
+        """Test that a finished turn lets the next one through."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        monkeypatch.setattr(api, '_turns_in_flight', set())
+
+        for text in ('I enter', 'I sit down'):
+            response = client.post('/api/dm/message_stream',
+                                   json={'entity_id': entity_id, 'message': text})
+            assert [f['type'] for f in self._frames(response)] == ['token', 'done']
+
+        assert api._turns_in_flight == set()
+        assert len(engine.get_component(entity_id, 'Conversation').data['message_ids']) == 4
+
+    def test_blocking_turn_rejected_while_streaming(self, engine, client, monkeypatch):
+        """Test that the JSON endpoint shares the one-turn-per-character guard."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        monkeypatch.setattr(api, '_turns_in_flight', {('stream_world', entity_id)})
+
+        response = client.post('/api/dm/message', json={'entity_id': entity_id, 'message': 'I enter'})
+
+        assert response.status_code == 409
+        assert response.get_json()['error'] == api.TURN_IN_PROGRESS_ERROR
+        assert engine.get_component(entity_id, 'Conversation').data['message_ids'] == []
+
+    def test_message_endpoint_streams_when_asked(self, engine, client):
+        """Test that /api/dm/message negotiates SSE via the Accept header."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+
+        response = client.post('/api/dm/message',
+                               json={'entity_id': entity_id, 'message': 'I enter'},
+                               headers={'Accept': 'text/event-stream'})
+
+        assert response.mimetype == 'text/event-stream'
+        assert [f['type'] for f in self._frames(response)] == ['token', 'done']
+
+    def test_blocking_message_keeps_system_prompt_static(self, engine, client, monkeypatch):
+        """Test that the JSON endpoint sends a byte-identical system prompt every turn."""
+        calls = []
+
+        class FakeLLM:
+            def generate_response(self, messages, system, **kwargs):
+                calls.append((messages, system))
+                return 'The barkeep nods.'
+
+        monkeypatch.setattr(api, 'get_shared_llm_client', FakeLLM)
+        monkeypatch.setattr(api, '_turns_in_flight', set())
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+
+        for text in ('I enter', 'I order an ale'):
+            response = client.post('/api/dm/message', json={'entity_id': entity_id, 'message': text})
+            assert response.get_json()['success']
+
+        assert api._turns_in_flight == set()
+
+        (first_messages, first_system), (second_messages, second_system) = calls
+        assert first_system == second_system
+        assert '# Current Game State' not in json.dumps(first_system)
+        assert second_messages[-1]['content'][-1]['text'] == 'I order an ale'
+
+    def test_headers_flushed_before_work(self):
+        """Test that the stream opens with a comment frame and no-buffering headers."""
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(api.ai_dm_bp)
+
+        response = app.test_client().post('/api/dm/message_stream', json={})
+        chunks = [c if isinstance(c, bytes) else c.encode() for c in response.response]
+
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert response.headers['X-Accel-Buffering'] == 'no'
+        assert chunks[0] == b": ok\n\n"
+        assert b'"type":"error"' in b''.join(chunks[1:])
+
+
+class TestModuleLoading:
+    """Test per-world module initialization caching."""
+
+    def test_modules_initialized_once_per_world(self, engine, monkeypatch):
+        """Test that repeated calls only load and initialize modules once."""
+        loaded = []
+
+        class FakeLoader:
+            def __init__(self, world_path):
+                pass
+
+            def load_modules(self, strategy='config'):
+                loaded.append(strategy)
+                return []
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.engine_instances = {'cached_world': engine}
+        monkeypatch.setattr(api, 'ModuleLoader', FakeLoader)
+        monkeypatch.setattr(api, '_world_modules_cache', {})
+
+        with app.test_request_context():
+            api.session['world_name'] = 'cached_world'
+            api.session['world_path'] = '/tmp/cached_world'
+            api.ensure_modules_loaded()
+            api.ensure_modules_loaded()
+
+        assert loaded == ['config']
+
+    def test_other_world_not_blocked_by_loading_world(self, engine, monkeypatch):
+        """Test that one world's module load doesn't hold up another world."""
+        class FakeLoader:
+            def __init__(self, world_path):
+                pass
+
+            def load_modules(self, strategy='config'):
+                return []
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.engine_instances = {'fast_world': engine}
+        monkeypatch.setattr(api, 'ModuleLoader', FakeLoader)
+        monkeypatch.setattr(api, '_world_modules_cache', {})
+        monkeypatch.setattr(api, '_world_modules_locks', {})
+
+        # Simulate another request still loading slow_world
+        slow_lock = api._world_modules_locks.setdefault('slow_world', api.threading.Lock())
+        with slow_lock, app.test_request_context():
+            api.session['world_name'] = 'fast_world'
+            api.session['world_path'] = '/tmp/fast_world'
+            api.ensure_modules_loaded()
+
+        assert 'fast_world' in api._world_modules_cache
+
+
+class TestChatDisplay:
+    """Test the cached chat messages fragment."""
+
+    @pytest.fixture
+    def client(self, engine, monkeypatch):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.engine_instances = {'display_world': engine}
+        app.register_blueprint(api.ai_dm_bp)
+        monkeypatch.setattr(api, '_chat_html_cache', api.OrderedDict())
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['world_name'] = 'display_world'
+        return client
+
+    def test_unchanged_conversation_not_modified(self, engine, client):
+        """Test that polling an unchanged conversation returns 304."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+
+        first = client.get(f'/api/dm/chat_display/{entity_id}')
+        assert first.status_code == 200
+        assert b'You enter the tavern' in first.data
+
+        second = client.get(f'/api/dm/chat_display/{entity_id}',
+                            headers={'If-None-Match': first.headers['ETag']})
+        assert second.status_code == 304
+
+    def test_template_compiled_once(self, engine, client):
+        """Test that the messages template is looked up once and reused."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+        client.get(f'/api/dm/chat_display/{entity_id}')
+        templates = client.application.extensions['ai_dm_templates']
+        template = templates['dm_chat_messages.html']
+
+        _add_message(engine, entity_id, 'player', 'I order an ale')
+        response = client.get(f'/api/dm/chat_display/{entity_id}')
+
+        assert b'I order an ale' in response.data
+        assert templates['dm_chat_messages.html'] is template
+
+    def test_messages_styled_by_class(self, engine, client):
+        """Test that messages carry speaker classes instead of inline styles."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+        _add_message(engine, entity_id, 'player', 'I order an ale')
+
+        response = client.get(f'/api/dm/chat_display/{entity_id}')
+
+        assert b'class="dm-message dm-speaker-dm"' in response.data
+        assert b'class="dm-message dm-speaker-player"' in response.data
+        assert b'style=' not in response.data
+
+    def test_new_message_changes_etag(self, engine, client):
+        """Test that appending a message invalidates the cached fragment."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+        first = client.get(f'/api/dm/chat_display/{entity_id}')
+
+        _add_message(engine, entity_id, 'player', 'I order an ale')
+        second = client.get(f'/api/dm/chat_display/{entity_id}',
+                            headers={'If-None-Match': first.headers['ETag']})
+
+        assert second.status_code == 200
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert b'I order an ale' in second.data
+
+    def test_edited_message_changes_etag(self, engine, client):
+        """Test that editing a message invalidates the cached fragment."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        msg_id = _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+        first = client.get(f'/api/dm/chat_display/{entity_id}')
+
+        engine.update_component(msg_id, 'ChatMessage', {
+            'speaker': 'dm',
+            'message': 'You enter the inn',
+            'timestamp': '2024-01-01T12:00:00'
+        })
+        second = client.get(f'/api/dm/chat_display/{entity_id}')
+
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert b'You enter the inn' in second.data
+
+    def test_edit_invalidates_after_restart(self, engine, monkeypatch):
+        """Test that edits invalidate the fragment when chat_display is the first AI DM route hit."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        msg_id = _add_message(engine, entity_id, 'dm', 'You enter the tavern')
+
+        # Fresh engine for the same world, as after a server restart
+        reopened = StateEngine(engine.world_path)
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.engine_instances = {'restarted_world': reopened}
+        app.register_blueprint(api.ai_dm_bp)
+        monkeypatch.setattr(api, '_chat_html_cache', api.OrderedDict())
+        monkeypatch.setattr(api, '_world_modules_cache', {})
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['world_name'] = 'restarted_world'
+
+        try:
+            first = client.get(f'/api/dm/chat_display/{entity_id}')
+            message = reopened.get_component(msg_id, 'ChatMessage')
+            reopened.update_component(msg_id, 'ChatMessage', {**message.data, 'message': 'You enter the inn'})
+            second = client.get(f'/api/dm/chat_display/{entity_id}')
+        finally:
+            reopened.close()
+
+        assert 'restarted_world' not in api._world_modules_cache
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert b'You enter the inn' in second.data
+
+    def test_only_recent_messages_rendered(self, engine, client, monkeypatch):
+        """Test that older messages are left out until the full history is requested."""
+        monkeypatch.setattr(api, 'CHAT_DISPLAY_LIMIT', 3)
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+        for i in range(5):
+            _add_message(engine, entity_id, 'player', f"message number {i}")
+
+        recent = client.get(f'/api/dm/chat_display/{entity_id}')
+        assert b'message number 1' not in recent.data
+        assert b'message number 2' in recent.data
+        assert b'Show 2 earlier messages' in recent.data
+
+        full = client.get(f'/api/dm/chat_display/{entity_id}?history=all')
+        assert b'message number 0' in full.data
+        assert b'earlier message' not in full.data
+        assert full.headers['ETag'] != recent.headers['ETag']
+
+
+class TestRequestValidation:
+    """Test schema validation of request bodies."""
+
+    @pytest.fixture
+    def client(self):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(api.ai_dm_bp)
+        return app.test_client()
+
+    def test_missing_field_rejected(self, client):
+        """Test that a missing required field returns a 400 naming it."""
+        response = client.post('/api/dm/message', json={'entity_id': 'entity_1'})
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == "Invalid request: 'message' is a required property"
+
+    def test_empty_message_rejected(self, client):
+        """Test that empty strings don't count as provided."""
+        response = client.post('/api/dm/message', json={'entity_id': 'entity_1', 'message': ''})
+
+        assert response.status_code == 400
+
+    def test_unknown_action_type_rejected(self, client):
+        """Test that action types outside the schema enum are rejected."""
+        response = client.post('/api/dm/execute_action',
+                               json={'entity_id': 'entity_1', 'action_type': 'dance'})
+
+        assert response.status_code == 400
+        assert 'dance' in response.get_json()['error']
+
+    def test_non_json_body_rejected(self, client):
+        """Test that a body that isn't JSON gets a clean 400."""
+        response = client.post('/api/dm/generate_intro', data='entity_1')
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Request body must be JSON'
+
+
+class TestExecuteAction:
+    """Test the suggested-action endpoint."""
+
+    @pytest.fixture
+    def client(self, engine, monkeypatch):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.engine_instances = {'dice_world': engine}
+        app.register_blueprint(api.ai_dm_bp)
+        monkeypatch.setattr(api, '_world_modules_cache', {'dice_world': []})
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['world_name'] = 'dice_world'
+        return client
+
+    def test_roll_without_rng_module_skips_announcement(self, engine, client):
+        """Test that dice actions still succeed without RNG, minus the chat writes."""
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+
+        response = client.post('/api/dm/execute_action', json={
+            'entity_id': entity_id,
+            'action_type': 'roll_dice',
+            'action_data': {'dice': '1d20', 'label': 'Perception'}
+        })
+
+        assert response.status_code == 200
+        assert response.get_json()['result'] == {'type': 'roll_dice', 'dice': '1d20', 'label': 'Perception'}
+        assert engine.get_component(entity_id, 'Conversation').data['message_ids'] == []
+
+
+    def test_roll_with_rng_module_announced(self, engine, client, monkeypatch):
+        """Test that the roll is announced in the chat when RNG is loaded."""
+        rng_module = type('RNGModule', (), {'name': 'rng'})()
+        monkeypatch.setattr(api, '_world_modules_cache', {'dice_world': [rng_module]})
+        entity_id = engine.create_entity("Theron").data['id']
+        engine.add_component(entity_id, 'Conversation', {'message_ids': []})
+
+        response = client.post('/api/dm/execute_action', json={
+            'entity_id': entity_id,
+            'action_type': 'roll_dice',
+            'action_data': {'dice': '1d20', 'label': 'Perception'}
+        })
+
+        assert response.status_code == 200
+        message_ids = engine.get_component(entity_id, 'Conversation').data['message_ids']
+        message = engine.get_component(message_ids[0], 'ChatMessage')
+        assert message.data['message'] == "🎲 Rolling 1d20 for Perception..."
+
+class TestEntityResolver:
+    """Test name and fuzzy entity resolution."""
+
+    def test_fuzzy_match_ranks_closest_first(self, engine):
+        """Test that typos resolve to the most similar name."""
+        engine.create_entity("The Gold Tank")
+        engine.create_entity("The Golden Tankard")
+        engine.create_entity("Silver Stag Inn")
+        resolver = EntityResolver(engine)
+
+        matches = resolver.resolve_multiple('golden tankrd')
+
+        assert [e.name for e in matches] == ["The Golden Tankard", "The Gold Tank"]
+        assert resolver.resolve('golden tankrd').name == "The Golden Tankard"
+
+    def test_python_fallback_matches_ranking(self, monkeypatch):
+        """Test that ranking works without rapidfuzz installed."""
+        monkeypatch.setattr(entity_resolver, 'process', None)
+        choices = ['the gold tank', 'silver stag inn', 'the golden tankard']
+
+        assert entity_resolver.rank_by_similarity('golden tankrd', choices, 0.6) == [2, 0]
+        assert entity_resolver.rank_by_similarity('golden tankrd', choices, 0.6, limit=1) == [2]
+
+    @pytest.mark.parametrize('scorer', ['rapidfuzz', 'python'])
+    def test_threshold_same_under_both_scorers(self, scorer, monkeypatch):
+        """Test that a score exactly at the threshold matches with either scorer."""
+        if scorer == 'rapidfuzz':
+            pytest.importorskip('rapidfuzz')
+        else:
+            monkeypatch.setattr(entity_resolver, 'process', None)
+        # InDel ratio 2 * 3 / 10 = 0.6 ('ara'); difflib's SequenceMatcher scores 0.4
+        choices = ['marla', 'elowen']
+
+        assert entity_resolver.indel_ratio('elara', 'marla') == 0.6
+        assert entity_resolver.rank_by_similarity('elara', choices, 0.6) == [0]
+        assert entity_resolver.rank_by_similarity('elara', choices, 0.61) == []
+
+
+    def test_fuzzy_match_filters_by_type(self, engine):
+        """Test that expected_type limits fuzzy candidates to entities with the type's component."""
+        tavern = engine.create_entity("The Golden Tankard").data['id']
+        engine.add_component(tavern, 'Location', {'location_type': 'tavern'})
+        keeper = engine.create_entity("The Golden Tankards").data['id']
+        engine.add_component(keeper, 'NPC', {'disposition': 'friendly'})
+        resolver = EntityResolver(engine)
+
+        assert resolver.resolve('golden tankrd', expected_type='location').id == tavern
+        assert resolver.resolve('golden tankrd', expected_type='npc').id == keeper
+
+    def test_exact_name_disambiguated_by_location(self, engine):
+        """Test that duplicate names prefer the entity in the context location."""
+        tavern = engine.create_entity("Tavern").data['id']
+        engine.add_component(tavern, 'Location', {'location_type': 'tavern'})
+        engine.create_entity("Guard")
+        local_guard = engine.create_entity("Guard").data['id']
+        engine.add_component(local_guard, 'Position', {'region': tavern})
+        resolver = EntityResolver(engine)
+
+        assert resolver.resolve('guard', context_location=tavern).id == local_guard
+        assert resolver.resolve('guard').name == "Guard"
+
+    def test_resolve_multiple_puts_local_matches_first(self, engine):
+        """Test that candidates in the context location are listed first."""
+        tavern = engine.create_entity("Tavern").data['id']
+        engine.add_component(tavern, 'Location', {'location_type': 'tavern'})
+        remote_guard = engine.create_entity("Guard").data['id']
+        local_guard = engine.create_entity("Guard").data['id']
+        engine.add_component(local_guard, 'Position', {'region': tavern})
+        resolver = EntityResolver(engine)
+
+        matches = resolver.resolve_multiple('Guard', context_location=tavern)
+
+        assert [e.id for e in matches] == [local_guard, remote_guard]
+
+    def test_fuzzy_match_skips_deleted_entities(self, engine):
+        """Test that soft-deleted entities are never fuzzy-matched."""
+        gone = engine.create_entity("The Golden Tankard").data['id']
+        engine.delete_entity(gone)
+        resolver = EntityResolver(engine)
+
+        assert resolver.resolve('golden tankrd') is None
+
+
+class TestResponseParser:
+    """Test narrative/action extraction from DM responses."""
+
+    def test_fallback_actions_are_independent_copies(self):
+        """Test that modifying returned fallback actions doesn't leak into later calls."""
+        actions = get_fallback_actions()
+        actions[0]['label'] = 'Changed'
+        actions[0]['action_data']['dice'] = '1d4'
+        actions.pop()
+
+        fresh = get_fallback_actions()
+
+        assert len(fresh) == 3
+        assert fresh[0]['label'] == '🔍 Look Around'
+        assert fresh[0]['action_data']['dice'] == '1d20'
+
+    def test_actions_block_parsed_and_validated(self):
+        """Test that the <actions> block is split off and invalid actions dropped."""
+        raw = (
+            "  You enter the tavern.\n\n  \n\nIt is loud.   \n\n"
+            "<ACTIONS>\n"
+            '[{"label": "Roll", "action_type": "roll_dice", "action_data": {"dice": "1d20"}},'
+            ' {"label": "Bad", "action_type": "teleport"}]\n'
+            "</actions>"
+        )
+        narrative, actions = parse_dm_response(raw)
+
+        assert narrative == "You enter the tavern.\n\nIt is loud."
+        assert actions == [{'label': 'Roll', 'action_type': 'roll_dice', 'action_data': {'dice': '1d20'}}]
+
+    def test_action_data_must_be_serializable(self):
+        """Test the structural JSON check on action_data."""
+        action = {'label': 'Go', 'action_type': 'custom'}
+        assert validate_action({**action, 'action_data': {'path': ['a', 1, 2.5, None, (True,)], 3: 'x'}})
+        assert not validate_action({**action, 'action_data': {'when': datetime.now()}})
+        assert not validate_action({**action, 'action_data': {('a', 'b'): 1}})
+
+        circular = {}
+        circular['self'] = [circular]
+        assert not validate_action({**action, 'action_data': circular})
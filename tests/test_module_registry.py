@@ -273,3 +273,23 @@ class TestModuleRegistry:
         # Second entry should have metadata
         key2 = next(v for v in values if v['key'] == 'key2')
         assert key2['metadata'] == {'extra': 'data'}
+
+    def test_game_system_context_cached_until_registry_write(self, temp_world):
+        """Test that AI game-system context is reused until a registry changes."""
+        from src.core.ai_context import AIContextBuilder
+
+        engine = StateEngine.initialize_world(
+            world_path=temp_world,
+            world_name="Test World",
+            modules=[]
+        )
+        registry = engine.create_registry('magic_schools', 'magic')
+        registry.register('evocation', 'Evocation magic')
+
+        first = AIContextBuilder(engine).build_game_system_context()
+        assert AIContextBuilder(engine).build_game_system_context() is first
+
+        registry.register('necromancy', 'Necromancy magic')
+        updated = AIContextBuilder(engine).build_game_system_context()
+
+        assert [v['key'] for v in updated['magic_schools']] == ['evocation', 'necromancy']
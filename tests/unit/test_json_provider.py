@@ -0,0 +1,55 @@
+"""
+Unit tests for the orjson-backed Flask JSON provider.
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify
+
+from src.web.json_provider import OrjsonProvider
+
+pytest.importorskip('orjson')
+
+
+@pytest.fixture
+def app():
+    """Create an app using the orjson provider."""
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    return app
+
+
+def test_matches_default_provider(app):
+    """Test that output decodes the same as Flask's default provider."""
+    payload = {
+        'success': True,
+        'message': 'Thé tavern is warm',
+        'suggested_actions': [{'label': 'Roll', 'action_type': 'roll_dice'}],
+        'timestamp': datetime(2024, 1, 1, 12, 0, 0)
+    }
+    default_app = Flask(__name__)
+
+    with app.app_context():
+        fast = app.json.dumps(payload)
+    with default_app.app_context():
+        expected = default_app.json.dumps(payload)
+
+    assert json.loads(fast) == json.loads(expected)
+    assert list(json.loads(fast)) == list(json.loads(expected))
+
+
+def test_jsonify_response(app):
+    """Test that jsonify() responses go through orjson and stay compact."""
+    with app.test_request_context():
+        response = jsonify(success=True, message='ok')
+
+    assert response.mimetype == 'application/json'
+    assert response.get_data(as_text=True) == '{"message":"ok","success":true}\n'
+
+
+def test_unsupported_arguments_fall_back(app):
+    """Test that json.dumps-only options use the built-in encoder."""
+    with app.app_context():
+        assert app.json.dumps({'a': 1}, indent=2) == '{\n  "a": 1\n}'
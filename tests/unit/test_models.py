@@ -113,6 +113,16 @@ class TestComponent:
         assert data['data'] == {'current': 25}
         assert data['version'] == 1
 
+    def test_from_dict_round_trip(self):
+        """Test rebuilding a component from its dictionary form."""
+        component = Component.create(
+            entity_id='entity_123',
+            component_type='Health',
+            data={'current': 25}
+        )
+
+        assert Component.from_dict(component.to_dict()) == component
+
 
 class TestRelationship:
     """Test Relationship model."""
@@ -76,6 +76,16 @@ def test_entity_operations(world_path):
     assert entity.deleted_at is None
 
 
+def test_create_entity_with_pregenerated_id(world_path):
+    """Test creating an entity with a caller-supplied ID."""
+    engine = StateEngine.initialize_world(world_path, 'Test World')
+
+    result = engine.create_entity('DM response', entity_id='entity_pregenerated')
+    assert result.success is True
+    assert result.data['id'] == 'entity_pregenerated'
+    assert engine.get_entity('entity_pregenerated').name == 'DM response'
+
+
 def test_component_operations(world_path):
     """Test component operations."""
     engine = StateEngine.initialize_world(world_path, 'Test World')
@@ -487,3 +497,97 @@ def test_container_validation(world_path):
     })
     assert result.success is False
     assert result.error_code == 'VALIDATION_ERROR'
+
+
+def test_append_to_component_list(world_path):
+    """Test appending to a list field without rewriting the component."""
+    engine = StateEngine.initialize_world(world_path, 'Test World')
+    tavern = engine.create_entity('Tavern').data['id']
+    engine.add_component(tavern, 'Location', {'location_type': 'tavern', 'features': ['hearth']})
+
+    result = engine.append_to_component_list(
+        tavern, 'Location', 'features', ['bar', 'stairs'], updates={'visited': True}
+    )
+    assert result.success
+    assert result.data['version'] == 2
+
+    # Missing list fields start empty
+    engine.append_to_component_list(tavern, 'Location', 'connected_locations', ['entity_square'])
+
+    location = engine.get_component(tavern, 'Location')
+    assert location.data == {
+        'location_type': 'tavern',
+        'features': ['hearth', 'bar', 'stairs'],
+        'visited': True,
+        'connected_locations': ['entity_square']
+    }
+    assert location.version == 3
+
+    event = engine.get_events(entity_id=tavern, event_type='component.updated', limit=1)[0]
+    assert event.data['appended'] == {'connected_locations': ['entity_square']}
+    assert 'new_data' not in event.data
+
+
+def test_append_to_component_list_validates_items(world_path):
+    """Test that appended items are checked against the field's schema."""
+    engine = StateEngine.initialize_world(world_path, 'Test World')
+    tavern = engine.create_entity('Tavern').data['id']
+    engine.add_component(tavern, 'Location', {'location_type': 'tavern'})
+
+    result = engine.append_to_component_list(tavern, 'Location', 'features', [42])
+
+    assert not result.success
+    assert result.error_code == 'VALIDATION_ERROR'
+    assert engine.get_component(tavern, 'Location').data.get('features', []) == []
+
+    missing = engine.append_to_component_list(tavern, 'Identity', 'features', ['bar'])
+    assert missing.error_code == 'COMPONENT_NOT_FOUND'
+
+
+def test_get_components_bulk(world_path):
+    """Test fetching one component type for many entities at once."""
+    engine = StateEngine.initialize_world(world_path, 'Test World')
+
+    ids = []
+    for name in ['Alpha', 'Beta', 'Gamma']:
+        entity_id = engine.create_entity(name).data['id']
+        engine.add_component(entity_id, 'Identity', {'description': f'{name} description'})
+        ids.append(entity_id)
+
+    no_identity = engine.create_entity('Delta').data['id']
+    engine.delete_entity(ids[1])
+
+    components = engine.get_components_bulk(ids + [no_identity, 'entity_missing'], 'Identity')
+
+    # Deleted entities and entities without the component are omitted
+    assert set(components) == {ids[0], ids[2]}
+    assert components[ids[0]].data['description'] == 'Alpha description'
+    assert components[ids[2]].component_type == 'Identity'
+
+
+def test_find_entities_by_name(world_path):
+    """Test case-insensitive name lookup of active entities."""
+    engine = StateEngine.initialize_world(world_path, 'Test World')
+
+    guard = engine.create_entity('Town Guard').data['id']
+    other_guard = engine.create_entity('town guard').data['id']
+    retired = engine.create_entity('Town Guard').data['id']
+    engine.create_entity('Town Guard Captain')
+    engine.delete_entity(retired)
+
+    matches = engine.find_entities_by_name('TOWN GUARD')
+
+    assert {e.id for e in matches} == {guard, other_guard}
+    assert engine.find_entities_by_name('Guard') == []
+
+
+def test_find_entities_by_non_ascii_name(world_path):
+    """Test that name lookup ignores case beyond ASCII letters."""
+    engine = StateEngine.initialize_world(world_path, 'Test World')
+
+    elise = engine.create_entity('Élise').data['id']
+    aerwen = engine.create_entity('ÆRWEN').data['id']
+    engine.create_entity('Elise')
+
+    assert [e.id for e in engine.find_entities_by_name('élise')] == [elise]
+    assert [e.id for e in engine.find_entities_by_name('ærwen')] == [aerwen]
@@ -3,7 +3,9 @@ Unit tests for WorldStorage.
 """
 
 import pytest
+import sqlite3
 from datetime import datetime
+from pathlib import Path
 from src.core.storage import WorldStorage
 from src.core.models import Entity, Component, Relationship, Event
 
@@ -115,3 +117,26 @@ def test_relationship_crud(storage):
     assert storage.delete_relationship(relationship.id) is True
     retrieved = storage.get_relationship(relationship.id)
     assert retrieved.deleted_at is not None
+
+
+def test_existing_world_gets_schema_upgrades(tmp_path):
+    """Test that opening a world created with an older schema adds new indexes."""
+    db_path = str(tmp_path / 'world.db')
+    schema = (Path(__file__).parent.parent.parent / 'schema.sql').read_text()
+    old_schema = '\n'.join(line for line in schema.splitlines() if 'idx_entities_name_nocase' not in line)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(old_schema)
+    conn.close()
+
+    storage = WorldStorage(db_path)
+    storage.initialize()
+    storage.save_entity(Entity.create('Guard'))
+
+    plan = storage.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM entities "
+        "WHERE name = ? COLLATE NOCASE AND deleted_at IS NULL",
+        ('guard',)
+    ).fetchall()
+    assert 'idx_entities_name_nocase' in ' '.join(row[-1] for row in plan)
+    assert [e.name for e in storage.find_entities_by_name('guard')] == ['Guard']
+    storage.close()